@@ -1,6 +1,8 @@
 import customtkinter as ctk
 from PIL import Image, ImageDraw, ImageOps, ImageTk
 import utils.common as common
+from utils.preprocess import new_input_buffer, process_image
+from utils.raster import StrokeRaster
 from typing import Callable
 import numpy as np
 
@@ -16,6 +18,9 @@ class DrawFrame(ctk.CTkFrame):
         super().__init__(master, *args, **kwargs)
         self.statusbar = statusbar
         self.noise_is_added: bool = False
+        # predict button stays disabled until the model has been loaded in the background
+        self.engine_ready: bool = False
+        self.has_drawing: bool = False
 
         ctk.CTkLabel(
             self,
@@ -49,6 +54,12 @@ class DrawFrame(ctk.CTkFrame):
         )
         self.draw = ImageDraw.Draw(self.draw_image)
 
+        # model input is written into the same buffer on every prediction
+        self.input_buffer: common.NDArrayFloat32 = new_input_buffer()
+
+        # 28x28 area-averaged copy of the drawing, kept up to date as the strokes arrive
+        self.raster = StrokeRaster(canvas_size= self.canvas_size)
+
         # binding mouse movement
         self.canvas.bind('<B1-Motion>', self.draw_digit)
         self.canvas.bind(
@@ -148,6 +159,28 @@ class DrawFrame(ctk.CTkFrame):
             pady= (0, 10),
             sticky= 'nsew'
         )
+
+        # live prediction switch
+        self.live_var = ctk.StringVar(self, value= 'off')
+        self.live_switch = ctk.CTkSwitch(
+            self,
+            text= 'Live Prediction',
+            text_color= common.grey_color,
+            font= (common.font, 12),
+            progress_color= common.fg_color,
+            button_hover_color= common.hover_color,
+            onvalue= 'on',
+            offvalue= 'off',
+            variable= self.live_var,
+            state= 'disabled'
+        )
+        self.live_switch.grid(
+            row= 10,
+            column= 0,
+            padx= 20,
+            pady= (0, 10),
+            sticky= 'w'
+        )
         
 
     def draw_digit(self, event: any) -> None:
@@ -167,9 +200,13 @@ class DrawFrame(ctk.CTkFrame):
             [x - pen_size, y - pen_size, x + pen_size, y + pen_size], 
             fill= 0
         )
+        self.raster.add_rectangle(x - pen_size, y - pen_size, x + pen_size, y + pen_size)
 
         self.set_original_image()
-        self.predict_button.configure(state= 'normal')
+        self.has_drawing = True
+
+        if self.engine_ready:
+            self.predict_button.configure(state= 'normal')
 
 
     def clear_canvas(self) -> None:
@@ -179,25 +216,31 @@ class DrawFrame(ctk.CTkFrame):
             fill= 255
         )
 
+        self.raster.clear()
         self.set_original_image()
         self.noise_var.set(0.0)
         self.noise_is_added = False
         self.update()
+        self.has_drawing = False
         self.predict_button.configure(state= 'disabled')
         # updating statubar
         self.statusbar.noise_level.set_default()
 
 
-    def process_digit(self) -> common.NDArrayFloat:
-        # Resize to 28x28 for model input
-        small_image = self.draw_image.resize((28, 28), Image.LANCZOS)
-        # Invert to match MNIST black-on-white
-        small_image = ImageOps.invert(small_image)
+    def set_engine_ready(self) -> None:
+        self.engine_ready = True
+        self.live_switch.configure(state= 'normal')
+
+        if self.has_drawing:
+            self.predict_button.configure(state= 'normal')
+
+
+    def process_digit(self) -> common.NDArrayFloat32:
+        # the raster already holds the model input of a pen-only drawing
+        if self.raster.valid:
+            return self.raster.write_into(self.input_buffer)
 
-        pixel_data = list(small_image.getdata())
-        # reshpaing and normalization
-        np_img = np.array(pixel_data).reshape(-1, 28, 28, 1) / 255
-        return np_img
+        return process_image(self.draw_image, out= self.input_buffer)
 
 
     def create_slider_frame(
@@ -249,6 +292,7 @@ class DrawFrame(ctk.CTkFrame):
         self.statusbar.noise_level.update(f'{int(self.noise_var.get() * 100)}%')
 
         self.noise_is_added = True
+        self.raster.invalidate()
 
         # getting noise level from slider
         noise_level: float = self.noise_var.get()
@@ -0,0 +1,363 @@
+import tkinter as tk
+import numpy as np
+from abc import ABC, abstractmethod
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.ticker import MaxNLocator
+from matplotlib import colormaps
+from PIL import Image, ImageTk
+import utils.common as common
+from GUI.plot_renderer import PlotRenderer
+from utils.decimation import EnvelopeDecimator
+from utils.history import HistoryStore
+from utils.metrics import RunningMetrics, WINDOW_SIZE, compare_predictions
+
+
+class MetricPlot(ABC):
+    figsize: tuple[float, float] = (2.5, 2.5)
+    dpi: int = 100
+
+    def __init__(self, master: any, renderer: PlotRenderer) -> None:
+        # the figure is never touched by tk, the renderer draws it with Agg on its thread and tk shows the pixels
+        self.renderer = renderer
+        self.fig = Figure(figsize= self.figsize, dpi= self.dpi)
+        self.ax = self.fig.add_subplot()
+        self.agg_canvas = FigureCanvasAgg(self.fig)
+        self.setup()
+        self.fig.tight_layout()
+
+        self.size: tuple[int, int] = (int(self.figsize[0] * self.dpi), int(self.figsize[1] * self.dpi))
+        self.rendered_size: tuple[int, int] = self.size
+        self.state: any = None
+        self.photo: ImageTk.PhotoImage | None = None
+
+        # the label takes whatever space it is packed into, the figure is rendered at that size
+        self.widget = tk.Label(master, width= 1, height= 1, borderwidth= 0, highlightthickness= 0)
+        self.widget.bind('<Configure>', self.on_resize)
+
+
+    # a plot missing one of these fails when it is created, not later on the renderer thread
+    @abstractmethod
+    def setup(self) -> None:
+        pass
+
+
+    @abstractmethod
+    def snapshot(self, history: HistoryStore, metrics: RunningMetrics, marker: bool) -> any:
+        # runs on the tk thread, copies out the little that apply needs
+        pass
+
+
+    @abstractmethod
+    def apply(self, state: any) -> None:
+        # runs on the renderer thread, changes the artists
+        pass
+
+
+    def update(self, history: HistoryStore, metrics: RunningMetrics, marker: bool) -> None:
+        self.request(self.snapshot(history, metrics, marker))
+
+
+    def request(self, state: any) -> None:
+        self.state = state
+        self.renderer.submit(self, state, self.size)
+
+
+    def on_resize(self, event: any) -> None:
+        size: tuple[int, int] = (event.width, event.height)
+
+        if size != self.size:
+            self.size = size
+
+            if self.state is not None:
+                self.request(self.state)
+
+
+    def render(self, state: any, size: tuple[int, int]) -> np.ndarray | None:
+        width, height = size
+
+        # skipping the sizes tk reports before the widget is laid out
+        if width < 50 or height < 50:
+            return None
+
+        if size != self.rendered_size:
+            self.fig.set_size_inches(width / self.dpi, height / self.dpi)
+            self.fig.tight_layout()
+            self.rendered_size = size
+
+        self.apply(state)
+        self.agg_canvas.draw()
+
+        return np.asarray(self.agg_canvas.buffer_rgba()).copy()
+
+
+    def show(self, pixels: np.ndarray) -> None:
+        # the widget may have been destroyed while this was rendering
+        if not self.widget.winfo_exists():
+            return None
+
+        # keeping a reference, tk doesn't and the image would be garbage collected
+        self.photo = ImageTk.PhotoImage(Image.fromarray(pixels, mode= 'RGBA'), master= self.widget)
+        self.widget.configure(image= self.photo)
+
+
+class TrendPlot(MetricPlot):
+    # the values are a column of the history, or a series kept by the metrics
+    source: str = 'history'
+    attribute: str
+    title: str
+    ylabel: str
+    yticks: list[float]
+    ylim: tuple[float, float]
+
+    def setup(self) -> None:
+        self.line, = self.ax.plot([], [], color= common.fg_color)
+        # the plot is a few hundred pixels wide, so only the min and max of each bucket of rows is drawn
+        self.decimator = EnvelopeDecimator()
+
+        self.ax.set_title(self.title, fontsize= 10)
+        self.ax.set_xlabel('Serial Number')
+        self.ax.set_ylabel(self.ylabel)
+        self.ax.set_yticks(self.yticks)
+        self.ax.set_ylim(*self.ylim)
+
+        # Set the x-axis to show only integer values
+        self.ax.xaxis.set_major_locator(MaxNLocator(integer=True, nbins= 5))
+
+
+    def snapshot(self, history: HistoryStore, metrics: RunningMetrics, marker: bool) -> any:
+        values: common.NDArrayFloat = getattr(history if self.source == 'history' else metrics, self.attribute)
+
+        # only the rows added since the last update are folded in
+        self.decimator.update(values, history.generation)
+        sr_no, points = self.decimator.points()
+
+        return sr_no, points, marker, len(values)
+
+
+    def apply(self, state: any) -> None:
+        sr_no, points, marker, num_values = state
+
+        self.line.set_data(sr_no, points)
+        self.line.set_marker('o' if marker else '')
+        self.ax.set_xlim(0.5, max(num_values, 2) + 0.5)
+
+
+class AccuracyTrendPlot(TrendPlot):
+    attribute = 'acc_scores'
+    title = 'Accuracy Trend'
+    ylabel = 'Accuracy Score'
+    yticks = [0.0, 0.25, 0.50, 0.75, 1.0]
+    ylim = (0, 1.1)
+
+
+class ConfidenceTrendPlot(TrendPlot):
+    attribute = 'confidences'
+    title = 'Confidence Trend'
+    ylabel = 'Confidence (%)'
+    yticks = [0, 25, 50, 75, 100]
+    ylim = (0, 110)
+
+
+class WindowAccuracyTrendPlot(TrendPlot):
+    source = 'metrics'
+    attribute = 'window_accuracies'
+    title = f'Accuracy of Last {WINDOW_SIZE}'
+    ylabel = 'Accuracy Score'
+    yticks = [0.0, 0.25, 0.50, 0.75, 1.0]
+    ylim = (0, 1.1)
+
+
+class EwmaConfidenceTrendPlot(TrendPlot):
+    source = 'metrics'
+    attribute = 'ewma_confidences'
+    title = 'Confidence Trend (EWMA)'
+    ylabel = 'Confidence (%)'
+    yticks = [0, 25, 50, 75, 100]
+    ylim = (0, 110)
+
+
+class ConfusionMatrixPlot(MetricPlot):
+    def setup(self) -> None:
+        # same look as sklearn's ConfusionMatrixDisplay, but the image and texts are kept for updating
+        self.image = self.ax.imshow(
+            np.zeros((10, 10)),
+            interpolation= 'nearest',
+            cmap= colormaps['Oranges'],
+            vmin= 0,
+            vmax= 1
+        )
+        self.texts = [
+            [self.ax.text(col, row, '', ha= 'center', va= 'center', fontsize= 6) for col in range(10)]
+            for row in range(10)
+        ]
+
+        self.ax.set_xticks(range(10))
+        self.ax.set_yticks(range(10))
+        self.ax.set_xlabel('Predicted label')
+        self.ax.set_ylabel('True label')
+        self.ax.set_title('Confusion Matrix', fontsize= 10)
+
+
+    def snapshot(self, history: HistoryStore, metrics: RunningMetrics, marker: bool) -> any:
+        return metrics.confusion.copy()
+
+
+    def apply(self, state: any) -> None:
+        confusion: common.NDArrayInt = state
+        max_value: int = max(int(confusion.max()), 1)
+
+        self.image.set_data(confusion)
+        self.image.set_clim(0, max_value)
+
+        # dark text on light cells and the other way around
+        cmap = self.image.get_cmap()
+        light, dark = cmap(0), cmap(1.0)
+
+        for row in range(10):
+            for col in range(10):
+                value: int = int(confusion[row, col])
+                text = self.texts[row][col]
+                text.set_text(str(value))
+                text.set_color(light if value > max_value / 2 else dark)
+
+
+class DisagreementPlot(ConfusionMatrixPlot):
+    def setup(self) -> None:
+        super().setup()
+        self.ax.set_xlabel('New prediction')
+        self.ax.set_ylabel('Old prediction')
+        self.ax.set_title('Old V/S New (not re-scored)', fontsize= 10)
+
+        # the comparison goes over every re-scored row, so it is only redone when those change
+        self.compared_key: tuple[int, int] | None = None
+        self.comparison: tuple[float, float, common.NDArrayInt] | None = None
+
+
+    def snapshot(self, history: HistoryStore, metrics: RunningMetrics, marker: bool) -> any:
+        key: tuple[int, int] = (history.generation, history.num_rescored)
+
+        if key != self.compared_key:
+            self.compared_key = key
+            self.comparison = compare_predictions(history)
+
+        return history.num_rescored, self.comparison
+
+
+    def apply(self, state: any) -> None:
+        num_rescored, (old_accuracy, new_accuracy, disagreement) = state
+        super().apply(disagreement)
+
+        if num_rescored:
+            self.ax.set_title(f'Old {old_accuracy:.1%} V/S New {new_accuracy:.1%}', fontsize= 10)
+
+        else:
+            self.ax.set_title('Old V/S New (not re-scored)', fontsize= 10)
+
+
+class CountPlot(MetricPlot):
+    def setup(self) -> None:
+        self.bars = self.ax.bar(
+            x= ['Correct', 'Wrong'],
+            height= [0, 0],
+            color= common.fg_color,
+            edgecolor= common.grey_color,
+            width= 0.3
+        )
+
+        self.ax.set_title('Predictions', fontsize= 10)
+        self.ax.yaxis.set_major_locator(MaxNLocator(integer=True, nbins= 5))
+
+
+    def snapshot(self, history: HistoryStore, metrics: RunningMetrics, marker: bool) -> any:
+        return [metrics.num_correct, metrics.num_wrong]
+
+
+    def apply(self, state: any) -> None:
+        correctness_counts: list[int] = state
+
+        for bar, height in zip(self.bars, correctness_counts):
+            bar.set_height(height)
+
+        self.ax.set_ylim(0, max(correctness_counts) + 1)
+
+
+class PerClassPlot(MetricPlot):
+    def setup(self) -> None:
+        # precision, recall and f1 bars side by side for every digit
+        self.bar_groups = [
+            self.ax.bar(
+                x= np.arange(10) + offset,
+                height= np.zeros(10),
+                width= 0.28,
+                color= color,
+                label= label
+            )
+            for offset, color, label in zip(
+                (-0.28, 0, 0.28),
+                (common.fg_color, common.hover_color, common.grey_color),
+                ('Precision', 'Recall', 'F1')
+            )
+        ]
+
+        self.ax.set_title('Per Digit Scores', fontsize= 10)
+        self.ax.set_xlabel('Number')
+        self.ax.set_xticks(range(10))
+        self.ax.set_yticks([0.0, 0.25, 0.50, 0.75, 1.0])
+        self.ax.set_ylim(0, 1.1)
+        self.ax.legend(fontsize= 6, loc= 'lower right')
+
+
+    def snapshot(self, history: HistoryStore, metrics: RunningMetrics, marker: bool) -> any:
+        return metrics.per_class_scores()
+
+
+    def apply(self, state: any) -> None:
+        for bars, scores in zip(self.bar_groups, state):
+            for bar, score in zip(bars, scores):
+                bar.set_height(score)
+
+
+class ProbabilityPlot(MetricPlot):
+    figsize = (4, 2)
+
+    def setup(self) -> None:
+        self.bars = self.ax.bar(
+            x= range(10),
+            height= np.zeros(10),
+            color= common.fg_color,
+            edgecolor= common.grey_color
+        )
+        self.ax.set_title('Probability Distribution')
+        self.ax.set_xlabel('Number')
+        self.ax.set_ylabel('Probability (%)')
+        self.ax.set_xticks(range(10))
+        self.ax.set_yticks(range(0, 101, 25))
+
+
+    def snapshot(self, history: HistoryStore, metrics: RunningMetrics, marker: bool) -> any:
+        # updated from the history it shows the last row
+        probabilities = history.probabilities[-1] if len(history) else np.zeros(10)
+        return (probabilities.round(2) * 100).astype(np.uint8)
+
+
+    def update_probabilities(self, probabilities: common.NDArrayFloat) -> None:
+        # not a history metric, it shows the latest prediction (live ones too)
+        self.request((probabilities.round(2) * 100).astype(np.uint8))
+
+
+    def apply(self, state: any) -> None:
+        for bar, height in zip(self.bars, state):
+            bar.set_height(height)
+
+
+METRIC_PLOTS: dict[str, type[MetricPlot]] = {
+    'accuracy': AccuracyTrendPlot,
+    'confidence': ConfidenceTrendPlot,
+    'cm': ConfusionMatrixPlot,
+    'count': CountPlot,
+    'window_accuracy': WindowAccuracyTrendPlot,
+    'per_class': PerClassPlot,
+    'ewma_confidence': EwmaConfidenceTrendPlot,
+    'rescore': DisagreementPlot
+}
@@ -1,15 +1,17 @@
 import customtkinter as ctk
 import tkinter.messagebox as tmsg
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.ticker import MaxNLocator
 from PIL import Image
 from tkinter import ttk
-from sklearn.metrics import accuracy_score, ConfusionMatrixDisplay
 from typing import Literal
 import utils.common as common
+from GUI.metric_plots import METRIC_PLOTS, MetricPlot, ProbabilityPlot
+from GUI.plot_renderer import PlotRenderer
+from GUI.virtual_treeview import VirtualTreeview
+from utils.dedup import DedupIndex
+from utils.history import HistoryStore, ImageMode
+from utils.journal import Journal
+from utils.metrics import RunningMetrics, compare_predictions
 
 
 class MetricsFrame(ctk.CTkFrame):
@@ -18,6 +20,7 @@ class MetricsFrame(ctk.CTkFrame):
             master: any, 
             statusbar: ctk.CTkFrame, 
             *args, 
+            image_mode: ImageMode = 'compressed',
             **kwargs
         ) -> None:
         super().__init__(master, *args, **kwargs)
@@ -27,17 +30,18 @@ class MetricsFrame(ctk.CTkFrame):
         self.original_image: common.NDArrayFloat | None = None
         self.probabilities: common.NDArrayFloat | None = None
         self.prediction: int | None = None
-        self.history = pd.DataFrame(
-            columns= [
-                'original_image', 
-                'Prediction', 
-                'probabilities', 
-                'Correct Number',
-                'Confidence (%)',
-                'correctness',
-                'acc_score'
-            ]
-        )
+        # columnar store of all the predictions, a DataFrame is only made for exporting
+        self.history = HistoryStore(image_mode= image_mode)
+        # cumulative metrics, updated in O(1) for every appended prediction
+        self.metrics = RunningMetrics()
+        # keys of the history rows, so merging an import skips the rows that are already there
+        self.dedup_index = DedupIndex()
+        # every appended prediction is also written to the session journal, set by the main window
+        self.journal: Journal | None = None
+        # set while the main window restores the last session, which puts its rows in front of the current ones
+        self.journal_restoring: bool = False
+        # every plot of this frame is drawn off the tk thread, so drawing on the canvas never waits for matplotlib
+        self.renderer = PlotRenderer(self)
         # text variables
         self.pred_var = ctk.StringVar(value= '')
 
@@ -65,7 +69,7 @@ class MetricsFrame(ctk.CTkFrame):
         # the frame where are the checkboxes for metrics
         self.checkbox_frame = ctk.CTkFrame(
             self, 
-            height= 45,
+            height= 80,
             fg_color= common.upper_frame_color
         )
         self.checkbox_frame.pack(
@@ -74,7 +78,7 @@ class MetricsFrame(ctk.CTkFrame):
             fill= 'x',
             padx= 20
         )
-        self.checkbox_frame.pack_propagate(False)
+        self.checkbox_frame.grid_propagate(False)
 
         # history frame
         self.history_frame = ctk.CTkFrame(
@@ -129,6 +133,7 @@ class MetricsFrame(ctk.CTkFrame):
         self.default_bar_frame_layout()
         self.default_history_frame_layout()
         self.default_checkbox_frame_layout()
+        self.create_all_metrics_widgets()
         self.default_all_metrics_frame_layout(num_of_pred_left= 5)
         
 
@@ -208,6 +213,7 @@ class MetricsFrame(ctk.CTkFrame):
     def default_bar_frame_layout(self) -> None:
         # removing previous plot
         common.clear_widgets(self.bar_frame)
+        self.bar_plot: ProbabilityPlot | None = None
 
         ctk.CTkLabel(
             master= self.bar_frame,
@@ -250,8 +256,11 @@ class MetricsFrame(ctk.CTkFrame):
         )
 
         # making table
-        self.tree_view = ttk.Treeview(
+        # only the rows on screen exist as treeview items, they are filled from self.history
+        self.tree_view = VirtualTreeview(
             master= self.history_frame,
+            row_count= lambda: len(self.history),
+            get_row= self.get_history_row,
             columns= self.display_columns,
             show= 'headings',
             style= 'Custom.Treeview'
@@ -278,10 +287,9 @@ class MetricsFrame(ctk.CTkFrame):
         # Add a vertical scrollbar to the frame
         scrollbar = ttk.Scrollbar(
             master= self.tree_view, 
-            orient= 'vertical', 
-            command= self.tree_view.yview
+            orient= 'vertical'
         )
-        self.tree_view.configure(yscroll= scrollbar.set)
+        self.tree_view.set_scrollbar(scrollbar)
         scrollbar.pack(side= 'right', fill= 'y')
 
         # Pack the Treeview widget inside the CTkScrollableFrame
@@ -328,6 +336,21 @@ class MetricsFrame(ctk.CTkFrame):
             pady= (0, 7)
         )
 
+        # Re-score button, its command is set by the main window which owns the model
+        self.rescore_button = ctk.CTkButton(
+            master= self.history_frame,
+            **common.button_kwargs,
+            text= 'Re-score'
+        )
+        self.rescore_button.pack(
+            fill= 'x',
+            expand= True,
+            side= 'left',
+            anchor= 's',
+            padx= (0, 7),
+            pady= (0, 7)
+        )
+
         # Clear all button
         self.clear_all_button = ctk.CTkButton(
             master= self.history_frame,
@@ -351,7 +374,7 @@ class MetricsFrame(ctk.CTkFrame):
             text_color= common.grey_color,
             text= 'Metrics to display:',
             font= (common.font, 12)
-        ).pack(padx= 7, pady= 7, side= 'left')
+        ).grid(row= 0, column= 0, rowspan= 2, padx= 7, pady= 7)
 
         # default arguments for checkbox
         cb_kwargs: dict[str, any] = {
@@ -364,19 +387,15 @@ class MetricsFrame(ctk.CTkFrame):
             'offvalue': 'off',
             'corner_radius': 5
         }
-        cb_packing_kwargs: dict[str, any] = {
-            'padx': 7,
-            'pady': 7,
-            'side': 'left',
-            'fill': 'x',
-            'expand': True
-        }
-
         # textvariables
         self.acc_score_cb_var = ctk.StringVar(value= 'on')
         self.confidence_cb_var = ctk.StringVar(value= 'on')
         self.confusion_matrix_cb_var = ctk.StringVar(value= 'on')
         self.count_plot_cb_var = ctk.StringVar(value= 'on')
+        self.window_acc_cb_var = ctk.StringVar(value= 'off')
+        self.per_class_cb_var = ctk.StringVar(value= 'off')
+        self.ewma_confidence_cb_var = ctk.StringVar(value= 'off')
+        self.rescore_cb_var = ctk.StringVar(value= 'off')
 
         # checkboxes
         self.acc_score_cb = ctk.CTkCheckBox(
@@ -385,7 +404,6 @@ class MetricsFrame(ctk.CTkFrame):
             variable= self.acc_score_cb_var,
             command= self.update_all_metrics
         )
-        self.acc_score_cb.pack(**cb_packing_kwargs)
 
         self.confidence_cb = ctk.CTkCheckBox(
             **cb_kwargs,
@@ -393,7 +411,6 @@ class MetricsFrame(ctk.CTkFrame):
             variable= self.confidence_cb_var,
             command= self.update_all_metrics
         )
-        self.confidence_cb.pack(**cb_packing_kwargs)
 
         self.confusion_matrix_cb = ctk.CTkCheckBox(
             **cb_kwargs,
@@ -401,7 +418,6 @@ class MetricsFrame(ctk.CTkFrame):
             variable= self.confusion_matrix_cb_var,
             command= self.update_all_metrics
         )
-        self.confusion_matrix_cb.pack(**cb_packing_kwargs)
         
         self.count_plot_cb = ctk.CTkCheckBox(
             **cb_kwargs,
@@ -409,23 +425,96 @@ class MetricsFrame(ctk.CTkFrame):
             variable= self.count_plot_cb_var,
             command= self.update_all_metrics
         )
-        self.count_plot_cb.pack(**cb_packing_kwargs)
+
+        self.window_acc_cb = ctk.CTkCheckBox(
+            **cb_kwargs,
+            text= 'Recent Accuracy',
+            variable= self.window_acc_cb_var,
+            command= self.update_all_metrics
+        )
+
+        self.per_class_cb = ctk.CTkCheckBox(
+            **cb_kwargs,
+            text= 'Per Digit P/R/F1',
+            variable= self.per_class_cb_var,
+            command= self.update_all_metrics
+        )
+
+        self.ewma_confidence_cb = ctk.CTkCheckBox(
+            **cb_kwargs,
+            text= 'Confidence EWMA',
+            variable= self.ewma_confidence_cb_var,
+            command= self.update_all_metrics
+        )
+
+        self.rescore_cb = ctk.CTkCheckBox(
+            **cb_kwargs,
+            text= 'Old V/S New',
+            variable= self.rescore_cb_var,
+            command= self.update_all_metrics
+        )
+
+        # two rows of four, one row of eight does not fit the default window width
+        checkboxes: list[ctk.CTkCheckBox] = [
+            self.acc_score_cb, self.confidence_cb, self.confusion_matrix_cb, self.count_plot_cb,
+            self.window_acc_cb, self.per_class_cb, self.ewma_confidence_cb, self.rescore_cb
+        ]
+
+        for index, checkbox in enumerate(checkboxes):
+            checkbox.grid(row= index // 4, column= 1 + index % 4, padx= 7, pady= 5, sticky= 'w')
+            self.checkbox_frame.columnconfigure(1 + index % 4, weight= 1)
+
+        self.checkbox_frame.rowconfigure((0, 1), weight= 1)
+
+        # checkbox variables by the name of their plot
+        self.metric_cb_vars: dict[str, ctk.StringVar] = {
+            'accuracy': self.acc_score_cb_var,
+            'confidence': self.confidence_cb_var,
+            'cm': self.confusion_matrix_cb_var,
+            'count': self.count_plot_cb_var,
+            'window_accuracy': self.window_acc_cb_var,
+            'per_class': self.per_class_cb_var,
+            'ewma_confidence': self.ewma_confidence_cb_var,
+            'rescore': self.rescore_cb_var
+        }
 
 
     def default_all_metrics_frame_layout(self, num_of_pred_left: int) -> None:
+        self.default_all_metrics_label.configure(
+            text= f'A minimum of 5 predictions are required to analyze and display meaningful metrics. Currently, there are not enough predictions in the history. Please make {num_of_pred_left} more predictions to unlock this feature.'
+        )
+        self.default_all_metrics_label.pack(
+            anchor= 'center', 
+            pady= 20
+        )
+
+
+    def create_all_metrics_widgets(self) -> None:
+        # all the widgets of all_metrics_frame are made once and only packed or unpacked afterwards
+        self.metric_plots: dict[str, MetricPlot] = {}
+        # the plots are laid out in a grid inside this frame, up to four in a row
+        self.plots_frame = ctk.CTkFrame(self.all_metrics_frame, fg_color= 'transparent')
+
         self.default_all_metrics_label = ctk.CTkLabel(
             master= self.all_metrics_frame,
             height= 300,
-            text= f'A minimum of 5 predictions are required to analyze and display meaningful metrics. Currently, there are not enough predictions in the history. Please make {num_of_pred_left} more predictions to unlock this feature.',
+            text= '',
             image= self.info_img,
             text_color= common.grey_color,
             font= (common.font, 12),
             wraplength= 400,
             compound= 'top'
         )
-        self.default_all_metrics_label.pack(
-            anchor= 'center', 
-            pady= 20
+
+        self.no_metrics_label = ctk.CTkLabel(
+            master= self.all_metrics_frame,
+            height= 300,
+            text= f'No metrics are selected to display, please select atleast one metric from the above checkboxes.',
+            image= self.info_img,
+            text_color= common.grey_color,
+            font= (common.font, 12),
+            wraplength= 400,
+            compound= 'top'
         )
 
 
@@ -448,7 +537,7 @@ class MetricsFrame(ctk.CTkFrame):
                 )
                 self.result_pred.focus_set()
                 self.pred_var.set('')
-                self.result_frame.update()
+                self.result_frame.update_idletasks()
 
                 self.result_pred.configure(width= 60)
 
@@ -474,53 +563,81 @@ class MetricsFrame(ctk.CTkFrame):
         self.correct_wrong_button.configure(state= 'disabled')
         self.correct_wrong_button_state = 'disabled'
         self.correct_wrong_button.set('')
-        self.result_frame.update()
+        self.result_frame.update_idletasks()
 
     
     def append_to_history(self) -> None:
         correct_number = int(self.pred_var.get())
-        index: int = len(self.history.index)
-
-        self.history.loc[index] = {
-            'original_image': self.original_image.copy(),
-            'Prediction': self.prediction,
-            'probabilities': self.probabilities,
-            'Correct Number': correct_number,
-            'Confidence (%)': int(round((self.probabilities.max()), 2) * 100),
-            'correctness': self.prediction == correct_number
-        }
+        confidence: int = int(round((self.probabilities.max()), 2) * 100)
 
-        y_true, y_pred = self.history['Correct Number'], self.history['Prediction']
+        # the accuracy up to this row, without going over the whole history again
+        acc_score: float = self.metrics.update(self.prediction, correct_number, confidence)
 
-        acc_score: float = accuracy_score(y_true, y_pred)
-        self.history.loc[index, 'acc_score'] = acc_score
+        index: int = self.history.append(
+            image= self.original_image,
+            prediction= self.prediction,
+            probabilities= self.probabilities,
+            correct_number= correct_number,
+            confidence= confidence,
+            acc_score= acc_score
+        )
 
+        # the row is journaled as the history keeps it, compressed images are not compressed twice
+        if self.journal is not None:
+            self.journal.append(self.history, index)
 
-    def insert_row_to_treeview(self) -> None:
-        self.default_history_label.pack_forget()
-        
-        # taking the row
-        sr_no: int = len(self.history) 
-        row = self.history.loc[sr_no - 1, self.display_columns[1:]]
+
+    def rebase_journal(self) -> None:
+        # after the whole history changed, the journal is rewritten from a snapshot on its own thread
+        if self.journal is not None:
+            self.journal.start_rebase(self.history)
+
+
+    def show_rescore_results(self, rows_per_second: float, cancelled: bool) -> None:
+        old_accuracy, new_accuracy, disagreement = compare_predictions(self.history)
+        num_changed: int = int(disagreement.sum() - np.trace(disagreement))
+
+        # showing the old v/s new plot
+        self.rescore_cb_var.set('on')
+        self.update_all_metrics()
+
+        self.statusbar.status.update(
+            f"{'Cancelled, re-scored' if cancelled else 'Re-scored'} {self.history.num_rescored} rows "
+            f'({rows_per_second:.0f} rows/s): accuracy {old_accuracy:.1%} -> {new_accuracy:.1%}, '
+            f'{num_changed} predictions changed'
+        )
+
+
+    def update_memory_status(self) -> None:
+        self.statusbar.memory.update(
+            f'{self.history.bytes_per_row() / 1024:.1f} KB/row ({self.history.image_mode}), '
+            f'{self.history.nbytes() / 1024 ** 2:.1f} MB'
+        )
+
+
+    def get_history_row(self, index: int) -> tuple[tuple, tuple[str, ...]]:
+        sr_no: int = index + 1
+        prediction: int = int(self.history.predictions[index])
+        correct_number: int = int(self.history.labels[index])
 
         # selecting tag
-        if not self.history.loc[sr_no - 1, 'correctness']:
+        if prediction != correct_number:
             tags = ('wrong',)
 
         elif sr_no % 2 == 0:
-            tags: tuple[str] = ('evenrow')
+            tags = ('evenrow',)
 
         else:
             tags = ('oddrow',)
 
-        # inserting to table
-        self.tree_view.insert(
-            parent= '',
-            index= 'end',
-            text= '',
-            values= (sr_no, row['Prediction'], row['Correct Number'], row['Confidence (%)']),
-            tags= tags
-        )
+        return (sr_no, prediction, correct_number, int(self.history.confidences[index])), tags
+
+
+    def insert_row_to_treeview(self) -> None:
+        self.default_history_label.pack_forget()
+
+        # the rows come from self.history, so refilling the visible items is enough
+        self.tree_view.refresh()
 
 
     def update_history(self, event: any = None) -> None:
@@ -542,6 +659,7 @@ class MetricsFrame(ctk.CTkFrame):
 
         # updating metrics 
         self.statusbar.status.update('Appended the prediction to history')
+        self.update_memory_status()
         self.update_all_metrics()
 
 
@@ -559,6 +677,11 @@ class MetricsFrame(ctk.CTkFrame):
         
 
     def clear_all_history(self, event: any = None) -> bool:
+        # the rows of the last session would come back once they are loaded
+        if self.journal_restoring:
+            self.statusbar.status.update('The last session is still being restored, please wait...')
+            return False
+
         if tmsg.askyesno(
             title= 'Clear all data', 
             message= 'All current data in history will be permanently removed and cannot be recovered. If you think the data might be useful, consider taking a backup using the Export feature before proceeding. Do you still want to continue?',
@@ -568,14 +691,17 @@ class MetricsFrame(ctk.CTkFrame):
             self.clear_treeview()
 
             # removing data from attributes
-            self.history.drop(self.history.index, inplace= True)
-            self.history.reset_index(drop= True, inplace= True)
+            self.history.clear()
+            self.rebase_journal()
+            self.update_memory_status()
+            self.metrics.reset()
             self.original_image = None
             self.probabilities = None
             self.prediction = None
 
             # loading default layout again
             self.load_data_button.pack_forget()
+            self.rescore_button.pack_forget()
             self.clear_all_button.pack_forget()
             self.default_history_label.pack(
                 anchor= 'center', 
@@ -591,6 +717,14 @@ class MetricsFrame(ctk.CTkFrame):
                 padx= 7,
                 pady= (0, 7)
             )
+            self.rescore_button.pack(
+                fill= 'x',
+                expand= True,
+                side= 'left',
+                anchor= 's',
+                padx= (0, 7),
+                pady= (0, 7)
+            )
             self.clear_all_button.pack(
                 fill= 'x',
                 expand= True,
@@ -602,8 +736,7 @@ class MetricsFrame(ctk.CTkFrame):
 
             self.clear_prediction()
 
-            common.clear_widgets(self.all_metrics_frame)
-            self.default_all_metrics_frame_layout(num_of_pred_left= 5)
+            self.update_all_metrics()
 
             self.statusbar.status.update('All history is cleared')
             
@@ -613,21 +746,17 @@ class MetricsFrame(ctk.CTkFrame):
 
         
     def clear_treeview(self):
-        # Get all items in the Treeview
-        for item in self.tree_view.get_children():
-            # Delete each item
-            self.tree_view.delete(item)
+        self.tree_view.clear()
 
     
     def get_index_of_selected_row(self) -> int | None:
-        selected_item: tuple[str, ...] = self.tree_view.selection()
-        self.tree_view.selection_remove(selected_item)
+        # the selected row is remembered by its index, so it stays selected while scrolled out of view
+        index: int | None = self.tree_view.pop_selected_index()
 
-        if not selected_item:
+        if index is None:
             self.statusbar.status.update('No row is selected in history, please select a row to load it...')
             return None
         
-        index: int = self.tree_view.item(selected_item)['values'][0] - 1
         return index
     
 
@@ -639,12 +768,10 @@ class MetricsFrame(ctk.CTkFrame):
         if index is None:
             return None
         
-        row: pd.Series = self.history.loc[index]
-
         # updating class attributes
-        self.original_image = row['original_image']
-        self.prediction = row['Prediction']
-        self.probabilities = row['probabilities']
+        self.original_image = self.history.get_image(index)
+        self.prediction = int(self.history.predictions[index])
+        self.probabilities = self.history.probabilities[index]
         
         self.update_all()
         self.correct_wrong_button.configure(state= 'disabled')
@@ -654,219 +781,81 @@ class MetricsFrame(ctk.CTkFrame):
 
     def bar_plot_from_proba(self) -> None:
         self.statusbar.status.update('Plotting probability distribution...')
-        # removing previous plot
-        common.clear_widgets(self.bar_frame)
-
-        # Processing probabilities
-        probas: common.NDArrayInt = (self.probabilities.round(2) * 100).astype(np.uint8)
-
-        # plotting probabilities
-        fig, ax = plt.subplots(figsize= (4, 2))
-        ax.bar(
-            x= range(10),
-            height= probas,
-            color= common.fg_color,
-            edgecolor= common.grey_color
-        )
-        ax.set_title('Probability Distribution')
-        ax.set_xlabel('Number')
-        ax.set_ylabel('Probability (%)')
-        ax.set_xticks(range(10))
-        ax.set_yticks(range(0, 101, 25))
-
-        fig.tight_layout()
-
-        # Setting to frame
-        canvas = FigureCanvasTkAgg(fig, master= self.bar_frame)  
-        canvas.draw()
-        canvas.get_tk_widget().pack(**common.plot_pack_kwargs)
-        plt.close(fig)
-
-
-    def plot_accuracy_trend(self, marker: bool) -> None:
-        # getting accuracy scores
-        acc_scores: common.NDArrayFloat = self.history['acc_score'].values
-        sr_no: common.NDArrayInt = (self.history.index + 1).values
-
-        # plotting accuracy scores
-        fig, ax = plt.subplots(figsize= (2.5, 2.5))
-
-        if marker:
-            ax.plot(sr_no, acc_scores, color= common.fg_color, marker= 'o')
-
-        else:
-            ax.plot(sr_no, acc_scores, color= common.fg_color)
-
-        ax.set_title('Accuracy Trend', fontsize= 10)
-        ax.set_xlabel('Serial Number')
-        ax.set_ylabel('Accuracy Score')
-        ax.set_yticks([0.0, 0.25, 0.50, 0.75, 1.0])
-        ax.set_ylim(0, 1.1)
-
-        # Set the x-axis to show only integer values
-        ax.xaxis.set_major_locator(MaxNLocator(integer=True, nbins= 5))
-
-        fig.tight_layout()
-
-        # Setting to frame
-        canvas = FigureCanvasTkAgg(fig, master= self.all_metrics_frame)  
-        canvas.draw()
-        canvas.get_tk_widget().pack(**common.plot_pack_kwargs)
-        plt.close(fig)
-
-
-    def plot_confidence_trend(self, marker: bool) -> None:
-        # getting confidence scores
-        confidences: common.NDArrayFloat = self.history['Confidence (%)'].values
-        sr_no: common.NDArrayInt = (self.history.index + 1).values
-
-        # plotting confidence scores
-        fig, ax = plt.subplots(figsize= (2.5, 2.5))
-
-        if marker:
-            ax.plot(sr_no, confidences, color= common.fg_color, marker= 'o')
-
-        else:
-            ax.plot(sr_no, confidences, color= common.fg_color)
-
-        ax.set_title('Confidence Trend', fontsize= 10)
-        ax.set_xlabel('Serial Number')
-        ax.set_ylabel('Confidence (%)')
-        ax.set_yticks([0, 25, 50, 75, 100])
-        ax.set_ylim(0, 110)
-
-        # Set the x-axis to show only integer values
-        ax.xaxis.set_major_locator(MaxNLocator(integer=True, nbins= 5))
-
-        fig.tight_layout()
-
-        # Setting to frame
-        canvas = FigureCanvasTkAgg(fig, master= self.all_metrics_frame)  
-        canvas.draw()
-        canvas.get_tk_widget().pack(**common.plot_pack_kwargs)
-        plt.close(fig)
-
-    
-    def plot_confusion_matrix(self) -> None:
-        # getting y_pred and y_true
-        y_pred: common.NDArrayInt = self.history['Prediction']
-        y_true: common.NDArrayInt = self.history['Correct Number']
-
-        # orange colormap
-        orange_cmap = plt.get_cmap('Oranges')
-
-        # plotting confusion matrix
-        fig, ax = plt.subplots(figsize= (2.5, 2.5))
-
-        ConfusionMatrixDisplay.from_predictions(
-            y_true= y_true,
-            y_pred= y_pred,
-            ax= ax,
-            cmap= orange_cmap,
-            colorbar= False,
-            labels= list(range(10))
-        )
-
-        ax.set_title('Confusion Matrix', fontsize= 10)
 
-        fig.tight_layout()
+        # the figure is made once, later predictions (live ones too) only change the bar heights
+        if self.bar_plot is None:
+            # removing previous plot
+            common.clear_widgets(self.bar_frame)
 
-        # Setting to frame
-        canvas = FigureCanvasTkAgg(fig, master= self.all_metrics_frame)  
-        canvas.draw()
-        canvas.get_tk_widget().pack(**common.plot_pack_kwargs)
-        plt.close(fig)
+            self.bar_plot = ProbabilityPlot(self.bar_frame, self.renderer)
+            self.bar_plot.widget.pack(**common.plot_pack_kwargs)
 
+        self.bar_plot.update_probabilities(self.probabilities)
 
-    def count_plot(self) -> None:
-        correctness_counts = self.history['correctness'].value_counts()
 
-        # bar plot
-        fig, ax = plt.subplots(figsize= (2.5, 2.5))
-        ax.bar(
-            x= ['Correct', 'Wrong'],
-            height= [correctness_counts.get(True, 0), correctness_counts.get(False, 0)],
-            color= common.fg_color,
-            edgecolor= common.grey_color,
-            width= 0.3
-        )
-
-        ax.set_title('Predictions', fontsize= 10)
-        ax.set_ylim(0, max(correctness_counts) + 1)
-        ax.yaxis.set_major_locator(MaxNLocator(integer=True, nbins= 5))
-
-        fig.tight_layout()
-
-        # Setting to frame
-        canvas = FigureCanvasTkAgg(fig, master= self.all_metrics_frame)  
-        canvas.draw()
-        canvas.get_tk_widget().pack(**common.plot_pack_kwargs)
-        plt.close(fig)
+    def update_all_metrics(self) -> None:
+        num_of_pred_left: int = 5 - self.metrics.count
 
+        # only packing and unpacking widgets here, the figures are never rebuilt
+        for plot in self.metric_plots.values():
+            plot.widget.grid_forget()
 
-    def update_all_metrics(self) -> None:
-        num_of_pred_left: int = 5 - len(self.history)
-        common.clear_widgets(self.all_metrics_frame)
+        self.plots_frame.pack_forget()
+        self.no_metrics_label.pack_forget()
 
         # returning if not enough data
         if num_of_pred_left > 0:
             self.default_all_metrics_frame_layout(num_of_pred_left)
             return None
 
+        self.default_all_metrics_label.pack_forget()
+
         # setting up marker requirement
-        marker_needed: bool = len(self.history) < 15
+        marker_needed: bool = self.metrics.count < 15
+
+        # updating plots according to selected checkboxes, hidden ones are updated once they are selected again
+        selected: list[str] = [name for name, var in self.metric_cb_vars.items() if var.get() == 'on']
 
-        # making plots according to selected checkboxes
-        if self.acc_score_cb_var.get() == 'on':
-            self.plot_accuracy_trend(marker= marker_needed)
+        # one row for up to four plots, otherwise two rows
+        num_rows: int = 1 if len(selected) <= 4 else 2
+        num_columns: int = -(-len(selected) // num_rows)
 
-        if self.confidence_cb_var.get() == 'on':
-            self.plot_confidence_trend(marker= marker_needed)
+        for index in range(8):
+            self.plots_frame.columnconfigure(index, weight= int(index < num_columns), uniform= 'plot')
+            self.plots_frame.rowconfigure(index, weight= int(index < num_rows), uniform= 'plot')
 
-        if self.confusion_matrix_cb_var.get() == 'on':
-            self.plot_confusion_matrix()
+        for index, name in enumerate(selected):
+            plot = self.get_metric_plot(name)
+            plot.update(self.history, self.metrics, marker_needed)
+            plot.widget.grid(row= index // num_columns, column= index % num_columns, padx= 7, pady= 7, sticky= 'nsew')
 
-        if self.count_plot_cb_var.get() == 'on':
-            self.count_plot()
+        if selected:
+            self.plots_frame.pack(fill= 'both', expand= True)
 
         # if none of the checkboxes was selected
-        if (
-            self.acc_score_cb_var.get() == 'off' and
-            self.confidence_cb_var.get() == 'off' and
-            self.confusion_matrix_cb_var.get() == 'off' and
-            self.count_plot_cb_var.get() == 'off'
-        ):
-            ctk.CTkLabel(
-            master= self.all_metrics_frame,
-            height= 300,
-            text= f'No metrics are selected to display, please select atleast one metric from the above checkboxes.',
-            image= self.info_img,
-            text_color= common.grey_color,
-            font= (common.font, 12),
-            wraplength= 400,
-            compound= 'top'
-        ).pack(
-            anchor= 'center', 
-            pady= 20
-        )
+        if not selected:
+            self.no_metrics_label.pack(
+                anchor= 'center', 
+                pady= 20
+            )
 
         self.statusbar.status.update('Updated all metrics')
 
 
+    def get_metric_plot(self, name: str) -> MetricPlot:
+        # figures are made the first time they are needed
+        if name not in self.metric_plots:
+            self.metric_plots[name] = METRIC_PLOTS[name](self.plots_frame, self.renderer)
+
+        return self.metric_plots[name]
+
+
     def checkbox_shortcut_callback(
             self, 
-            name: Literal['accuracy', 'confidence', 'cm', 'count']
+            name: Literal['accuracy', 'confidence', 'cm', 'count', 'window_accuracy', 'per_class', 'ewma_confidence', 'rescore']
         ) -> None:
-        # all stringvars
-        text_vars: dict[str, ctk.StringVar] = {
-            'accuracy': self.acc_score_cb_var,
-            'confidence': self.confidence_cb_var,
-            'cm': self.confusion_matrix_cb_var,
-            'count': self.count_plot_cb_var
-        }
-
         # selecting the one according to name
-        selected_var = text_vars[name]
+        selected_var = self.metric_cb_vars[name]
         current_value: str = selected_var.get()
 
         # deciding the changing value
@@ -877,37 +866,59 @@ class MetricsFrame(ctk.CTkFrame):
         self.update_all_metrics()
 
 
-    def append_dataframe_to_history(self, df: pd.DataFrame) -> None:
-        if self.clear_all_history():
-            self.history = df.copy(deep= True)
+    def extend_history(self, chunks: list[HistoryStore], merge: bool = False) -> int:
+        # rows coming in while importing, the metrics are updated row by row and the widgets once per call
+        # merging skips the rows that are already in the history, returns the number of rows added
+        start: int = len(self.history)
 
-            # removing default label
-            self.default_history_label.pack_forget()
+        for chunk in chunks:
+            if merge:
+                self.dedup_index.merge(self.history, chunk)
 
-            for index, row in df.iterrows():
-                if not self.history.loc[index, 'correctness']:
-                    tags = ('wrong',)
+            else:
+                self.history.extend(chunk)
 
-                elif (index + 1) % 2 == 0:
-                    tags: tuple[str] = ('evenrow')
+        num_rows: int = len(self.history) - start
 
-                else:
-                    tags = ('oddrow',)
+        if num_rows == 0:
+            return 0
 
-                # inserting to table
-                self.tree_view.insert(
-                    parent= '',
-                    index= 'end',
-                    text= '',
-                    values= (index + 1, row['Prediction'], row['Correct Number'], row['Confidence (%)']),
-                    tags= tags
-                )
+        # only the new rows go through the metrics, the accuracy column goes on from the one of this session
+        acc_scores = self.history.acc_scores
 
+        for index, (prediction, correct_number, confidence) in enumerate(zip(
+            self.history.predictions[start:].tolist(),
+            self.history.labels[start:].tolist(),
+            self.history.confidences[start:].tolist()
+        ), start):
+            acc_scores[index] = self.metrics.update(prediction, correct_number, confidence)
+
+        if self.journal is not None:
+            self.journal.append_rows(self.history, start, len(self.history))
+
+        self.insert_row_to_treeview()
+        self.update_memory_status()
+        self.update_all_metrics()
+
+        return num_rows
+
+
+    def restore_history(self, history: HistoryStore) -> None:
+        # used as is, without asking, rows predicted while it was loading are appended after it (and journaled)
+        predicted: HistoryStore = self.history
+        self.history = history
+        self.metrics = RunningMetrics.from_history(self.history)
+        self.clear_treeview()
+
+        if self.extend_history([predicted]) == 0:
+            if not self.history.empty:
+                self.insert_row_to_treeview()
+
+            self.update_memory_status()
             self.update_all_metrics()
-            self.statusbar.status.update('Successfully imported the data')
 
     
-    def update_all(self) -> None:
+    def update_all(self, flush: bool = True) -> None:
         # if the user click prediction again without clearing, then the correct and wrong button is stuck to previous state so setting it '' initially.
         self.correct_wrong_button.set('')
 
@@ -920,7 +931,11 @@ class MetricsFrame(ctk.CTkFrame):
             state= 'disabled', 
             border_color= common.grey_color
         )
-        self.update()
+
+        # only redrawing the widgets, input events are left to the mainloop so that drawing is not interrupted
+        # live predictions leave even that to the mainloop
+        if flush:
+            self.update_idletasks()
 
 
     def clear_prediction(self) -> None:
@@ -936,4 +951,4 @@ class MetricsFrame(ctk.CTkFrame):
             state= 'disabled', 
             border_color= common.grey_color
         )
-        self.update()
+        self.update_idletasks()
@@ -0,0 +1,84 @@
+import itertools
+import threading
+import numpy as np
+
+
+class PlotRenderer:
+    def __init__(self, master: any, *, poll_ms: int = 30) -> None:
+        # figures are drawn with Agg on one worker thread, the tk thread only swaps in the finished pixels
+        self.master = master
+        self.poll_ms = poll_ms
+        self.versions = itertools.count()
+
+        # only the latest job of every plot is kept, a newer one replaces the stale one
+        self.lock = threading.Lock()
+        self.has_jobs = threading.Event()
+        self.pending: dict[any, tuple[int, any, tuple[int, int]]] = {}
+        self.latest_versions: dict[any, int] = {}
+        self.finished: dict[any, np.ndarray] = {}
+
+        self.num_rendered: int = 0
+        self.num_cancelled: int = 0
+
+        self.running: bool = True
+        self.thread = threading.Thread(target= self.run, daemon= True)
+        self.thread.start()
+        self.master.after(self.poll_ms, self.poll)
+
+
+    def submit(self, plot: any, state: any, size: tuple[int, int]) -> None:
+        # called from the tk thread, state has to be a copy that the tk thread doesn't change anymore
+        with self.lock:
+            version: int = next(self.versions)
+
+            if plot in self.pending:
+                self.num_cancelled += 1
+
+            self.pending[plot] = (version, state, size)
+            self.latest_versions[plot] = version
+
+        self.has_jobs.set()
+
+
+    def stop(self) -> None:
+        self.running = False
+        self.has_jobs.set()
+
+
+    def run(self) -> None:
+        while self.running:
+            self.has_jobs.wait()
+
+            with self.lock:
+                if not self.pending:
+                    self.has_jobs.clear()
+                    continue
+
+                # oldest plot first, so that one busy plot doesn't starve the others
+                plot = next(iter(self.pending))
+                version, state, size = self.pending.pop(plot)
+
+            if not self.running:
+                return None
+
+            pixels: np.ndarray | None = plot.render(state, size)
+
+            with self.lock:
+                # a newer job came in while drawing, it will be drawn next and this one is thrown away
+                if self.latest_versions[plot] != version:
+                    self.num_cancelled += 1
+
+                elif pixels is not None:
+                    self.finished[plot] = pixels
+                    self.num_rendered += 1
+
+
+    def poll(self) -> None:
+        with self.lock:
+            finished, self.finished = self.finished, {}
+
+        for plot, pixels in finished.items():
+            plot.show(pixels)
+
+        if self.running:
+            self.master.after(self.poll_ms, self.poll)
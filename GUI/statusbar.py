@@ -43,6 +43,21 @@ class StatusBar(ctk.CTkFrame):
             main_text= 'Drawing Coordinates', 
             default_value= (0, 0)
         )
+        self.cache = StatusLabel(
+            master= self, 
+            main_text= 'Cache', 
+            default_value= '0 hits / 0 misses'
+        )
+        self.memory = StatusLabel(
+            master= self, 
+            main_text= 'History', 
+            default_value= '0.0 KB/row'
+        )
+        self.model = StatusLabel(
+            master= self, 
+            main_text= 'Model', 
+            default_value= 'Loading...'
+        )
 
 
     def create_shortcut_window(self, event: any = None) -> None:
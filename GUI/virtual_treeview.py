@@ -0,0 +1,188 @@
+import tkinter.font as tkfont
+from tkinter import ttk
+from typing import Callable
+
+
+class VirtualTreeview(ttk.Treeview):
+    def __init__(
+            self,
+            master: any,
+            *,
+            row_count: Callable[[], int],
+            get_row: Callable[[int], tuple[tuple, tuple[str, ...]]],
+            row_height: int | None = None,
+            heading_height: int = 25,
+            **kwargs
+        ) -> None:
+        super().__init__(master, **kwargs)
+
+        # the table only has as many items as fit on screen, they are refilled from the backing store on scrolling
+        self.row_count = row_count
+        self.get_row = get_row
+        # None reads it from the style, which follows the theme and the dpi scaling
+        self.fixed_row_height = row_height
+        self.row_height: int = row_height or self.style_row_height()
+        self.heading_height = heading_height
+
+        self.first_row: int = 0
+        self.visible_rows: int = 1
+        self.selected_index: int | None = None
+        self.scrollbar: ttk.Scrollbar | None = None
+
+        self.bind('<Configure>', self.on_resize)
+        self.bind('<<ThemeChanged>>', self.on_theme_changed)
+        self.bind('<<TreeviewSelect>>', self.on_select)
+        self.bind('<MouseWheel>', self.on_mousewheel)
+        self.bind('<Button-4>', lambda _: self.scroll_break(-3))
+        self.bind('<Button-5>', lambda _: self.scroll_break(3))
+        self.bind('<Up>', lambda _: self.move_selection(-1))
+        self.bind('<Down>', lambda _: self.move_selection(1))
+        self.bind('<Prior>', lambda _: self.scroll(-self.visible_rows))
+        self.bind('<Next>', lambda _: self.scroll(self.visible_rows))
+        self.bind('<Home>', lambda _: self.jump_to(0))
+        self.bind('<End>', lambda _: self.jump_to(self.row_count()))
+
+
+    def style_row_height(self) -> int:
+        # the rowheight of the style, themes that leave it unset use the line height of their font
+        style = ttk.Style(self)
+        style_name: str = str(self.cget('style')) or 'Treeview'
+        row_height = style.lookup(style_name, 'rowheight') or style.lookup('Treeview', 'rowheight')
+
+        if row_height:
+            return int(float(row_height))
+
+        font = style.lookup(style_name, 'font') or style.lookup('Treeview', 'font') or 'TkDefaultFont'
+        return tkfont.Font(self, font= font).metrics('linespace')
+
+
+    def on_theme_changed(self, event: any = None) -> None:
+        if self.fixed_row_height is None:
+            self.row_height = self.style_row_height()
+            self.on_resize_height(self.winfo_height())
+
+
+    def set_scrollbar(self, scrollbar: ttk.Scrollbar) -> None:
+        self.scrollbar = scrollbar
+        scrollbar.configure(command= self.yview_virtual)
+
+
+    def on_resize(self, event: any) -> None:
+        self.on_resize_height(event.height)
+
+
+    def on_resize_height(self, height: int) -> None:
+        visible_rows: int = max(1, (height - self.heading_height) // self.row_height)
+
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.refresh()
+
+
+    def refresh(self) -> None:
+        num_rows: int = self.row_count()
+        self.first_row = max(0, min(self.first_row, num_rows - self.visible_rows))
+        num_items: int = min(self.visible_rows, num_rows - self.first_row)
+
+        # adding or removing items only when the window size changes, otherwise the existing items are reused
+        items: tuple[str, ...] = self.get_children()
+
+        if len(items) > num_items:
+            self.delete(*items[num_items:])
+
+        for _ in range(num_items - len(items)):
+            self.insert(parent= '', index= 'end', text= '')
+
+        items = self.get_children()
+        selected: list[str] = []
+
+        for offset, item in enumerate(items):
+            index: int = self.first_row + offset
+            values, tags = self.get_row(index)
+            self.item(item, values= values, tags= tags)
+
+            if index == self.selected_index:
+                selected.append(item)
+
+        # keeping the selection on the same row, not on the same item
+        self.selection_set(selected)
+
+        if self.scrollbar is not None:
+            if num_rows == 0:
+                self.scrollbar.set(0, 1)
+
+            else:
+                self.scrollbar.set(self.first_row / num_rows, (self.first_row + num_items) / num_rows)
+
+
+    def clear(self) -> None:
+        self.first_row = 0
+        self.selected_index = None
+        self.refresh()
+
+
+    def jump_to(self, index: int) -> None:
+        self.first_row = index
+        self.refresh()
+
+
+    def scroll(self, num_rows: int) -> None:
+        self.jump_to(self.first_row + num_rows)
+
+
+    def yview_virtual(self, *args) -> None:
+        # same arguments tk passes to yview: ('moveto', fraction) or ('scroll', n, 'units' | 'pages')
+        match args:
+            case ('moveto', fraction):
+                self.jump_to(int(float(fraction) * self.row_count()))
+
+            case ('scroll', amount, 'pages'):
+                self.scroll(int(amount) * self.visible_rows)
+
+            case ('scroll', amount, _):
+                self.scroll(int(amount))
+
+
+    def on_mousewheel(self, event: any) -> str:
+        return self.scroll_break(-3 if event.delta > 0 else 3)
+
+
+    def scroll_break(self, num_rows: int) -> str:
+        self.scroll(num_rows)
+        # stopping the treeview's own scrolling, which would move the items out of sync with the scrollbar
+        return 'break'
+
+
+    def on_select(self, event: any = None) -> None:
+        items: tuple[str, ...] = self.selection()
+
+        if items:
+            self.selected_index = self.first_row + self.index(items[0])
+
+
+    def move_selection(self, step: int) -> str:
+        num_rows: int = self.row_count()
+
+        if num_rows == 0:
+            return 'break'
+
+        index: int = self.first_row if self.selected_index is None else self.selected_index + step
+        self.selected_index = max(0, min(index, num_rows - 1))
+
+        # scrolling just enough to keep the selected row on screen
+        if self.selected_index < self.first_row:
+            self.first_row = self.selected_index
+
+        elif self.selected_index >= self.first_row + self.visible_rows:
+            self.first_row = self.selected_index - self.visible_rows + 1
+
+        self.refresh()
+        # stopping the default handling, which only knows about the items on screen
+        return 'break'
+
+
+    def pop_selected_index(self) -> int | None:
+        index: int | None = self.selected_index
+        self.selected_index = None
+        self.selection_set([])
+        return index
@@ -0,0 +1,154 @@
+import argparse
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from PIL import Image
+from typing import Iterator
+from utils.cache import CachedEngine
+from utils.datasets import IMAGE_SUFFIXES
+from utils.inference import BACKENDS, load_engine
+from utils.preprocess import new_input_buffer, process_arrays, process_images
+
+
+def iter_image_dir(
+    directory: Path,
+    batch_size: int,
+    invert: bool
+) -> Iterator[tuple[list[str], np.ndarray]]:
+    # sorting so that the output order is stable between runs
+    files: list[Path] = sorted(
+        path for path in directory.rglob('*')
+        if path.suffix.lower() in IMAGE_SUFFIXES
+    )
+
+    # every batch is written into the same buffer, it is consumed before the next one is made
+    buffer = new_input_buffer(batch_size)
+
+    for start in range(0, len(files), batch_size):
+        chunk: list[Path] = files[start: start + batch_size]
+        images: list[Image.Image] = []
+
+        for path in chunk:
+            with Image.open(path) as image:
+                images.append(image.convert('L'))
+
+        yield [str(path.relative_to(directory)) for path in chunk], process_images(images, invert= invert, out= buffer)
+
+
+def iter_npz(
+    file_path: Path,
+    batch_size: int,
+    invert: bool,
+    key: str | None
+) -> Iterator[tuple[list[str], np.ndarray]]:
+    with np.load(file_path) as data:
+        # taking the first array if no key is given
+        images: np.ndarray = data[key if key is not None else data.files[0]]
+
+    # accepting (n, h, w) and (n, h, w, 1)
+    if images.ndim == 4:
+        images = images[..., 0]
+
+    buffer = new_input_buffer(batch_size)
+
+    for start in range(0, len(images), batch_size):
+        chunk: np.ndarray = images[start: start + batch_size]
+        names: list[str] = [str(index) for index in range(start, start + len(chunk))]
+
+        yield names, process_arrays(chunk, invert= invert, out= buffer)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description= 'Classify a directory of digit images or an .npz of arrays without the GUI.'
+    )
+    parser.add_argument('input', type= Path, help= 'directory of images or an .npz file')
+    parser.add_argument('-o', '--output', type= Path, default= Path('predictions.csv'), help= 'csv file for predictions and probabilities')
+    parser.add_argument('--timings', type= Path, default= None, help= 'csv file for per-batch timings')
+    parser.add_argument('--backend', choices= list(BACKENDS), default= 'keras', help= 'runtime used for predictions')
+    parser.add_argument('--model', default= None, help= 'path of the model (default: the one of the backend)')
+    parser.add_argument('--batch-size', type= int, default= 1024)
+    parser.add_argument('--cache-size', type= int, default= 0, help= 'number of predictions cached so that duplicate inputs skip the model, 0 turns it off')
+    parser.add_argument('--key', default= None, help= 'array name inside the .npz file (default: first array)')
+    parser.add_argument(
+        '--mnist-style',
+        action= 'store_true',
+        help= 'inputs are already white digits on black background, so they are not inverted'
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    invert: bool = not args.mnist_style
+
+    if args.input.is_dir():
+        batches = iter_image_dir(args.input, args.batch_size, invert)
+
+    elif args.input.suffix == '.npz':
+        batches = iter_npz(args.input, args.batch_size, invert, args.key)
+
+    else:
+        print(f"'{args.input}' is neither a directory nor an .npz file", file= sys.stderr)
+        return 1
+
+    engine = load_engine(args.backend, args.model)
+
+    if args.cache_size > 0:
+        engine = CachedEngine(engine, capacity= args.cache_size)
+
+    all_names: list[str] = []
+    all_probas: list[np.ndarray] = []
+    timings: list[dict[str, float | int]] = []
+
+    # the preprocessing time is measured around the generator, which loads and processes the next batch
+    start_time: float = time.perf_counter()
+
+    for batch_no, (names, batch) in enumerate(batches):
+        preprocess_time: float = time.perf_counter() - start_time
+
+        predict_start: float = time.perf_counter()
+        probas = engine.predict_batch(batch)
+        predict_time: float = time.perf_counter() - predict_start
+
+        all_names.extend(names)
+        all_probas.append(probas)
+        timings.append({
+            'batch': batch_no,
+            'size': len(batch),
+            'preprocess_s': preprocess_time,
+            'predict_s': predict_time,
+            'samples_per_s': len(batch) / predict_time if predict_time > 0 else float('inf')
+        })
+        print(f'batch {batch_no}: {len(batch)} samples, preprocess {preprocess_time:.3f}s, predict {predict_time:.3f}s')
+
+        start_time = time.perf_counter()
+
+    if not all_probas:
+        print(f"No images found in '{args.input}'", file= sys.stderr)
+        return 1
+
+    probas = np.concatenate(all_probas)
+
+    # writing predictions
+    result = pd.DataFrame(probas, columns= [f'p{digit}' for digit in range(10)])
+    result.insert(0, 'source', all_names)
+    result.insert(1, 'Prediction', probas.argmax(axis= 1))
+    result.insert(2, 'Confidence (%)', (probas.max(axis= 1) * 100).round(2))
+    result.to_csv(args.output, index= False)
+
+    if args.timings is not None:
+        pd.DataFrame(timings).to_csv(args.timings, index= False)
+
+    total_predict: float = sum(timing['predict_s'] for timing in timings)
+    print(f"Classified {len(probas)} samples in {total_predict:.3f}s of model time, predictions written to '{args.output}'")
+
+    if isinstance(engine, CachedEngine):
+        print(f'Cache: {engine.stats()}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from typing import Callable
+from utils.inference import MODEL_PATH, INPUT_SHAPE, BACKENDS, KerasEngine, load_engine
+
+
+def measure_latency(
+    func: Callable[[np.ndarray], any],
+    np_img: np.ndarray,
+    *,
+    runs: int,
+    warmup: int = 3
+) -> dict[str, float]:
+    for _ in range(warmup):
+        func(np_img)
+
+    latencies: list[float] = []
+
+    for _ in range(runs):
+        start_time: float = time.perf_counter()
+        func(np_img)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+
+    return {
+        'mean_ms': float(np.mean(latencies)),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95))
+    }
+
+
+def print_report(results: dict[str, dict[str, float]], baseline: str) -> None:
+    print(f"{'path':<24}{'mean (ms)':>12}{'p50 (ms)':>12}{'p95 (ms)':>12}{'speedup':>10}")
+
+    for name, stats in results.items():
+        speedup: float = results[baseline]['mean_ms'] / stats['mean_ms']
+        print(f"{name:<24}{stats['mean_ms']:>12.3f}{stats['p50_ms']:>12.3f}{stats['p95_ms']:>12.3f}{speedup:>9.1f}x")
+
+
+def check_parity(
+    reference: KerasEngine,
+    candidate: any,
+    batch: np.ndarray,
+    *,
+    tolerance: float
+) -> bool:
+    expected = reference.predict_batch(batch)
+    actual = candidate.predict_batch(batch)
+
+    max_diff: float = float(np.abs(expected - actual).max())
+    agreement: float = float((expected.argmax(axis= 1) == actual.argmax(axis= 1)).mean())
+    print(f'max abs difference {max_diff:.2e} (tolerance {tolerance:.0e}), argmax agreement {agreement:.2%}')
+
+    return max_diff <= tolerance
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description= 'Compare the single-sample latency of the inference paths.')
+    parser.add_argument('--model', default= MODEL_PATH, help= 'path of the keras model')
+    parser.add_argument('--runs', type= int, default= 100)
+    parser.add_argument(
+        '--parity',
+        action= 'store_true',
+        help= 'only check that the numpy engine matches keras, exits with 1 if it does not'
+    )
+    parser.add_argument('--tolerance', type= float, default= 1e-4, help= 'largest allowed probability difference for --parity')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    # a random drawing, the values don't matter for timing
+    rng = np.random.default_rng(42)
+    np_img = rng.random((1, *INPUT_SHAPE)).astype(np.float32)
+
+    engine = KerasEngine(args.model)
+
+    if args.parity:
+        batch = rng.random((256, *INPUT_SHAPE)).astype(np.float32)
+        return 0 if check_parity(engine, load_engine('numpy', args.model), batch, tolerance= args.tolerance) else 1
+
+    results: dict[str, dict[str, float]] = {
+        'model.predict': measure_latency(engine.predict_legacy, np_img, runs= args.runs),
+        'traced tf.function': measure_latency(engine.predict, np_img, runs= args.runs)
+    }
+
+    # the other backends are measured only if their model files have been made
+    for backend, (_, model_path) in BACKENDS.items():
+        if backend == 'keras':
+            continue
+
+        if not os.path.exists(model_path):
+            print(f"Skipping '{backend}', run convert_tflite.py to create '{model_path}'")
+            continue
+
+        backend_engine = load_engine(backend)
+        results[backend] = measure_latency(backend_engine.predict, np_img, runs= args.runs)
+        print(f"'{backend}' model size: {os.path.getsize(model_path) / 1024:.1f} KiB")
+
+    print(f"'keras' model size: {os.path.getsize(args.model) / 1024:.1f} KiB")
+    print_report(results, baseline= 'model.predict')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
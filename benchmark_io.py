@@ -0,0 +1,111 @@
+import argparse
+import pickle
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+from typing import Callable
+from utils.columnar import META_FILE, load_columnar, save_columnar
+from utils.export import FRAME_SIZE, pickle_header
+from utils.history import IMAGE_MODES, HistoryStore, ImageMode
+from utils.import_ import ColumnarImporter, StreamingImporter
+
+
+def make_history(num_rows: int, seed: int = 0) -> HistoryStore:
+    # canvas-like images, white background with a few black strokes
+    rng = np.random.default_rng(seed)
+    history = HistoryStore(capacity= num_rows)
+    image = np.full((280, 280), 255, dtype= np.uint8)
+
+    for index in range(num_rows):
+        image[:] = 255
+        x, y = rng.integers(40, 200, size= 2)
+        image[y: y + 60, x: x + 20] = 0
+
+        probabilities = rng.dirichlet(np.ones(10)).astype(np.float32)
+        history.append(
+            image= image,
+            prediction= int(probabilities.argmax()),
+            probabilities= probabilities,
+            correct_number= int(rng.integers(10)),
+            confidence= int(probabilities.max() * 100),
+            acc_score= 0.5
+        )
+
+    return history
+
+
+def timed(func: Callable[[], any]) -> tuple[any, float]:
+    start_time: float = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start_time
+
+
+def export_pickle(history: HistoryStore, path: Path) -> None:
+    # same steps as utils/export.py, the header then one frame per FRAME_SIZE rows
+    with open(path, 'wb') as file:
+        pickle.dump(pickle_header(len(history)), file)
+
+        for start in range(0, len(history), FRAME_SIZE):
+            pickle.dump(history.rows(start, start + FRAME_SIZE).to_dataframe(), file)
+
+
+def import_with(importer: StreamingImporter, image_mode: ImageMode) -> HistoryStore:
+    # the importer the app uses, run on this thread, with its chunks copied into a history like MetricsFrame.extend_history
+    history = HistoryStore(image_mode= image_mode)
+    importer.run()
+
+    if importer.error is not None:
+        raise importer.error
+
+    for chunk in importer.take_chunks():
+        history.extend(chunk)
+
+    return history
+
+
+def directory_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.iterdir())
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description= 'Compare exporting and importing the history as a pickle and as a history directory.')
+    parser.add_argument('--rows', type= int, default= 5000, help= 'number of synthetic history rows')
+    parser.add_argument('--image-mode', choices= IMAGE_MODES, default= 'compressed', help= 'image mode of the importing session')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    history = make_history(args.rows)
+    print(f'{args.rows} rows, {history.nbytes() / 1024 ** 2:.1f} MB in memory')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_path = Path(tmp_dir) / 'data.pkl'
+        columnar_path = Path(tmp_dir) / 'data.history'
+
+        _, pickle_export_time = timed(lambda: export_pickle(history, pickle_path))
+        pickle_history, pickle_import_time = timed(
+            lambda: import_with(StreamingImporter(str(pickle_path), image_mode= args.image_mode), args.image_mode)
+        )
+
+        _, columnar_export_time = timed(lambda: save_columnar(history, columnar_path))
+        columnar_history, columnar_import_time = timed(
+            lambda: import_with(ColumnarImporter(str(columnar_path / META_FILE), image_mode= args.image_mode), args.image_mode)
+        )
+
+        # only opening the directory, which is what reading a few rows of it costs
+        mapped_history, open_time = timed(lambda: load_columnar(columnar_path))
+        _, first_view_time = timed(lambda: mapped_history.get_image(args.rows // 2))
+
+        assert np.array_equal(pickle_history.labels, columnar_history.labels)
+        assert np.array_equal(np.asarray(columnar_history.get_image(0)), np.asarray(history.get_image(0)))
+
+        print(f"importing into a '{args.image_mode}' session")
+        print(f"{'format':<12}{'export (s)':>12}{'import (s)':>12}{'size (MB)':>12}")
+        print(f"{'pickle':<12}{pickle_export_time:>12.3f}{pickle_import_time:>12.3f}{pickle_path.stat().st_size / 1024 ** 2:>12.1f}")
+        print(f"{'columnar':<12}{columnar_export_time:>12.3f}{columnar_import_time:>12.3f}{directory_size(columnar_path) / 1024 ** 2:>12.1f}")
+        print(f'opening the history directory with memory mapped images took {open_time * 1000:.2f} ms, viewing one row {first_view_time * 1000:.2f} ms')
+
+        # releasing the memory map before the directory is removed
+        del mapped_history
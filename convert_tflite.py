@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from typing import Iterator
+from utils.inference import MODEL_PATH, TFLITE_FP16_PATH, TFLITE_INT8_PATH
+
+
+def load_representative_set(npz_path: Path | None, num_samples: int) -> np.ndarray:
+    # calibrating on the training digits, normalized the same way as the notebook
+    if npz_path is None:
+        (X_train, _), _ = tf.keras.datasets.mnist.load_data()
+
+    else:
+        with np.load(npz_path) as data:
+            X_train = data[data.files[0]]
+
+    rng = np.random.default_rng(42)
+    indices = rng.choice(len(X_train), size= min(num_samples, len(X_train)), replace= False)
+
+    return (X_train[indices] / 255).astype(np.float32).reshape(-1, 28, 28, 1)
+
+
+def convert_fp16(model: tf.keras.Model) -> bytes:
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+
+def convert_int8(model: tf.keras.Model, representative_set: np.ndarray) -> bytes:
+    def representative_dataset() -> Iterator[list[np.ndarray]]:
+        for sample in representative_set:
+            yield [sample[np.newaxis]]
+
+    # full integer quantization, including the input and output tensors
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description= 'Convert the keras model into float16 and int8 TFLite flatbuffers.')
+    parser.add_argument('--model', default= MODEL_PATH, help= 'path of the keras model')
+    parser.add_argument('--fp16-output', default= TFLITE_FP16_PATH)
+    parser.add_argument('--int8-output', default= TFLITE_INT8_PATH)
+    parser.add_argument('--calibration', type= Path, default= None, help= '.npz of 28x28 uint8 digits to calibrate on (default: MNIST training set)')
+    parser.add_argument('--num-samples', type= int, default= 500, help= 'size of the representative set')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    model = tf.keras.models.load_model(args.model)
+
+    flatbuffers: dict[str, bytes] = {
+        args.fp16_output: convert_fp16(model),
+        args.int8_output: convert_int8(model, load_representative_set(args.calibration, args.num_samples))
+    }
+
+    original_size: int = os.path.getsize(args.model)
+    print(f"{args.model}: {original_size / 1024:.1f} KiB")
+
+    for path, flatbuffer in flatbuffers.items():
+        Path(path).write_bytes(flatbuffer)
+        print(f"{path}: {len(flatbuffer) / 1024:.1f} KiB ({original_size / len(flatbuffer):.1f}x smaller)")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
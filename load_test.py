@@ -0,0 +1,90 @@
+import argparse
+import sys
+import threading
+import time
+import urllib.request
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from serve import make_server
+from utils.inference import BACKENDS, load_engine
+
+
+def send_request(url: str, body: bytes) -> None:
+    request = urllib.request.Request(
+        f'{url}/predict?invert=0',
+        data= body,
+        headers= {'Content-Type': 'application/octet-stream'}
+    )
+
+    with urllib.request.urlopen(request) as response:
+        response.read()
+
+
+def run_load(url: str, *, num_requests: int, concurrency: int) -> float:
+    # random 28x28 digits, the values don't matter for throughput
+    rng = np.random.default_rng(42)
+    bodies: list[bytes] = [
+        rng.integers(0, 256, size= 784, dtype= np.uint8).tobytes()
+        for _ in range(min(num_requests, 256))
+    ]
+
+    start_time: float = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers= concurrency) as executor:
+        for future in [executor.submit(send_request, url, bodies[index % len(bodies)]) for index in range(num_requests)]:
+            future.result()
+
+    return num_requests / (time.perf_counter() - start_time)
+
+
+def benchmark_in_process(args: argparse.Namespace) -> None:
+    engine = load_engine(args.backend, args.model)
+    results: dict[str, tuple[float, dict[str, float | int]]] = {}
+
+    # the same engine behind a server that calls the model once per request, then one that batches
+    for name, max_batch_size in [('one request per call', 1), (f'micro-batching (<= {args.max_batch_size})', args.max_batch_size)]:
+        server = make_server(engine, port= 0, max_batch_size= max_batch_size, max_wait_ms= args.max_wait_ms)
+        thread = threading.Thread(target= server.serve_forever, daemon= True)
+        thread.start()
+
+        url: str = f'http://127.0.0.1:{server.server_address[1]}'
+        throughput: float = run_load(url, num_requests= args.requests, concurrency= args.concurrency)
+        results[name] = (throughput, server.batcher.stats())
+
+        server.shutdown()
+        server.batcher.stop()
+        server.server_close()
+
+    baseline: float = results['one request per call'][0]
+    print(f"{'mode':<32}{'requests/s':>12}{'mean batch':>12}{'max queue':>11}{'speedup':>10}")
+
+    for name, (throughput, stats) in results.items():
+        print(f"{name:<32}{throughput:>12.1f}{stats['mean_batch_size']:>12.1f}{stats['max_queue_depth']:>11}{throughput / baseline:>9.1f}x")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description= 'Measure the throughput of the inference service with and without batching.')
+    parser.add_argument('--url', default= None, help= 'load an already running server instead of comparing the two modes in-process')
+    parser.add_argument('--requests', type= int, default= 2000)
+    parser.add_argument('--concurrency', type= int, default= 32)
+    parser.add_argument('--backend', choices= list(BACKENDS), default= 'keras', help= 'runtime used for predictions')
+    parser.add_argument('--model', default= None, help= 'path of the model (default: the one of the backend)')
+    parser.add_argument('--max-batch-size', type= int, default= 64)
+    parser.add_argument('--max-wait-ms', type= float, default= 5.0)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    if args.url is not None:
+        throughput: float = run_load(args.url.rstrip('/'), num_requests= args.requests, concurrency= args.concurrency)
+        print(f'{throughput:.1f} requests/s')
+        return 0
+
+    benchmark_in_process(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,22 +1,43 @@
 import customtkinter as ctk
 from PIL import ImageTk
-import tensorflow as tf
 import matplotlib.pyplot as plt
+import argparse
 import sys
+import threading
+import time
 import tkinter.messagebox as tmsg
 from pathlib import Path
 from GUI.draw_frame import DrawFrame
 from GUI.metrics_frame import MetricsFrame
 from GUI.statusbar import StatusBar
-from utils.common import NDArrayFloat
-from utils.export import export_data
-from utils.import_ import import_data
+from utils.common import NDArrayFloat, NDArrayFloat32
+from utils.export import Exporter, ask_export_path
+from utils.import_ import StreamingImporter, import_data
+from utils.inference import BACKENDS, EngineLoader
+from utils.live import LivePredictor
+from utils.cache import CachedEngine
+from utils.history import IMAGE_MODES, HistoryStore
+from utils.journal import Journal, JournalRestorer
+from utils.rescore import Rescorer
 
 
 class MainWindow(ctk.CTk):
-    def __init__(self) -> None:
+    def __init__(
+            self, 
+            backend: str = 'keras', 
+            live_interval_ms: int = 100,
+            cache_size: int = 1024,
+            image_mode: str = 'compressed',
+            journal_dir: str | None = 'journal'
+        ) -> None:
+        launch_time: float = time.perf_counter()
         super().__init__()
 
+        # for measuring time to first paint and time to first prediction
+        self.launch_time = launch_time
+        self.first_paint_time: float | None = None
+        self.first_prediction_time: float | None = None
+
         # setting some basic things
         ctk.set_appearance_mode('light')
 
@@ -27,8 +48,30 @@ class MainWindow(ctk.CTk):
         self.wm_iconbitmap()
         self.iconphoto(False, self.imagepath)
 
-        # loading model
-        self.model = tf.keras.models.load_model('kaggle/working/handwritten_digit_rec.keras')
+        # loading model in the background so that the window shows up right away,
+        # the engine is traced and warmed up before the predict button can be enabled
+        self.backend = backend
+        self.engine = None
+        self.predict_pending: bool = False
+        self.cache_size = cache_size
+        self.engine_loader = EngineLoader(backend)
+
+        # live prediction runs on a worker thread, the lock keeps it and the Predict button off the engine at the same time
+        self.engine_lock = threading.Lock()
+        self.live_interval_ms = live_interval_ms
+        self.live_predictor: LivePredictor | None = None
+        # id of the scheduled poll_live_results, so toggling never starts a second poll loop
+        self.live_poll_id: str | None = None
+        # re-scoring the history with the current model, also on a worker thread
+        self.rescorer: Rescorer | None = None
+        # pickles are imported on a worker thread too, merged into the history or replacing it
+        self.importer: StreamingImporter | None = None
+        self.import_merge: bool = False
+        self.num_imported_rows: int = 0
+        # and exports are written from a snapshot on another worker thread
+        self.exporter: Exporter | None = None
+        # the last session is loaded from the journal on a worker thread as well
+        self.journal_restorer: JournalRestorer | None = None
 
         # status bar
         self.statusbar = StatusBar(
@@ -47,6 +90,7 @@ class MainWindow(ctk.CTk):
         self.metrics_frame = MetricsFrame(
             self, 
             statusbar= self.statusbar,
+            image_mode= image_mode,
             corner_radius= 15
         )
         self.metrics_frame.pack(
@@ -78,9 +122,16 @@ class MainWindow(ctk.CTk):
         self.draw_frame.predict_button.configure(command= self.predict)
         self.draw_frame.export_button.configure(command= self.export)
         self.draw_frame.import_button.configure(command= self.import_)
+        self.draw_frame.live_switch.configure(command= self.toggle_live)
+        self.draw_frame.canvas.bind('<B1-Motion>', self.on_draw, add= '+')
 
         # configuring metrics_frame
         self.metrics_frame.load_data_button.configure(command= self.load_data_from_history)
+        self.metrics_frame.rescore_button.configure(command= self.rescore_history)
+
+        # the history of the last session is restored and every new prediction is journaled
+        if journal_dir is not None:
+            self.open_journal(journal_dir)
 
         # Bind the close event to the on_closing function
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -91,17 +142,24 @@ class MainWindow(ctk.CTk):
         self.bind('<Control-Delete>', self.clear)
         self.bind('<Control-s>', self.export)
         self.bind('<Control-o>', self.import_)
+        self.bind('<Control-Shift-O>', lambda _: self.import_(folder= True))
         self.bind('<Control-period>', self.statusbar.create_shortcut_window)
+        self.bind('<Control-l>', self.toggle_live_shortcut)
 
         # History
         self.bind('<Control-Shift-L>', self.load_data_from_history)
         self.bind('<Control-Shift-T>', self.metrics_frame.clear_all_history)
+        self.bind('<Control-Shift-R>', self.rescore_history)
 
         # Metrics toggels
         self.bind('<Control-m><Key-1>', lambda _: self.metrics_frame.checkbox_shortcut_callback(name= 'accuracy'))
         self.bind('<Control-m><Key-2>', lambda _: self.metrics_frame.checkbox_shortcut_callback(name= 'confidence'))
         self.bind('<Control-m><Key-3>', lambda _: self.metrics_frame.checkbox_shortcut_callback(name= 'cm'))
         self.bind('<Control-m><Key-4>', lambda _: self.metrics_frame.checkbox_shortcut_callback(name= 'count'))
+        self.bind('<Control-m><Key-5>', lambda _: self.metrics_frame.checkbox_shortcut_callback(name= 'window_accuracy'))
+        self.bind('<Control-m><Key-6>', lambda _: self.metrics_frame.checkbox_shortcut_callback(name= 'per_class'))
+        self.bind('<Control-m><Key-7>', lambda _: self.metrics_frame.checkbox_shortcut_callback(name= 'ewma_confidence'))
+        self.bind('<Control-m><Key-8>', lambda _: self.metrics_frame.checkbox_shortcut_callback(name= 'rescore'))
 
         # Correction actions
         self.bind('<Control-Shift-C>', lambda _: self.metrics_frame.correct_wrong_callback(value= 'Correct'))
@@ -109,10 +167,91 @@ class MainWindow(ctk.CTk):
         self.bind('<Control-Shift-S>', self.metrics_frame.update_history)
 
         # updating status
-        self.statusbar.status.update('Program loaded successfully')
+        self.statusbar.status.update('Program loaded, waiting for the model...')
+        self.after_idle(self.on_first_paint)
+        self.after(100, self.check_engine)
+
+
+    def open_journal(self, journal_dir: str) -> None:
+        history: HistoryStore = self.metrics_frame.history
+        journal = Journal(journal_dir, image_mode= history.image_mode, image_shape= history.image_shape)
+
+        self.journal_restorer = JournalRestorer(journal, history.image_mode)
+        self.journal_restorer.start()
+        self.metrics_frame.journal_restoring = True
+        self.after(100, self.poll_journal)
+
+
+    def poll_journal(self) -> None:
+        restorer: JournalRestorer = self.journal_restorer
+
+        if not restorer.done.is_set():
+            self.statusbar.status.update(f'Restoring the last session, {len(restorer.history)} rows...')
+            self.after(100, self.poll_journal)
+            return None
+
+        self.journal_restorer = None
+        self.metrics_frame.journal_restoring = False
+
+        if restorer.error is not None:
+            tmsg.showerror(
+                title= 'Error while opening the journal',
+                message= f'{restorer.error}\n\nThe predictions of this session will not be saved to the journal.'
+            )
+            return None
+
+        # predictions made while it was loading are journaled now, after the restored rows
+        self.metrics_frame.journal = restorer.journal
+        num_restored: int = len(restorer.history)
+        self.metrics_frame.restore_history(restorer.history)
+
+        if num_restored:
+            self.statusbar.status.update(f'Restored {num_restored} rows from the journal in {restorer.elapsed_time:.2f}s')
+
+        else:
+            self.statusbar.status.update('Nothing to restore from the journal')
+
+
+    def on_first_paint(self) -> None:
+        self.first_paint_time = time.perf_counter() - self.launch_time
+
+
+    def check_engine(self) -> None:
+        # tkinter is not thread safe, so the loader thread is polled from the mainloop
+        if not self.engine_loader.ready.is_set():
+            self.statusbar.model.update(f'Loading {self.backend}... {self.engine_loader.elapsed():.1f}s')
+            self.after(100, self.check_engine)
+            return None
+
+        if self.engine_loader.error is not None:
+            self.statusbar.model.update('Failed to load')
+            tmsg.showerror(
+                title= 'Error while loading model',
+                message= str(self.engine_loader.error)
+            )
+            return None
+
+        # repeated inputs (predicting twice, noise back to 0) are answered from the cache
+        self.engine = CachedEngine(self.engine_loader.engine, capacity= self.cache_size)
+        self.draw_frame.set_engine_ready()
+        self.statusbar.model.update(f'{self.backend} ({self.engine_loader.load_time:.1f}s)')
+        self.statusbar.status.update(f'Model loaded, window was shown {self.first_paint_time or 0:.2f}s after launch')
+
+        # running the prediction that was requested while loading
+        if self.predict_pending:
+            self.predict_pending = False
+            self.predict()
 
 
     def predict(self, event: any = None) -> None:
+        # queueing the prediction if the model is still loading
+        if self.engine is None:
+            if self.draw_frame.has_drawing:
+                self.predict_pending = True
+                self.statusbar.status.update('Model is still loading, the prediction will run once it is ready...')
+
+            return None
+
         # if button is disabled then preventing shortcut key to work
         if self.draw_frame.predict_button.cget('state') == 'disabled':
             return None
@@ -120,10 +259,13 @@ class MainWindow(ctk.CTk):
         self.statusbar.status.update('Predicting...')
 
         # processing digit
-        np_img: NDArrayFloat = self.draw_frame.process_digit()
+        np_img: NDArrayFloat32 = self.draw_frame.process_digit()
 
         # predicting
-        probas: NDArrayFloat = self.model.predict(np_img)[0]
+        with self.engine_lock:
+            probas: NDArrayFloat = self.engine.predict(np_img)
+
+        self.statusbar.cache.update(self.engine.stats())
 
         # setting attributes of MetricsFrame class
         self.metrics_frame.original_image = self.draw_frame.draw_image
@@ -131,7 +273,76 @@ class MainWindow(ctk.CTk):
         self.metrics_frame.prediction = probas.argmax()
 
         self.metrics_frame.update_all()
-        self.statusbar.status.update('Prediction completed')
+
+        if self.first_prediction_time is None:
+            self.first_prediction_time = time.perf_counter() - self.launch_time
+            self.statusbar.status.update(f'Prediction completed, first prediction {self.first_prediction_time:.2f}s after launch')
+
+        else:
+            self.statusbar.status.update('Prediction completed')
+
+
+    def toggle_live_shortcut(self, event: any = None) -> None:
+        if self.engine is None:
+            return None
+
+        self.draw_frame.live_switch.toggle()
+
+
+    def toggle_live(self) -> None:
+        if self.draw_frame.live_var.get() == 'on':
+            if self.live_predictor is None:
+                self.live_predictor = LivePredictor(
+                    self.engine,
+                    interval_ms= self.live_interval_ms,
+                    engine_lock= self.engine_lock
+                )
+
+            self.live_predictor.start()
+            self.statusbar.status.update('Live prediction is on')
+
+            if self.live_poll_id is not None:
+                self.after_cancel(self.live_poll_id)
+
+            self.live_poll_id = self.after(30, self.poll_live_results)
+
+        elif self.live_predictor is not None:
+            self.live_predictor.stop()
+            self.statusbar.status.update(
+                f'Live prediction is off, {self.live_predictor.predictions_per_second():.1f} predictions/s, '
+                f'{self.live_predictor.num_dropped} dropped frames'
+            )
+
+
+    def on_draw(self, event: any = None) -> None:
+        if self.live_predictor is None or not self.live_predictor.running:
+            return None
+
+        # with the raster this only copies 28x28 values, the model runs on the worker
+        self.live_predictor.submit(self.draw_frame.process_digit())
+
+
+    def poll_live_results(self) -> None:
+        self.live_poll_id = None
+
+        if self.live_predictor is None or not self.live_predictor.running:
+            return None
+
+        probas = self.live_predictor.latest_result()
+
+        if probas is not None and self.draw_frame.has_drawing:
+            self.metrics_frame.original_image = self.draw_frame.draw_image
+            self.metrics_frame.probabilities = probas
+            self.metrics_frame.prediction = probas.argmax()
+            self.metrics_frame.update_all(flush= False)
+            self.statusbar.cache.update(self.engine.stats())
+
+            self.statusbar.status.update(
+                f'Live: {self.live_predictor.predictions_per_second():.1f} predictions/s, '
+                f'{self.live_predictor.num_dropped} dropped frames'
+            )
+
+        self.live_poll_id = self.after(30, self.poll_live_results)
 
 
     def clear(self, event: any = None) -> None:
@@ -152,6 +363,62 @@ class MainWindow(ctk.CTk):
         self.draw_frame.draw_image_on_canvas(self.metrics_frame.original_image)
 
 
+    def rescore_history(self, event: any = None) -> None:
+        # the same button cancels a running job
+        if self.rescorer is not None and not self.rescorer.done.is_set():
+            self.rescorer.cancel()
+            self.statusbar.status.update('Cancelling re-scoring...')
+            return None
+
+        if self.engine is None:
+            self.statusbar.status.update('Model is still loading, re-scoring needs it...')
+            return None
+
+        if self.metrics_frame.history.empty:
+            self.statusbar.status.update('No data in history')
+            return None
+
+        self.rescorer = Rescorer(
+            self.engine,
+            self.metrics_frame.history,
+            engine_lock= self.engine_lock
+        )
+        self.rescorer.start()
+        self.metrics_frame.rescore_button.configure(text= 'Cancel')
+        self.after(100, self.poll_rescore)
+
+
+    def poll_rescore(self) -> None:
+        rescorer: Rescorer = self.rescorer
+
+        if not rescorer.done.is_set():
+            self.statusbar.status.update(f'Re-scoring {rescorer.progress()}, {rescorer.rows_per_second():.0f} rows/s...')
+            self.after(100, self.poll_rescore)
+            return None
+
+        self.metrics_frame.rescore_button.configure(text= 'Re-score')
+
+        if rescorer.error is not None:
+            tmsg.showerror(
+                title= 'Error while re-scoring',
+                message= str(rescorer.error)
+            )
+            return None
+
+        history = self.metrics_frame.history
+
+        # the rows it went over are gone
+        if history.generation != rescorer.generation:
+            self.statusbar.status.update('History was changed, re-scoring stopped')
+            return None
+
+        # only written here, on the GUI thread
+        history.set_rescored(rescorer.predictions[:rescorer.num_done], rescorer.probabilities[:rescorer.num_done])
+        self.metrics_frame.rebase_journal()
+        self.statusbar.cache.update(self.engine.stats())
+        self.metrics_frame.show_rescore_results(rescorer.rows_per_second(), cancelled= rescorer.cancelled.is_set())
+
+
     def export(self, event: any = None) -> None:
         if self.metrics_frame.history.empty:
             tmsg.showerror(
@@ -160,43 +427,175 @@ class MainWindow(ctk.CTk):
             )
             return None
         
-        export_status = export_data(self.metrics_frame.history)
-        
-        if isinstance(export_status, str):
+        if self.exporter is not None and not self.exporter.done.is_set():
+            self.statusbar.status.update(f'Export is already running, {self.exporter.progress()}')
+            return None
+
+        file_path: Path | None = ask_export_path()
+
+        if file_path is None:
+            return None
+
+        # the snapshot is taken right away, drawing and predicting can go on while it is written
+        self.exporter = Exporter(self.metrics_frame.history.snapshot(), file_path)
+        self.exporter.start()
+        self.after(100, self.poll_export)
+
+
+    def poll_export(self) -> None:
+        exporter: Exporter = self.exporter
+
+        if not exporter.done.is_set():
+            self.statusbar.status.update(f'Exporting {exporter.progress()}...')
+            self.after(100, self.poll_export)
+            return None
+
+        if exporter.error is not None:
             tmsg.showerror(
                 title= 'Error while exporting',
-                message= export_status
+                message= str(exporter.error)
             )
 
-        elif isinstance(export_status, Path):
-            self.statusbar.status.update(f"Successfully exported the data to '{export_status}'")
+        else:
+            self.statusbar.status.update(f"Successfully exported the data to '{exporter.file_path}', {exporter.progress()}")
         
 
-    def import_(self, event: any = None) -> None:
-        # loading data
-        imported_data = import_data()
+    def import_(self, event: any = None, folder: bool = False) -> None:
+        # the same button cancels a running import, keeping the rows loaded so far
+        if self.importer is not None and not self.importer.done.is_set():
+            self.importer.cancel()
+            self.statusbar.status.update('Cancelling import...')
+            return None
+
+        # loading data, datasets without predictions are run through the model
+        imported_data = import_data(
+            image_mode= self.metrics_frame.history.image_mode,
+            folder= folder,
+            engine= self.engine,
+            engine_lock= self.engine_lock
+        )
 
         # if any error occurs
-        if isinstance(imported_data, str):
+        if isinstance(imported_data, (str, Exception)):
             tmsg.showerror(
                 title= 'Error while importing',
-                message= imported_data
+                message= str(imported_data)
             )
             return None
         
         elif imported_data is None:
             return None
-        
-        self.metrics_frame.append_dataframe_to_history(imported_data)
+
+        # an empty history is simply replaced
+        merge: bool = False
+
+        if not self.metrics_frame.history.empty:
+            merge = tmsg.askyesnocancel(
+                title= 'Merge or replace',
+                message= 'Merge the imported rows into the current history? Rows that are already in it are skipped.\n\nYes merges, No replaces the current history.'
+            )
+
+            if merge is None:
+                return None
+
+        if not merge and not self.metrics_frame.clear_all_history():
+            return None
+
+        self.import_merge = merge
+        self.num_imported_rows = 0
+        self.importer = imported_data
+        self.importer.start()
+        self.draw_frame.import_button.configure(text= 'Cancel')
+        self.after(100, self.poll_import)
+
+
+    def poll_import(self) -> None:
+        importer: StreamingImporter = self.importer
+        done: bool = importer.done.is_set()
+
+        # the chunks converted so far go into the history right away
+        self.num_imported_rows += self.metrics_frame.extend_history(importer.take_chunks(), merge= self.import_merge)
+
+        if not done:
+            self.statusbar.status.update(f'Importing {importer.progress()}...')
+            self.after(100, self.poll_import)
+            return None
+
+        self.draw_frame.import_button.configure(text= 'Import')
+        num_skipped: str = f', skipped {importer.num_rows - self.num_imported_rows} already in the history' if self.import_merge else ''
+
+        if importer.error is not None:
+            tmsg.showerror(
+                title= 'Error while importing',
+                message= str(importer.error)
+            )
+
+        elif importer.cancelled.is_set():
+            self.statusbar.status.update(f'Import cancelled, kept {self.num_imported_rows} rows{num_skipped}')
+
+        else:
+            self.statusbar.status.update(
+                f'Successfully imported {self.num_imported_rows} rows in {importer.elapsed_time:.1f}s '
+                f'({importer.rows_per_second():.0f} rows/s){num_skipped}'
+            )
 
 
     def on_closing(self):
+        self.metrics_frame.renderer.stop()
+
+        # the last records are synced and a running rebase is finished
+        if self.metrics_frame.journal is not None:
+            self.metrics_frame.journal.close()
+
         plt.close("all")   # Close any Matplotlib figures
         self.destroy()     # Destroy the Tkinter window
         sys.exit()         # Exit the program completely
         
 
 if __name__ == '__main__':
-    app = MainWindow()
+    parser = argparse.ArgumentParser(description= 'Hand Written Digit Recognition')
+    parser.add_argument(
+        '--backend',
+        choices= list(BACKENDS),
+        default= 'keras',
+        help= 'runtime used for predictions, the tflite ones need convert_tflite.py to be run first'
+    )
+    parser.add_argument(
+        '--live-interval',
+        type= int,
+        default= 100,
+        help= 'minimum time between two live predictions in milliseconds'
+    )
+    parser.add_argument(
+        '--cache-size',
+        type= int,
+        default= 1024,
+        help= 'number of predictions kept in the cache, 0 turns it off'
+    )
+    parser.add_argument(
+        '--image-mode',
+        choices= IMAGE_MODES,
+        default= 'compressed',
+        help= "how history images are kept: 'raw' 280x280 pixels, 'compressed' lossless zlib bytes or 'model' 28x28 only"
+    )
+    parser.add_argument(
+        '--journal',
+        default= 'journal',
+        help= 'directory where every prediction is saved as it is made, the history is restored from it on the next launch'
+    )
+    parser.add_argument(
+        '--no-journal',
+        action= 'store_true',
+        help= 'do not restore the last session and do not save this one'
+    )
+    args = parser.parse_args()
+
+    app = MainWindow(
+        backend= args.backend, 
+        live_interval_ms= args.live_interval,
+        cache_size= args.cache_size,
+        image_mode= args.image_mode,
+        journal_dir= None if args.no_journal else args.journal
+    )
     app.mainloop()
     
\ No newline at end of file
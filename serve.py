@@ -0,0 +1,139 @@
+import argparse
+import io
+import json
+import sys
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+from urllib.parse import parse_qs, urlparse
+from utils.batching import MicroBatcher
+from utils.inference import BACKENDS, load_engine
+from utils.preprocess import process_arrays, process_image
+import utils.common as common
+
+
+def decode_image(body: bytes, invert: bool) -> common.NDArrayFloat32:
+    # raw uint8 pixels of a 28x28 or 280x280 image, anything else is decoded as an image file (png, jpg...)
+    match len(body):
+        case 784:
+            return process_arrays(np.frombuffer(body, dtype= np.uint8).reshape(1, 28, 28), invert= invert)
+
+        case 78400:
+            return process_image(Image.fromarray(np.frombuffer(body, dtype= np.uint8).reshape(280, 280)), invert= invert)
+
+        case _:
+            with Image.open(io.BytesIO(body)) as image:
+                return process_image(image, invert= invert)
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    server: 'PredictionServer'
+
+
+    def send_json(self, status: int, data: dict[str, any]) -> None:
+        body: bytes = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def do_GET(self) -> None:
+        if urlparse(self.path).path == '/stats':
+            self.send_json(200, self.server.batcher.stats())
+
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+
+        if url.path != '/predict':
+            self.send_json(404, {'error': 'not found'})
+            return None
+
+        # inverting by default, same as the canvas (black digit on white)
+        invert: bool = parse_qs(url.query).get('invert', ['1'])[0] != '0'
+        body: bytes = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        try:
+            np_img = decode_image(body, invert)
+
+        except Exception as e:
+            self.send_json(400, {'error': f'could not read the image: {e}'})
+            return None
+
+        probas = self.server.batcher.predict(np_img)
+        self.send_json(200, {
+            'prediction': int(probas.argmax()),
+            'probabilities': probas.tolist()
+        })
+
+
+    def log_message(self, format: str, *args) -> None:
+        # logging every request would cost more than the prediction
+        pass
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 resets connections under concurrent load
+    request_queue_size = 256
+
+    def __init__(self, address: tuple[str, int], batcher: MicroBatcher) -> None:
+        super().__init__(address, PredictionHandler)
+        self.batcher = batcher
+
+
+def make_server(
+    engine: any,
+    *,
+    host: str = '127.0.0.1',
+    port: int = 8765,
+    max_batch_size: int = 64,
+    max_wait_ms: float = 5.0
+) -> PredictionServer:
+    batcher = MicroBatcher(engine, max_batch_size= max_batch_size, max_wait_ms= max_wait_ms)
+    return PredictionServer((host, port), batcher)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description= 'Serve the model over local HTTP with dynamic micro-batching.')
+    parser.add_argument('--host', default= '127.0.0.1')
+    parser.add_argument('--port', type= int, default= 8765)
+    parser.add_argument('--backend', choices= list(BACKENDS), default= 'keras', help= 'runtime used for predictions')
+    parser.add_argument('--model', default= None, help= 'path of the model (default: the one of the backend)')
+    parser.add_argument('--max-batch-size', type= int, default= 64)
+    parser.add_argument('--max-wait-ms', type= float, default= 5.0, help= 'longest time a request waits for its batch to fill up')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    server = make_server(
+        load_engine(args.backend, args.model),
+        host= args.host,
+        port= args.port,
+        max_batch_size= args.max_batch_size,
+        max_wait_ms= args.max_wait_ms
+    )
+    print(f'Serving on http://{args.host}:{args.port} (POST /predict, GET /stats)')
+
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        server.batcher.stop()
+        server.server_close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
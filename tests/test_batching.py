@@ -0,0 +1,34 @@
+import time
+import numpy as np
+import pytest
+from utils.batching import MicroBatcher
+from utils.preprocess import new_input_buffer
+
+
+class SlowEngine:
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        time.sleep(0.02)
+        return np.full((len(batch), 10), 0.1, dtype= np.float32)
+
+
+def test_requests_are_batched() -> None:
+    batcher = MicroBatcher(SlowEngine(), max_batch_size= 8, max_wait_ms= 20)
+    futures = [batcher.submit(new_input_buffer()) for _ in range(16)]
+
+    for future in futures:
+        np.testing.assert_allclose(future.result(timeout= 5), 0.1)
+
+    assert batcher.stats()['batches'] < 16
+    batcher.stop()
+
+
+def test_stop_resolves_every_pending_future() -> None:
+    batcher = MicroBatcher(SlowEngine(), max_batch_size= 4, max_wait_ms= 1)
+    futures = [batcher.submit(new_input_buffer()) for _ in range(40)]
+    batcher.stop()
+
+    # answered or failed, none is left waiting
+    assert all(future.done() for future in futures)
+
+    with pytest.raises(RuntimeError):
+        batcher.submit(new_input_buffer()).result(timeout= 1)
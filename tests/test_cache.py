@@ -0,0 +1,65 @@
+import numpy as np
+from PIL import Image, ImageDraw
+from utils.cache import CachedEngine, input_key
+from utils.preprocess import new_input_buffer, process_image
+from utils.raster import StrokeRaster
+
+
+def random_drawing(rng: np.random.Generator) -> tuple[StrokeRaster, Image.Image]:
+    # the same pen rectangles DrawFrame.paint puts on the raster and on the drawing image
+    raster = StrokeRaster()
+    image = Image.new('L', (280, 280), 255)
+    draw = ImageDraw.Draw(image)
+
+    for x, y in rng.integers(0, 280, size= (rng.integers(1, 200), 2)).tolist():
+        pen_size: int = int(rng.integers(1, 15))
+        draw.rectangle([x - pen_size, y - pen_size, x + pen_size, y + pen_size], fill= 0)
+        raster.add_rectangle(x - pen_size, y - pen_size, x + pen_size, y + pen_size)
+
+    return raster, image
+
+
+def test_raster_and_image_share_a_key() -> None:
+    # once noise is added and removed again the input is rebuilt from the image, it must still hit the cache
+    rng = np.random.default_rng(0)
+
+    for _ in range(200):
+        raster, image = random_drawing(rng)
+        from_raster = raster.write_into(new_input_buffer())
+        from_image = process_image(image)
+
+        assert input_key(from_raster) == input_key(from_image)
+
+
+def test_different_drawings_have_different_keys() -> None:
+    rng = np.random.default_rng(1)
+    keys: set[bytes] = {input_key(random_drawing(rng)[0].write_into(new_input_buffer())) for _ in range(50)}
+
+    assert len(keys) == 50
+
+
+class CountingEngine:
+    def __init__(self) -> None:
+        self.num_inputs: int = 0
+
+
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        self.num_inputs += len(batch)
+        return np.tile(np.linspace(0, 1, 10, dtype= np.float32), (len(batch), 1)) * batch.mean(axis= (1, 2, 3))[:, None]
+
+
+def test_batch_duplicates_are_one_miss() -> None:
+    engine = CountingEngine()
+    cached = CachedEngine(engine)
+    batch = new_input_buffer(4)
+    batch[:] = 0.5
+    batch[3] = 0.25
+
+    probas = cached.predict_batch(batch)
+
+    assert engine.num_inputs == 2
+    assert (cached.hits, cached.misses) == (0, 2)
+    np.testing.assert_array_equal(probas[0], probas[1])
+
+    # the cached rows own their memory
+    assert all(entry.base is None for entry in cached.entries.values())
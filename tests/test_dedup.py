@@ -0,0 +1,83 @@
+import numpy as np
+from utils.dedup import DedupIndex
+from utils.history import HistoryStore, ImageMode
+
+
+def make_history(indices: list[int], image_mode: ImageMode = 'compressed') -> HistoryStore:
+    history = HistoryStore(image_mode= image_mode)
+
+    for index in indices:
+        image = np.full((280, 280), 255, dtype= np.uint8)
+        image[index % 250: index % 250 + 30, 40: 80] = 0
+        history.append(
+            image= image,
+            prediction= index % 10,
+            probabilities= np.eye(10, dtype= np.float32)[index % 10],
+            correct_number= index % 7,
+            confidence= 80,
+            acc_score= 0.5
+        )
+
+    return history
+
+
+def test_merging_twice_adds_nothing() -> None:
+    history = make_history(range(20))
+    chunk = make_history(range(15, 40))
+    dedup = DedupIndex()
+
+    assert dedup.merge(history, chunk) == 20
+    assert dedup.merge(history, chunk) == 0
+    assert len(history) == 40
+    assert dedup.num_skipped == 5 + 25
+
+
+def test_duplicates_inside_a_chunk() -> None:
+    history = make_history([])
+    chunk = make_history([1, 2, 1, 3, 2, 1])
+    dedup = DedupIndex()
+
+    assert dedup.merge(history, chunk) == 3
+    np.testing.assert_array_equal(history.labels, [1, 2, 3])
+
+
+def test_same_image_with_another_label_is_kept() -> None:
+    history = make_history([3])
+    chunk = make_history([3])
+    chunk.labels[0] = 6
+
+    assert DedupIndex().merge(history, chunk) == 1
+
+
+def test_chunk_in_another_image_mode() -> None:
+    history = make_history(range(10), image_mode= 'compressed')
+    chunk = make_history(range(5, 15), image_mode= 'raw')
+    dedup = DedupIndex()
+
+    assert dedup.merge(history, chunk) == 5
+    assert history.image_mode == 'compressed'
+    np.testing.assert_array_equal(np.asarray(history.get_image(14)), np.asarray(chunk.get_image(9)))
+
+
+def test_cleared_history_is_indexed_again() -> None:
+    history = make_history(range(10))
+    chunk = make_history(range(10))
+    dedup = DedupIndex()
+
+    assert dedup.merge(history, chunk) == 0
+
+    history.clear()
+
+    assert dedup.merge(history, chunk) == 10
+    assert len(history) == 10
+
+
+def test_rows_appended_between_merges_are_indexed() -> None:
+    history = make_history(range(5))
+    dedup = DedupIndex()
+    dedup.merge(history, make_history([]))
+
+    # rows added without going through the index, like predictions made by hand
+    history.extend(make_history([42]))
+
+    assert dedup.merge(history, make_history([42])) == 0
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from utils.history import IMAGE_MODES, HistoryStore
+
+
+def drawing(index: int) -> np.ndarray:
+    image = np.full((280, 280), 255, dtype= np.uint8)
+    image[20 + index % 200: 60 + index % 200, 100: 140] = 0
+    return image
+
+
+def append_rows(history: HistoryStore, num_rows: int, first: int = 0) -> None:
+    for index in range(first, first + num_rows):
+        history.append(
+            image= drawing(index),
+            prediction= index % 10,
+            probabilities= np.eye(10, dtype= np.float32)[index % 10],
+            correct_number= (index + index // 10) % 10,
+            confidence= 90,
+            acc_score= 0.5
+        )
+
+
+def counted_nbytes(history: HistoryStore) -> int:
+    # what nbytes used to add up on every call
+    total: int = sum(getattr(history, name)[:len(history)].nbytes for name in history.column_names())
+
+    if history.image_mode == 'compressed':
+        total += sum(len(data) for data in history._images[:len(history)])
+
+    return total
+
+
+@pytest.mark.parametrize('image_mode', IMAGE_MODES)
+def test_nbytes_is_a_running_total(image_mode: str) -> None:
+    history = HistoryStore(capacity= 4, image_mode= image_mode)
+    append_rows(history, 30)
+    other = HistoryStore(image_mode= 'raw')
+    append_rows(other, 20, first= 30)
+    history.extend(other)
+    history.extend(history.select(np.arange(len(history)) % 3 == 0))
+
+    assert history.nbytes() == counted_nbytes(history)
+    assert history.rows(5, 17).nbytes() == counted_nbytes(history.rows(5, 17))
+
+    history.clear()
+    append_rows(history, 3)
+
+    assert history.nbytes() == counted_nbytes(history)
+
+
+@pytest.mark.parametrize('image_mode', IMAGE_MODES)
+def test_images_survive_every_mode(image_mode: str) -> None:
+    history = HistoryStore(image_mode= image_mode)
+    append_rows(history, 5)
+    raw = HistoryStore(image_mode= 'raw')
+    raw.extend(history)
+
+    assert raw.image_batch(0, 5).shape == (5, 280, 280)
+
+    # the model mode keeps 28x28, the others every pixel
+    if image_mode != 'model':
+        np.testing.assert_array_equal(raw.images, np.stack([drawing(index) for index in range(5)]))
+
+
+def test_snapshot_is_not_written_by_clear_or_rescore() -> None:
+    history = HistoryStore(image_mode= 'raw')
+    append_rows(history, 10)
+    snapshot = history.snapshot()
+    labels = snapshot.labels.copy()
+
+    history.set_rescored(np.zeros(10, dtype= np.int8), np.zeros((10, 10), dtype= np.float32))
+    history.clear()
+    append_rows(history, 10, first= 50)
+
+    np.testing.assert_array_equal(snapshot.labels, labels)
+    assert snapshot.num_rescored == 0
+
+
+def test_read_only_columns_are_copied_before_writing() -> None:
+    history = HistoryStore(image_mode= 'raw')
+    append_rows(history, 4)
+    columns = {name: getattr(history, name)[:4].copy() for name in history.column_names()}
+
+    for column in columns.values():
+        column.flags.writeable = False
+
+    store = HistoryStore.from_columns(columns)
+    store.set_rescored(np.ones(2, dtype= np.int8), np.zeros((2, 10), dtype= np.float32))
+    append_rows(store, 1)
+    store.clear()
+    append_rows(store, 2)
+
+    assert len(store) == 2 and store.writeable
+
+
+def test_rows_keep_the_rescored_prefix() -> None:
+    history = HistoryStore(image_mode= 'compressed')
+    append_rows(history, 10)
+    history.set_rescored(np.full(6, 7, dtype= np.int8), np.zeros((6, 10), dtype= np.float32))
+
+    assert [history.rows(start, start + 4).num_rescored for start in (0, 4, 8)] == [4, 2, 0]
@@ -0,0 +1,100 @@
+import pickle
+import numpy as np
+from pathlib import Path
+from utils.export import PICKLE_FORMAT, PICKLE_VERSION, Exporter
+from utils.history import HistoryStore
+from utils.import_ import StreamingImporter
+
+
+def make_history(num_rows: int) -> HistoryStore:
+    history = HistoryStore(image_mode= 'compressed')
+
+    for index in range(num_rows):
+        image = np.full((280, 280), 255, dtype= np.uint8)
+        image[index % 250: index % 250 + 30, 40: 80] = 0
+        history.append(
+            image= image,
+            prediction= index % 10,
+            probabilities= np.eye(10, dtype= np.float32)[index % 10],
+            correct_number= index % 7,
+            confidence= 80,
+            acc_score= 0.5
+        )
+
+    return history
+
+
+def run_importer(path: Path) -> tuple[StreamingImporter, HistoryStore]:
+    importer = StreamingImporter(str(path), image_mode= 'compressed', chunk_size= 100)
+    importer.run()
+    imported = HistoryStore(image_mode= 'compressed')
+
+    for chunk in importer.take_chunks():
+        imported.extend(chunk)
+
+    return importer, imported
+
+
+def write_frames(path: Path, history: HistoryStore, *, num_rows: int | None = None, header: bool = True) -> None:
+    with open(path, 'wb') as file:
+        if header:
+            pickle.dump({'format': PICKLE_FORMAT, 'version': PICKLE_VERSION, 'rows': num_rows or len(history)}, file)
+
+        for start in range(0, len(history), 256):
+            pickle.dump(history.rows(start, start + 256).to_dataframe(), file)
+
+
+def test_single_dataframe_of_older_versions(tmp_path: Path) -> None:
+    history = make_history(300)
+
+    with open(tmp_path / 'old.pkl', 'wb') as file:
+        pickle.dump(history.to_dataframe(), file)
+
+    importer, imported = run_importer(tmp_path / 'old.pkl')
+
+    assert importer.error is None
+    np.testing.assert_array_equal(imported.images, history.images)
+
+
+def test_frames_with_a_header(tmp_path: Path) -> None:
+    history = make_history(700)
+    write_frames(tmp_path / 'frames.pkl', history)
+    importer, imported = run_importer(tmp_path / 'frames.pkl')
+
+    assert importer.error is None and importer.total_rows == 700
+    np.testing.assert_array_equal(imported.labels, history.labels)
+    np.testing.assert_array_equal(imported.images, history.images)
+
+
+def test_missing_frames_are_reported(tmp_path: Path) -> None:
+    write_frames(tmp_path / 'cut.pkl', make_history(300), num_rows= 1000)
+    importer, imported = run_importer(tmp_path / 'cut.pkl')
+
+    assert isinstance(importer.error, ValueError)
+    assert len(imported) == 300
+
+
+def test_unknown_header_is_refused(tmp_path: Path) -> None:
+    with open(tmp_path / 'other.pkl', 'wb') as file:
+        pickle.dump({'format': PICKLE_FORMAT, 'version': PICKLE_VERSION + 1, 'rows': 0}, file)
+
+    importer, imported = run_importer(tmp_path / 'other.pkl')
+
+    assert isinstance(importer.error, ValueError)
+    assert len(imported) == 0
+
+
+def test_export_round_trip(tmp_path: Path) -> None:
+    history = make_history(1100)
+    exporter = Exporter(history, tmp_path / 'data.pkl')
+    exporter.run()
+
+    assert exporter.error is None
+
+    with open(tmp_path / 'data.pkl', 'rb') as file:
+        assert pickle.load(file)['rows'] == 1100
+
+    importer, imported = run_importer(tmp_path / 'data.pkl')
+
+    assert importer.error is None and len(imported) == 1100
+    np.testing.assert_array_equal(imported.images, history.images)
@@ -0,0 +1,189 @@
+import json
+import numpy as np
+from pathlib import Path
+from utils.history import HistoryStore, ImageMode
+from utils.journal import Journal, JournalRestorer
+
+
+def add_row(history: HistoryStore, index: int) -> int:
+    image = np.full((280, 280), 255, dtype= np.uint8)
+    image[index % 280, 10: 200] = 0
+
+    return history.append(
+        image= image,
+        prediction= index % 10,
+        probabilities= np.eye(10, dtype= np.float32)[index % 10],
+        correct_number= (index + 1) % 10,
+        confidence= 90,
+        acc_score= 0.5
+    )
+
+
+def write_session(directory: Path, num_rows: int, *, image_mode: ImageMode = 'compressed', **kwargs: any) -> HistoryStore:
+    history = HistoryStore(image_mode= image_mode)
+    journal = Journal(directory, image_mode= image_mode, **kwargs)
+    journal.open(history)
+
+    for index in range(num_rows):
+        journal.append(history, add_row(history, index))
+
+    journal.close()
+    return history
+
+
+def load(directory: Path, image_mode: ImageMode = 'compressed') -> HistoryStore:
+    history = HistoryStore(image_mode= image_mode)
+
+    for part in Journal(directory, image_mode= image_mode).load():
+        history.extend(part)
+
+    return history
+
+
+def restore(directory: Path, image_mode: ImageMode) -> JournalRestorer:
+    restorer = JournalRestorer(Journal(directory, image_mode= image_mode), image_mode)
+    restorer.start()
+    restorer.done.wait()
+
+    assert restorer.error is None
+    return restorer
+
+
+def assert_same_rows(history: HistoryStore, expected: HistoryStore) -> None:
+    assert len(history) == len(expected)
+    np.testing.assert_array_equal(history.labels, expected.labels)
+    np.testing.assert_array_equal(history.predictions, expected.predictions)
+    np.testing.assert_array_equal(history.probabilities, expected.probabilities)
+
+    for index in (0, len(expected) // 2, len(expected) - 1):
+        np.testing.assert_array_equal(np.asarray(history.get_image(index)), np.asarray(expected.get_image(index)))
+
+
+def test_append_and_load(tmp_path: Path) -> None:
+    for image_mode in ('raw', 'compressed', 'model'):
+        directory = tmp_path / image_mode
+        history = write_session(directory, 250, image_mode= image_mode, segment_size= 100, compact_interval= 1e9)
+
+        assert_same_rows(load(directory, image_mode), history)
+
+
+def test_compaction_keeps_every_row(tmp_path: Path) -> None:
+    history = HistoryStore(image_mode= 'compressed')
+    journal = Journal(tmp_path, image_mode= 'compressed', segment_size= 50, compact_interval= 1e9)
+    journal.open(history)
+
+    for index in range(180):
+        journal.append(history, add_row(history, index))
+
+    # the rows of the three closed segments go to the base, the open segment stays
+    assert journal.compact() == 150
+    assert journal.compact() == 0
+
+    for index in range(180, 260):
+        journal.append(history, add_row(history, index))
+
+    journal.close()
+
+    assert_same_rows(load(tmp_path), history)
+    assert len(list(tmp_path.glob('segment-*.bin'))) < 6
+
+
+def test_torn_tail_and_cut_short_compaction(tmp_path: Path) -> None:
+    history = HistoryStore(image_mode= 'compressed')
+    journal = Journal(tmp_path, image_mode= 'compressed', segment_size= 50, compact_interval= 1e9)
+    journal.open(history)
+
+    for index in range(120):
+        journal.append(history, add_row(history, index))
+
+    journal.compact()
+
+    # bytes past base_size, as a compaction that crashed before updating journal.json leaves them
+    meta = json.loads((tmp_path / 'journal.json').read_text())
+
+    with open(tmp_path / meta['base'], 'ab') as file:
+        file.write(b'garbage' * 100)
+
+    for index in range(120, 260):
+        journal.append(history, add_row(history, index))
+
+    journal.compact()
+    journal.close()
+
+    # half a record at the end of the last segment, as a crash while appending leaves it
+    with open(sorted(tmp_path.glob('segment-*.bin'))[-1], 'ab') as file:
+        file.write(b'\x10\x00\x00\x00abc')
+
+    assert_same_rows(load(tmp_path), history)
+
+
+def test_restore_while_predicting(tmp_path: Path) -> None:
+    previous = write_session(tmp_path, 300)
+    restorer = JournalRestorer(Journal(tmp_path, image_mode= 'compressed'), 'compressed')
+    restorer.start()
+
+    # predictions made before the journal is attached, like MetricsFrame keeps them
+    predicted = HistoryStore(image_mode= 'compressed')
+
+    for index in range(1000, 1020):
+        add_row(predicted, index)
+
+    restorer.done.wait()
+    assert restorer.error is None
+
+    # what MetricsFrame.restore_history does, the new rows go after the restored ones
+    restored: HistoryStore = restorer.history
+    start: int = len(restored)
+    restored.extend(predicted)
+    restorer.journal.append_rows(restored, start, len(restored))
+
+    for index in range(2000, 2005):
+        restorer.journal.append(restored, add_row(restored, index))
+
+    restorer.journal.close()
+    reloaded = load(tmp_path)
+
+    assert_same_rows(reloaded, restored)
+    np.testing.assert_array_equal(reloaded.labels[:300], previous.labels)
+
+
+def test_image_mode_change_between_sessions(tmp_path: Path) -> None:
+    history = write_session(tmp_path, 200, image_mode= 'compressed')
+
+    # restoring in raw mode rewrites the journal in raw mode
+    restorer = restore(tmp_path, 'raw')
+    restorer.journal.append(restorer.history, add_row(restorer.history, 500))
+    restorer.journal.close()
+    add_row(history, 500)
+
+    assert json.loads((tmp_path / 'journal.json').read_text())['image_mode'] == 'raw'
+    assert_same_rows(load(tmp_path, 'raw'), history)
+
+    # and in model mode the images are kept at 28x28
+    restorer = restore(tmp_path, 'model')
+    restorer.journal.close()
+    reloaded = load(tmp_path, 'model')
+
+    assert json.loads((tmp_path / 'journal.json').read_text())['image_mode'] == 'model'
+    assert len(reloaded) == 201
+    np.testing.assert_array_equal(reloaded.labels, history.labels)
+
+
+def test_rebase_keeps_rescored_rows(tmp_path: Path) -> None:
+    write_session(tmp_path, 120)
+    restorer = restore(tmp_path, 'compressed')
+    history: HistoryStore = restorer.history
+
+    history.set_rescored(np.full(50, 3, dtype= np.int8), np.zeros((50, 10), dtype= np.float32))
+    restorer.journal.start_rebase(history)
+    restorer.journal.rebase_thread.join()
+    restorer.journal.append(history, add_row(history, 999))
+    restorer.journal.close()
+
+    assert restorer.journal.error is None
+
+    reloaded = load(tmp_path)
+
+    assert len(reloaded) == 121
+    assert reloaded.num_rescored == 50
+    np.testing.assert_array_equal(reloaded.new_predictions[:50], np.full(50, 3, dtype= np.int8))
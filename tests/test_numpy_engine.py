@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from pathlib import Path
+from utils.inference import INPUT_SHAPE, MODEL_PATH
+from utils.numpy_engine import NumpyEngine
+
+
+# the tests run from any directory, the model path is relative to the repository
+MODEL_FILE: Path = Path(__file__).resolve().parent.parent / MODEL_PATH
+# same default as benchmark.py --parity
+TOLERANCE: float = 1e-4
+
+
+@pytest.fixture(scope= 'module')
+def batch() -> np.ndarray:
+    rng = np.random.default_rng(42)
+    return rng.random((256, *INPUT_SHAPE)).astype(np.float32)
+
+
+@pytest.fixture(scope= 'module')
+def numpy_engine() -> NumpyEngine:
+    if not MODEL_FILE.is_file():
+        pytest.skip(f"'{MODEL_PATH}' is missing")
+
+    pytest.importorskip('h5py')
+    return NumpyEngine(str(MODEL_FILE))
+
+
+def test_batch_matches_single(numpy_engine: NumpyEngine, batch: np.ndarray) -> None:
+    probas = numpy_engine.predict_batch(batch[:8])
+
+    assert probas.shape == (8, 10)
+    np.testing.assert_allclose(probas.sum(axis= 1), 1, atol= 1e-5)
+
+    for index in range(8):
+        np.testing.assert_allclose(numpy_engine.predict(batch[index: index + 1]), probas[index], atol= 1e-6)
+
+
+def test_matches_keras(numpy_engine: NumpyEngine, batch: np.ndarray) -> None:
+    # catches a change of the weight layout that would otherwise only show as worse predictions
+    pytest.importorskip('tensorflow')
+    from utils.inference import KerasEngine
+
+    expected = KerasEngine(str(MODEL_FILE)).predict_batch(batch)
+    actual = numpy_engine.predict_batch(batch)
+
+    assert np.abs(expected - actual).max() <= TOLERANCE
+    assert (expected.argmax(axis= 1) == actual.argmax(axis= 1)).all()
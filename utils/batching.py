@@ -0,0 +1,149 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import utils.common as common
+from utils.preprocess import new_input_buffer
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        engine: any,
+        *,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0
+    ) -> None:
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait: float = max_wait_ms / 1000
+
+        # None is put by stop to wake the worker up
+        self.requests: queue.Queue[tuple[common.NDArrayFloat32, Future] | None] = queue.Queue()
+        # batches are stacked into the same buffer every time
+        self.buffer: common.NDArrayFloat32 = new_input_buffer(max_batch_size)
+
+        # counters
+        self.stats_lock = threading.Lock()
+        self.num_requests: int = 0
+        self.num_batches: int = 0
+        self.max_queue_depth: int = 0
+        self.busy_time: float = 0.0
+        self.start_time: float = time.perf_counter()
+
+        # submit and stop are serialized, so nothing is queued behind the worker once it has drained the queue
+        self.running: bool = True
+        self.running_lock = threading.Lock()
+        self.thread = threading.Thread(target= self.run, daemon= True)
+        self.thread.start()
+
+
+    def submit(self, np_img: common.NDArrayFloat32) -> Future:
+        # np_img is a (1, 28, 28, 1) input, the future resolves to its probabilities
+        future: Future = Future()
+
+        with self.running_lock:
+            if not self.running:
+                future.set_exception(RuntimeError('The batcher is stopped'))
+                return future
+
+            self.requests.put((np_img, future))
+
+        with self.stats_lock:
+            self.max_queue_depth = max(self.max_queue_depth, self.requests.qsize())
+
+        return future
+
+
+    def predict(self, np_img: common.NDArrayFloat32) -> common.NDArrayFloat:
+        return self.submit(np_img).result()
+
+
+    def collect_batch(self) -> list[tuple[common.NDArrayFloat32, Future] | None]:
+        # blocking for the first request, then waiting at most max_wait for the batch to fill up
+        batch: list[tuple[common.NDArrayFloat32, Future] | None] = [self.requests.get()]
+        deadline: float = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining: float = deadline - time.perf_counter()
+
+            try:
+                batch.append(self.requests.get(timeout= remaining) if remaining > 0 else self.requests.get_nowait())
+
+            except queue.Empty:
+                break
+
+        return batch
+
+
+    def run(self) -> None:
+        while True:
+            batch = self.collect_batch()
+
+            if not self.running:
+                break
+
+            start_time: float = time.perf_counter()
+
+            for index, (np_img, _) in enumerate(batch):
+                self.buffer[index] = np_img[0]
+
+            try:
+                probas = self.engine.predict_batch(self.buffer[:len(batch)])
+
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+                continue
+
+            for (_, future), proba in zip(batch, probas):
+                future.set_result(proba)
+
+            with self.stats_lock:
+                self.num_requests += len(batch)
+                self.num_batches += 1
+                self.busy_time += time.perf_counter() - start_time
+
+        # the requests of the last batch and the ones still queued would otherwise wait forever
+        error = RuntimeError('The batcher was stopped')
+
+        for request in batch + self.drain():
+            if request is not None:
+                request[1].set_exception(error)
+
+
+    def drain(self) -> list[tuple[common.NDArrayFloat32, Future] | None]:
+        requests: list[tuple[common.NDArrayFloat32, Future] | None] = []
+
+        while True:
+            try:
+                requests.append(self.requests.get_nowait())
+
+            except queue.Empty:
+                return requests
+
+
+    def stop(self) -> None:
+        # returns once every pending future is resolved
+        with self.running_lock:
+            self.running = False
+            # unblocking the worker
+            self.requests.put(None)
+
+        self.thread.join()
+
+
+    def stats(self) -> dict[str, float | int]:
+        with self.stats_lock:
+            elapsed: float = time.perf_counter() - self.start_time
+
+            return {
+                'requests': self.num_requests,
+                'batches': self.num_batches,
+                'mean_batch_size': self.num_requests / self.num_batches if self.num_batches else 0.0,
+                'queue_depth': self.requests.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'requests_per_s': self.num_requests / elapsed if elapsed > 0 else 0.0,
+                'model_busy_s': self.busy_time
+            }
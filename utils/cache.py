@@ -0,0 +1,104 @@
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+import utils.common as common
+
+
+# the inputs are hashed in steps of 1/10000, the stroke raster and process_image differ by about 1e-7 for the same drawing
+KEY_STEPS: int = 10_000
+
+
+def input_key(np_img: np.ndarray) -> bytes:
+    # 128 bit blake2b of the preprocessed pixels, a few microseconds for a 28x28 input
+    # canvas cells are multiples of 1/100, far from the rounding boundaries of the quantized values
+    quantized = np.round(np.clip(np_img, 0, 1) * KEY_STEPS).astype(np.uint16)
+    return hashlib.blake2b(quantized.tobytes(), digest_size= 16).digest()
+
+
+class CachedEngine:
+    def __init__(self, engine: any, capacity: int = 1024) -> None:
+        self.engine = engine
+        self.capacity = capacity
+
+        # least recently used entries are at the start
+        self.entries: OrderedDict[bytes, common.NDArrayFloat] = OrderedDict()
+        # the live prediction worker and the GUI thread share the cache
+        self.lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+
+    def get(self, key: bytes) -> common.NDArrayFloat | None:
+        with self.lock:
+            probas = self.entries.get(key)
+
+            if probas is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return probas
+
+
+    def put(self, key: bytes, probas: common.NDArrayFloat) -> None:
+        if self.capacity <= 0:
+            return None
+
+        with self.lock:
+            self.entries[key] = probas
+            self.entries.move_to_end(key)
+
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last= False)
+
+
+    def predict(self, np_img: common.NDArrayFloat32) -> common.NDArrayFloat:
+        key: bytes = input_key(np_img)
+        probas = self.get(key)
+
+        if probas is None:
+            probas = self.engine.predict(np_img)
+            self.put(key, probas)
+
+        return probas
+
+
+    def predict_batch(self, batch: common.NDArrayFloat32) -> common.NDArrayFloat:
+        keys: list[bytes] = [input_key(np_img) for np_img in batch]
+        probas = np.empty((len(batch), 10), dtype= np.float32)
+
+        # duplicates inside the batch are sent to the model only once
+        missing: dict[bytes, list[int]] = {}
+
+        for index, key in enumerate(keys):
+            # a repeat of a missing key is neither a hit nor another miss
+            if key in missing:
+                missing[key].append(index)
+                continue
+
+            cached = self.get(key)
+
+            if cached is not None:
+                probas[index] = cached
+
+            else:
+                missing.setdefault(key, []).append(index)
+
+        if missing:
+            first_indices: list[int] = [indices[0] for indices in missing.values()]
+            new_probas = self.engine.predict_batch(batch[first_indices])
+
+            for (key, indices), proba in zip(missing.items(), new_probas):
+                probas[indices] = proba
+                # a copy, a view would keep the whole batch output alive for as long as the entry is cached
+                self.put(key, proba.copy())
+
+        return probas
+
+
+    def stats(self) -> str:
+        total: int = self.hits + self.misses
+        hit_rate: float = self.hits / total if total else 0.0
+        return f'{self.hits} hits / {self.misses} misses ({hit_rate:.0%})'
@@ -0,0 +1,163 @@
+import json
+import os
+import numpy as np
+from pathlib import Path
+from typing import Callable
+from utils.history import HistoryStore
+
+
+# a history directory holds one .npy file per column and meta.json
+# meta.json names the files of the current version, so writing a new version over an old one and switching to it is one os.replace
+FORMAT_VERSION: int = 2
+META_FILE: str = 'meta.json'
+# file name: history attribute
+COLUMNS: dict[str, str] = {
+    'images': '_images',
+    'probabilities': '_probabilities',
+    'predictions': '_predictions',
+    'labels': '_labels',
+    'confidences': '_confidences',
+    'acc_scores': '_acc_scores',
+    'new_predictions': '_new_predictions',
+    'new_probabilities': '_new_probabilities'
+}
+# images are written this many rows at a time, compressed ones are decoded chunk by chunk
+CHUNK_SIZE: int = 1024
+
+
+def read_meta(path: Path) -> dict[str, any] | None:
+    meta_path: Path = path / META_FILE
+    return json.loads(meta_path.read_text()) if meta_path.is_file() else None
+
+
+def column_files(meta: dict[str, any]) -> dict[str, str]:
+    # format 1 directories have a single version, named after the columns
+    return meta.get('files', {name: f'{name}.npy' for name in COLUMNS})
+
+
+def is_column_file(name: str) -> bool:
+    # images.npy or images.3.npy, other files in the directory are left alone
+    parts: list[str] = name.split('.')
+    return parts[0] in COLUMNS and parts[-1] == 'npy' and (len(parts) == 2 or (len(parts) == 3 and parts[1].isdigit()))
+
+
+def save_column(path: Path, column: np.ndarray) -> None:
+    with open(path, 'wb') as file:
+        np.save(file, column)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def save_columnar(
+    history: HistoryStore,
+    path: str | Path,
+    *,
+    on_progress: Callable[[int], None] | None = None
+) -> Path:
+    # on_progress is called with the number of bytes written after every chunk
+    # an existing history directory at path is only replaced once the new version is complete
+    path = Path(path)
+    path.mkdir(parents= True, exist_ok= True)
+    num_rows: int = len(history)
+    old_meta: dict[str, any] | None = read_meta(path)
+    version: int = old_meta.get('version', 0) + 1 if old_meta is not None else 1
+    files: dict[str, str] = {name: f'{name}.{version}.npy' for name in COLUMNS}
+
+    try:
+        # the image array is written in place on disk, so it never has to exist in memory as a whole
+        images = np.lib.format.open_memmap(
+            path / files['images'],
+            mode= 'w+',
+            dtype= np.uint8,
+            shape= (num_rows, *history.stored_shape)
+        )
+
+        for start in range(0, num_rows, CHUNK_SIZE):
+            stop: int = min(start + CHUNK_SIZE, num_rows)
+            images[start: stop] = history.image_batch(start, stop)
+
+            if on_progress is not None:
+                on_progress(images[start: stop].nbytes)
+
+        images.flush()
+        del images
+
+        # the other columns are small, each one is written in one go
+        for name, attribute in COLUMNS.items():
+            if name != 'images':
+                column: np.ndarray = getattr(history, attribute)[:num_rows]
+                save_column(path / files[name], column)
+
+                if on_progress is not None:
+                    on_progress(column.nbytes)
+
+    except BaseException:
+        # the old version is still the current one
+        for file_name in files.values():
+            (path / file_name).unlink(missing_ok= True)
+
+        raise
+
+    # written last, until it is replaced the old version (or nothing, for a new directory) is what gets imported
+    meta: dict[str, any] = {
+        'format': FORMAT_VERSION,
+        'version': version,
+        'files': files,
+        'size': num_rows,
+        'image_shape': list(history.image_shape),
+        'stored_shape': list(history.stored_shape),
+        'num_rescored': history.num_rescored
+    }
+    temp_path: Path = path / f'{META_FILE}.tmp'
+
+    with open(temp_path, 'w') as file:
+        json.dump(meta, file, indent= 4)
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temp_path, path / META_FILE)
+
+    # the files of older versions, and of exports that failed half way
+    # one still memory mapped by an import can't be removed on windows, the next export tries again
+    for file_path in path.iterdir():
+        if is_column_file(file_path.name) and file_path.name not in files.values():
+            try:
+                file_path.unlink(missing_ok= True)
+
+            except OSError:
+                pass
+
+    return path
+
+
+def load_columnar(path: str | Path, *, mmap: bool = True) -> HistoryStore:
+    # path can be the directory or its meta.json
+    path = Path(path)
+
+    if path.name == META_FILE:
+        path = path.parent
+
+    meta: dict[str, any] = json.loads((path / META_FILE).read_text())
+
+    if meta.get('format') not in (1, FORMAT_VERSION):
+        raise ValueError(f"'{path}' has an unknown history format: {meta.get('format')}")
+
+    # the images are memory mapped and read only when a row is viewed, the rest is small enough to load
+    files: dict[str, str] = column_files(meta)
+    images: np.ndarray = np.load(path / files['images'], mmap_mode= 'r' if mmap else None)
+    columns: dict[str, np.ndarray] = {
+        attribute: np.load(path / files[name])
+        for name, attribute in COLUMNS.items() if name != 'images'
+    }
+    columns['_images'] = images
+
+    return HistoryStore.from_columns(
+        columns,
+        image_shape= tuple(meta['image_shape']),
+        num_rescored= meta['num_rescored']
+    )
+
+
+def is_columnar(path: str | Path) -> bool:
+    path = Path(path)
+    return path.name == META_FILE or (path / META_FILE).is_file()
@@ -1,5 +1,5 @@
 import customtkinter as ctk
-from numpy import int_, float_
+from numpy import int_, float_, float32
 from numpy.typing import NDArray
 
 
@@ -14,6 +14,7 @@ red_color: str = '#FF4C4C'
 
 NDArrayInt = NDArray[int_]
 NDArrayFloat = NDArray[float_]
+NDArrayFloat32 = NDArray[float32]
 
 button_kwargs: dict[str, any] = {
     'width': 280,
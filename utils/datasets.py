@@ -0,0 +1,242 @@
+import gzip
+import multiprocessing
+import os
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from PIL import Image
+from typing import Callable
+from utils.preprocess import MODEL_SIZE
+
+
+IMAGE_SUFFIXES: tuple[str, ...] = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff')
+NPZ_SUFFIX: str = '.npz'
+# the dtype codes of the third byte of an idx header, multi byte values are big endian
+IDX_DTYPES: dict[int, str] = {
+    0x08: 'u1',
+    0x09: 'i1',
+    0x0B: '>i2',
+    0x0C: '>i4',
+    0x0D: '>f4',
+    0x0E: '>f8'
+}
+# images sent to a worker process at a time, fewer and bigger messages than one per file
+DECODE_CHUNK_SIZE: int = 1024
+
+
+def read_idx(path: str | Path) -> np.ndarray:
+    # the header is 0, 0, dtype code, number of dimensions, then every dimension as a big endian int32
+    path = Path(path)
+    opener = gzip.open if path.suffix == '.gz' else open
+
+    with opener(path, 'rb') as file:
+        header: bytes = file.read(4)
+
+        if len(header) < 4 or header[:2] != b'\x00\x00' or header[2] not in IDX_DTYPES:
+            raise ValueError(f"'{path.name}' is not an IDX file")
+
+        ndim: int = header[3]
+        shape: tuple[int, ...] = tuple(np.frombuffer(file.read(4 * ndim), dtype= '>i4').tolist())
+        dtype = np.dtype(IDX_DTYPES[header[2]])
+        offset: int = 4 + 4 * ndim
+
+        # gzip has to be read through, the rest is only viewed
+        if opener is gzip.open:
+            return np.frombuffer(file.read(), dtype= dtype).reshape(shape)
+
+    return np.memmap(path, dtype= dtype, mode= 'r', offset= offset, shape= shape)
+
+
+def find_idx_pair(path: str | Path) -> tuple[Path, Path]:
+    # either file can be picked, the other one is found by its name (train-images-idx3-ubyte, t10k-labels.idx1-ubyte, ...)
+    path = Path(path)
+
+    for images_part, labels_part in (('images-idx3', 'labels-idx1'), ('images.idx3', 'labels.idx1')):
+        if images_part in path.name:
+            return path, path.with_name(path.name.replace(images_part, labels_part))
+
+        if labels_part in path.name:
+            return path.with_name(path.name.replace(labels_part, images_part)), path
+
+    raise ValueError(f"'{path.name}' is not named like an MNIST images or labels file")
+
+
+def is_idx(path: str | Path) -> bool:
+    name: str = Path(path).name
+    return '-ubyte' in name or '.idx' in name
+
+
+def load_idx(path: str | Path) -> tuple[np.ndarray, np.ndarray]:
+    images_path, labels_path = find_idx_pair(path)
+
+    if not labels_path.is_file():
+        raise FileNotFoundError(f"'{labels_path.name}' is needed next to '{images_path.name}' for the labels")
+
+    return read_idx(images_path), read_idx(labels_path)
+
+
+def load_npz(path: str | Path) -> tuple[np.ndarray, np.ndarray]:
+    # keras' mnist.npz has x_train, y_train, x_test and y_test, every x/y pair is taken
+    with np.load(path) as data:
+        pairs: list[tuple[str, str]] = [
+            (key, 'y' + key[1:]) for key in data.files if key.startswith('x') and 'y' + key[1:] in data.files
+        ]
+
+        if 'images' in data.files and 'labels' in data.files:
+            pairs.append(('images', 'labels'))
+
+        if not pairs:
+            raise ValueError(f"'{Path(path).name}' has no images and labels arrays (x/y, x_train/y_train or images/labels)")
+
+        images: np.ndarray = np.concatenate([data[images_key] for images_key, _ in pairs])
+        labels: np.ndarray = np.concatenate([data[labels_key] for _, labels_key in pairs])
+
+    # one-hot labels
+    if labels.ndim == 2:
+        labels = labels.argmax(axis= 1)
+
+    return images, labels
+
+
+def decode_images(paths: list[str]) -> np.ndarray:
+    # runs in a worker process, the chunk comes back as one array
+    images: np.ndarray = np.empty((len(paths), *MODEL_SIZE), dtype= np.uint8)
+
+    for index, path in enumerate(paths):
+        with Image.open(path) as image:
+            image = image.convert('L')
+
+            # same box averaging as preprocess
+            if image.size != MODEL_SIZE:
+                image = image.resize(MODEL_SIZE, Image.BOX)
+
+            images[index] = np.asarray(image)
+
+    return images
+
+
+def list_image_folder(directory: str | Path) -> tuple[list[str], np.ndarray]:
+    # directory/<digit>/<image>, files anywhere below a digit folder count, anything else is skipped
+    directory = Path(directory)
+    paths: list[str] = []
+    labels: list[int] = []
+
+    for label in range(10):
+        label_dir: Path = directory / str(label)
+
+        if label_dir.is_dir():
+            files: list[str] = sorted(
+                str(path) for path in label_dir.rglob('*') if path.suffix.lower() in IMAGE_SUFFIXES
+            )
+            paths.extend(files)
+            labels.extend([label] * len(files))
+
+    if not paths:
+        raise ValueError(f"'{directory}' has no images in folders named 0 to 9")
+
+    return paths, np.array(labels, dtype= np.int8)
+
+
+def load_image_folder(
+    directory: str | Path,
+    *,
+    num_workers: int | None = None,
+    cancelled: threading.Event | None = None,
+    on_progress: Callable[[int], None] | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    # decoding is cpu bound, so the chunks are spread over processes instead of threads
+    paths, labels = list_image_folder(directory)
+    chunks: list[list[str]] = [paths[start: start + DECODE_CHUNK_SIZE] for start in range(0, len(paths), DECODE_CHUNK_SIZE)]
+    num_workers = min(num_workers or os.cpu_count() or 1, len(chunks))
+    images: np.ndarray = np.empty((len(paths), *MODEL_SIZE), dtype= np.uint8)
+    num_done: int = 0
+
+    # spawned, forking a process that runs tk and the model threads is not safe
+    # with a single cpu starting a worker process costs more than it saves
+    executor: ProcessPoolExecutor | None = ProcessPoolExecutor(
+        max_workers= num_workers,
+        mp_context= multiprocessing.get_context('spawn')
+    ) if num_workers > 1 else None
+
+    try:
+        for decoded in executor.map(decode_images, chunks) if executor is not None else map(decode_images, chunks):
+            if cancelled is not None and cancelled.is_set():
+                break
+
+            images[num_done: num_done + len(decoded)] = decoded
+            num_done += len(decoded)
+
+            if on_progress is not None:
+                on_progress(num_done)
+
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures= True)
+
+    return images[:num_done], labels[:num_done]
+
+
+def to_canvas(images: np.ndarray) -> np.ndarray:
+    # history images are 28x28 uint8, dark digits on a light background like the canvas
+    # called on a chunk at a time, the result is a new array even for a memory mapped file
+    images = np.asarray(images)
+
+    # (n, h, w, 1) arrays and 0 to 1 floats
+    if images.ndim == 4:
+        images = images[..., 0]
+
+    if images.dtype.kind == 'f' and images.max(initial= 0) <= 1:
+        images = images * 255
+
+    images = np.clip(images, 0, 255).astype(np.uint8) if images.dtype != np.uint8 else np.array(images)
+
+    if images.shape[1:3] != MODEL_SIZE:
+        images = np.stack([
+            np.asarray(Image.fromarray(image).resize(MODEL_SIZE, Image.BOX)) for image in images
+        ]) if len(images) else np.empty((0, *MODEL_SIZE), dtype= np.uint8)
+
+    # mnist is light on dark, the border of every image tells which way round it is
+    border: np.ndarray = np.concatenate(
+        [images[:, 0, :], images[:, -1, :], images[:, :, 0], images[:, :, -1]],
+        axis= 1
+    ).mean(axis= 1)
+    dark: np.ndarray = border < 128
+    images[dark] = 255 - images[dark]
+
+    return images
+
+
+def is_dataset(path: str | Path) -> bool:
+    path = Path(path)
+    return path.is_dir() or path.suffix == NPZ_SUFFIX or is_idx(path)
+
+
+def load_dataset(
+    path: str | Path,
+    *,
+    cancelled: threading.Event | None = None,
+    on_progress: Callable[[int], None] | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    # images as the file has them (idx ones memory mapped) and int8 labels, to_canvas converts them chunk by chunk
+    # on_progress is called with the number of decoded folder images
+    path = Path(path)
+
+    if path.is_dir():
+        images, labels = load_image_folder(path, cancelled= cancelled, on_progress= on_progress)
+
+    elif path.suffix == NPZ_SUFFIX:
+        images, labels = load_npz(path)
+
+    else:
+        images, labels = load_idx(path)
+
+    if len(images) != len(labels):
+        raise ValueError(f"'{path.name}' has {len(images)} images but {len(labels)} labels")
+
+    labels = np.asarray(labels)
+
+    if len(labels) and (labels.min() < 0 or labels.max() > 9):
+        raise ValueError(f"'{path.name}' has labels outside of 0 to 9")
+
+    return images, labels.astype(np.int8)
@@ -0,0 +1,128 @@
+import numpy as np
+import utils.common as common
+
+
+class EnvelopeDecimator:
+    def __init__(self, max_buckets: int = 256) -> None:
+        # keeping the min and max of every bucket, a plot a few hundred pixels wide looks the same with them
+        self.max_buckets = max_buckets
+        self.generation: int | None = None
+        self.reset()
+
+
+    def reset(self) -> None:
+        self.bucket_size: int = 1
+        self.num_values: int = 0
+        self.mins = np.empty(self.max_buckets, dtype= np.float64)
+        self.maxs = np.empty(self.max_buckets, dtype= np.float64)
+        self.argmins = np.empty(self.max_buckets, dtype= np.int64)
+        self.argmaxs = np.empty(self.max_buckets, dtype= np.int64)
+
+
+    @property
+    def num_buckets(self) -> int:
+        return -(-self.num_values // self.bucket_size)
+
+
+    def update(self, values: np.ndarray, generation: int) -> None:
+        # a new generation means the history was cleared or replaced, so starting over
+        if generation != self.generation or len(values) < self.num_values:
+            self.generation = generation
+            self.rebuild(values)
+            return None
+
+        new_values = values[self.num_values:]
+
+        # bulk additions (imports) are cheaper to rebuild in one vectorized pass
+        if len(new_values) > self.max_buckets:
+            self.rebuild(values)
+            return None
+
+        for value in new_values:
+            self.add(float(value))
+
+
+    def rebuild(self, values: np.ndarray) -> None:
+        self.reset()
+        num_values: int = len(values)
+
+        if num_values == 0:
+            return None
+
+        # the smallest power of two bucket size that fits everything into max_buckets
+        while -(-num_values // self.bucket_size) > self.max_buckets:
+            self.bucket_size *= 2
+
+        num_buckets: int = -(-num_values // self.bucket_size)
+        padded = np.empty(num_buckets * self.bucket_size, dtype= np.float64)
+        padded[:num_values] = values
+
+        # padding the last bucket with its own last value so that it doesn't change the min or max
+        padded[num_values:] = values[-1]
+        buckets = padded.reshape(num_buckets, self.bucket_size)
+
+        offsets = np.arange(num_buckets) * self.bucket_size
+        self.argmins[:num_buckets] = offsets + buckets.argmin(axis= 1)
+        self.argmaxs[:num_buckets] = offsets + buckets.argmax(axis= 1)
+        self.mins[:num_buckets] = buckets.min(axis= 1)
+        self.maxs[:num_buckets] = buckets.max(axis= 1)
+        self.num_values = num_values
+
+
+    def add(self, value: float) -> None:
+        index: int = self.num_values
+        bucket: int = index // self.bucket_size
+
+        if bucket >= self.max_buckets:
+            self.merge_pairs()
+            bucket = index // self.bucket_size
+
+        if index % self.bucket_size == 0:
+            self.mins[bucket] = self.maxs[bucket] = value
+            self.argmins[bucket] = self.argmaxs[bucket] = index
+
+        elif value < self.mins[bucket]:
+            self.mins[bucket], self.argmins[bucket] = value, index
+
+        elif value > self.maxs[bucket]:
+            self.maxs[bucket], self.argmaxs[bucket] = value, index
+
+        self.num_values += 1
+
+
+    def merge_pairs(self) -> None:
+        # all buckets are full, halving their number by doubling their size
+        half: int = self.max_buckets // 2
+        mins, maxs = self.mins.reshape(half, 2), self.maxs.reshape(half, 2)
+        argmins, argmaxs = self.argmins.reshape(half, 2), self.argmaxs.reshape(half, 2)
+
+        min_side = mins.argmin(axis= 1)
+        max_side = maxs.argmax(axis= 1)
+        rows = np.arange(half)
+
+        self.mins[:half] = mins[rows, min_side]
+        self.argmins[:half] = argmins[rows, min_side]
+        self.maxs[:half] = maxs[rows, max_side]
+        self.argmaxs[:half] = argmaxs[rows, max_side]
+        self.bucket_size *= 2
+
+
+    def points(self) -> tuple[common.NDArrayInt, common.NDArrayFloat]:
+        # (serial numbers, values) to plot, at most two points per bucket in order
+        num_buckets: int = self.num_buckets
+
+        if self.bucket_size == 1:
+            return self.argmins[:num_buckets] + 1, self.mins[:num_buckets].copy()
+
+        argmins, argmaxs = self.argmins[:num_buckets], self.argmaxs[:num_buckets]
+        mins, maxs = self.mins[:num_buckets], self.maxs[:num_buckets]
+        min_first = argmins <= argmaxs
+
+        x = np.empty(2 * num_buckets, dtype= np.int64)
+        y = np.empty(2 * num_buckets, dtype= np.float64)
+        x[0::2] = np.where(min_first, argmins, argmaxs)
+        x[1::2] = np.where(min_first, argmaxs, argmins)
+        y[0::2] = np.where(min_first, mins, maxs)
+        y[1::2] = np.where(min_first, maxs, mins)
+
+        return x + 1, y
@@ -0,0 +1,77 @@
+import hashlib
+import numpy as np
+from utils.history import HistoryStore
+
+
+# 16 bytes are plenty against accidental collisions and keep the index small
+DIGEST_SIZE: int = 16
+
+
+def row_key(history: HistoryStore, index: int) -> bytes:
+    # the stored image bytes and the correct number, the prediction does not make a row different
+    # sha1 only for its speed (hardware accelerated on most cpus), nothing here needs a secure hash
+    digest = hashlib.sha1(history.image_data(index), usedforsecurity= False)
+    digest.update(int(history.labels[index]).to_bytes(1, 'little', signed= True))
+    return digest.digest()[:DIGEST_SIZE]
+
+
+def to_layout(chunk: HistoryStore, history: HistoryStore) -> HistoryStore:
+    # equal images only have equal bytes in the same mode and stored shape
+    if chunk.image_mode == history.image_mode and chunk.stored_shape == history.stored_shape:
+        return chunk
+
+    converted = HistoryStore(capacity= len(chunk), image_shape= history.image_shape, image_mode= history.image_mode)
+    converted.extend(chunk)
+    return converted
+
+
+class DedupIndex:
+    def __init__(self) -> None:
+        # keys of every row of the history, built lazily so appending a prediction costs nothing extra
+        self.keys: set[bytes] = set()
+        self.generation: int | None = None
+        self.num_indexed: int = 0
+        self.num_skipped: int = 0
+
+
+    def reset(self, history: HistoryStore) -> None:
+        self.keys.clear()
+        self.generation = history.generation
+        self.num_indexed = 0
+
+
+    def index(self, history: HistoryStore) -> None:
+        # only the rows added since the last call are hashed, a cleared or replaced history starts over
+        if history.generation != self.generation:
+            self.reset(history)
+
+        for index in range(self.num_indexed, len(history)):
+            self.keys.add(row_key(history, index))
+
+        self.num_indexed = len(history)
+
+
+    def merge(self, history: HistoryStore, chunk: HistoryStore) -> int:
+        # appends the rows of chunk that are not in history yet (nor earlier in chunk), returns how many
+        self.index(history)
+        chunk = to_layout(chunk, history)
+        is_new: np.ndarray = np.zeros(len(chunk), dtype= np.bool_)
+
+        # one set lookup per row
+        for index in range(len(chunk)):
+            key: bytes = row_key(chunk, index)
+
+            if key not in self.keys:
+                self.keys.add(key)
+                is_new[index] = True
+
+        num_new: int = int(is_new.sum())
+        self.num_skipped += len(chunk) - num_new
+
+        if num_new:
+            history.extend(chunk if num_new == len(chunk) else chunk.select(is_new))
+
+        # the new rows were hashed above
+        self.num_indexed = len(history)
+
+        return num_new
@@ -1,31 +1,126 @@
 import pickle
-import numpy as np
 import os
-import pandas as pd
+import tempfile
+import threading
+import time
 from pathlib import Path
 from tkinter.filedialog import asksaveasfilename
+from typing import BinaryIO
+from utils.columnar import save_columnar
+from utils.history import HistoryStore
 
 
-def export_data(data: pd.DataFrame) -> Path | str | None:
-    # converting Image.Image object to np.ndarray
-    data['original_image'] = data['original_image'].apply(np.array)
+# rows pickled per frame, the importer unpickles one frame at a time
+FRAME_SIZE: int = 512
+# the first object of an exported pickle is a header dict, so that a reader expecting a single DataFrame fails instead of
+# silently getting the first frame, and the importer knows how many rows are coming
+PICKLE_FORMAT: str = 'history-frames'
+PICKLE_VERSION: int = 1
 
+
+class CountingWriter:
+    def __init__(self, file: BinaryIO, exporter: 'Exporter') -> None:
+        # pickle writes the file piece by piece, counting them gives the progress of pickle.dump
+        self.file = file
+        self.exporter = exporter
+
+
+    def write(self, data: bytes) -> int:
+        num_bytes: int = self.file.write(data)
+        self.exporter.add_bytes(num_bytes)
+        return num_bytes
+
+
+class Exporter:
+    def __init__(self, history: HistoryStore, file_path: str | Path) -> None:
+        # history should be a snapshot, the live store keeps changing while this writes
+        self.history = history
+        self.file_path = Path(file_path)
+
+        self.num_bytes: int = 0
+        self.error: Exception | None = None
+        self.done = threading.Event()
+
+        self.start_time: float = time.perf_counter()
+        self.elapsed_time: float | None = None
+        self.thread = threading.Thread(target= self.run, daemon= True)
+
+
+    def start(self) -> None:
+        self.start_time = time.perf_counter()
+        self.thread.start()
+
+
+    def add_bytes(self, num_bytes: int) -> None:
+        self.num_bytes += num_bytes
+
+
+    def run(self) -> None:
+        try:
+            # one .npy file per column, written without building a DataFrame
+            if self.file_path.suffix == '.history':
+                self.write_columnar()
+
+            else:
+                self.write_pickle()
+
+        except Exception as e:
+            self.error = e
+
+        finally:
+            self.elapsed_time = time.perf_counter() - self.start_time
+            self.done.set()
+
+
+    def write_pickle(self) -> None:
+        # written next to the target and renamed over it, so a failed export never leaves half a file behind
+        fd, temp_path = tempfile.mkstemp(dir= self.file_path.parent, prefix= f'.{self.file_path.name}.', suffix= '.tmp')
+
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                writer = CountingWriter(file, self)
+
+                pickle.dump(pickle_header(len(self.history)), writer)
+
+                # one small DataFrame after the other, only the images of one frame are decoded at a time
+                for start in range(0, len(self.history), FRAME_SIZE):
+                    pickle.dump(self.history.rows(start, start + FRAME_SIZE).to_dataframe(), writer)
+
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(temp_path, self.file_path)
+
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+    def write_columnar(self) -> None:
+        # the files of a new version are written next to the old ones, replacing meta.json switches to them in one step
+        save_columnar(self.history, self.file_path, on_progress= self.add_bytes)
+
+
+    def progress(self) -> str:
+        elapsed: float = self.elapsed_time if self.elapsed_time is not None else time.perf_counter() - self.start_time
+        megabytes: float = self.num_bytes / 1024 ** 2
+        return f'{megabytes:.1f} MB in {elapsed:.1f}s ({megabytes / max(elapsed, 1e-9):.1f} MB/s)'
+
+
+def pickle_header(num_rows: int) -> dict[str, any]:
+    return {'format': PICKLE_FORMAT, 'version': PICKLE_VERSION, 'rows': num_rows, 'frame_size': FRAME_SIZE}
+
+
+def ask_export_path() -> Path | None:
     # filedialog
     file_path = asksaveasfilename(
         initialdir= os.getcwd(),
         initialfile= 'data',
         defaultextension= '.pkl',
-        filetypes= [('Pickle Files', '*.pkl')]
+        filetypes= [('Pickle Files (header + frames of 512 rows)', '*.pkl'), ('History Directory (memory mappable)', '*.history')]
     )
 
     if not file_path:
         return None
-    
-    try:
-        with open(file_path, 'wb') as file:
-            pickle.dump(data, file)
-
-        return Path(file_path)
-            
-    except Exception as e:
-        return e
+
+    return Path(file_path)
@@ -0,0 +1,462 @@
+import copy
+import itertools
+import zlib
+import numpy as np
+import pandas as pd
+from PIL import Image
+from typing import Literal
+import utils.common as common
+from utils.preprocess import MODEL_SIZE
+
+
+# every store, and every clear, gets a new generation so that caches built from an older history can tell
+_generations = itertools.count()
+
+# how the drawn images are kept:
+# 'raw' as they are, 'compressed' as zlib bytes decoded when a row is loaded, 'model' only at 28x28
+ImageMode = Literal['raw', 'compressed', 'model']
+IMAGE_MODES: tuple[str, ...] = ('raw', 'compressed', 'model')
+
+def upscale(pixels: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    # nearest neighbour, box averaging the result back down gives exactly the same pixels
+    rows, columns = pixels.shape
+
+    if shape[0] % rows == 0 and shape[1] % columns == 0:
+        return pixels.repeat(shape[0] // rows, axis= 0).repeat(shape[1] // columns, axis= 1)
+
+    return np.asarray(Image.fromarray(pixels).resize(shape[::-1], Image.NEAREST))
+
+
+class HistoryStore:
+    def __init__(
+        self,
+        capacity: int = 64,
+        image_shape: tuple[int, int] = (280, 280),
+        image_mode: ImageMode = 'raw'
+    ) -> None:
+        if image_mode not in IMAGE_MODES:
+            raise ValueError(f"Unknown image mode '{image_mode}', expected one of {IMAGE_MODES}")
+
+        # image_shape is the size images are given back at, stored_shape the size they are kept at
+        self.image_shape = image_shape
+        self.image_mode = image_mode
+        self.stored_shape: tuple[int, int] = MODEL_SIZE if image_mode == 'model' else image_shape
+        self.size: int = 0
+        # rows 0 to num_rescored also have a prediction from re-scoring them with the current model
+        self.num_rescored: int = 0
+        # set once a snapshot shares the arrays, the filled rows must not be written in place from then on
+        self.shared: bool = False
+        # bytes the compressed images of the filled rows point to, kept up to date so that nbytes is O(1)
+        self.compressed_bytes: int = 0
+        self.generation: int = next(_generations)
+        self.allocate(capacity)
+
+
+    def allocate(self, capacity: int) -> None:
+        # one typed array per column, rows are written in place
+        self.capacity = capacity
+        if self.image_mode == 'compressed':
+            # one bytes object per row, their lengths differ
+            self._images = np.empty(capacity, dtype= object)
+
+        else:
+            self._images = np.empty((capacity, *self.stored_shape), dtype= np.uint8)
+
+        self._probabilities = np.empty((capacity, 10), dtype= np.float32)
+        self._predictions = np.empty(capacity, dtype= np.int8)
+        self._labels = np.empty(capacity, dtype= np.int8)
+        self._confidences = np.empty(capacity, dtype= np.uint8)
+        self._acc_scores = np.empty(capacity, dtype= np.float32)
+        self._new_predictions = np.empty(capacity, dtype= np.int8)
+        self._new_probabilities = np.empty((capacity, 10), dtype= np.float32)
+
+
+    def reserve(self, capacity: int) -> None:
+        # doubling the capacity, so that the copying cost is amortized O(1) per appended row
+        if capacity <= self.capacity:
+            return None
+
+        new_capacity: int = max(capacity, self.capacity * 2)
+        old_columns = [getattr(self, name)[:self.size] for name in self.column_names()]
+        self.allocate(new_capacity)
+
+        for name, old_column in zip(self.column_names(), old_columns):
+            getattr(self, name)[:self.size] = old_column
+
+        # the new arrays belong to this store only
+        self.shared = False
+
+
+    @staticmethod
+    def column_names() -> tuple[str, ...]:
+        return (
+            '_images', '_probabilities', '_predictions', '_labels', '_confidences', '_acc_scores',
+            '_new_predictions', '_new_probabilities'
+        )
+
+
+    def append(
+        self,
+        *,
+        image: Image.Image | np.ndarray,
+        prediction: int,
+        probabilities: common.NDArrayFloat,
+        correct_number: int,
+        confidence: int,
+        acc_score: float
+    ) -> int:
+        self.reserve(self.size + 1)
+        index: int = self.size
+
+        self.set_image(index, image)
+        self._probabilities[index] = probabilities
+        self._predictions[index] = prediction
+        self._labels[index] = correct_number
+        self._confidences[index] = confidence
+        self._acc_scores[index] = acc_score
+
+        self.size += 1
+        return index
+
+
+    def snapshot(self) -> 'HistoryStore':
+        # O(1) read only copy for writing on another thread, it shares the filled rows instead of copying them
+        # appending only writes past them, clear and set_rescored copy the arrays first while they are shared
+        snapshot: HistoryStore = copy.copy(self)
+
+        for name in self.column_names():
+            setattr(snapshot, name, getattr(self, name)[:self.size])
+
+        snapshot.capacity = self.size
+        self.shared = snapshot.shared = True
+
+        return snapshot
+
+
+    def select(self, mask: np.ndarray) -> 'HistoryStore':
+        # a new store with only the rows where mask is true, in the same order
+        selected: HistoryStore = copy.copy(self)
+
+        for name in self.column_names():
+            setattr(selected, name, getattr(self, name)[:self.size][mask])
+
+        selected.size = selected.capacity = int(np.count_nonzero(mask))
+        selected.compressed_bytes = selected.count_compressed_bytes()
+        # the kept rows of the re-scored prefix still come first
+        selected.num_rescored = int(np.count_nonzero(mask[:self.num_rescored]))
+        selected.shared = False
+        selected.generation = next(_generations)
+
+        return selected
+
+
+    def rows(self, start: int, stop: int) -> 'HistoryStore':
+        # a view of rows start to stop, nothing is copied
+        view: HistoryStore = copy.copy(self)
+        stop = min(stop, self.size)
+
+        for name in self.column_names():
+            setattr(view, name, getattr(self, name)[start: stop])
+
+        view.size = view.capacity = stop - start
+        view.compressed_bytes = view.count_compressed_bytes()
+        view.num_rescored = min(max(self.num_rescored - start, 0), stop - start)
+        # the rows belong to this store, the view must not write them in place
+        view.shared = True
+
+        return view
+
+
+    def extend(self, other: 'HistoryStore') -> None:
+        # appending all the rows of another store, column by column
+        start, stop = self.size, self.size + len(other)
+        self.reserve(stop)
+
+        if other.image_mode == self.image_mode and other.stored_shape == self.stored_shape:
+            self._images[start: stop] = other._images[:len(other)]
+            self.compressed_bytes += other.compressed_bytes
+
+        # the same stored shape in another mode is re-encoded straight from the pixels, without a PIL round trip
+        # 28x28 rows (of a dataset) stay 28x28 when compressed, and are scaled up without blurring when raw
+        else:
+            for offset in range(len(other)):
+                pixels: np.ndarray = other.image_batch(offset, offset + 1)[0]
+
+                if self.image_mode == 'raw' and pixels.shape != self.stored_shape:
+                    pixels = upscale(pixels, self.stored_shape)
+
+                self.set_image(start + offset, pixels)
+
+        for name in ('_probabilities', '_predictions', '_labels', '_confidences', '_acc_scores', '_new_predictions', '_new_probabilities'):
+            getattr(self, name)[start: stop] = getattr(other, name)[:len(other)]
+
+        # re-scored rows have to stay a prefix, so the other store's ones only count if all rows so far are re-scored
+        if self.num_rescored == self.size:
+            self.num_rescored += other.num_rescored
+
+        self.size = stop
+
+
+    def set_image(self, index: int, image: Image.Image | np.ndarray) -> None:
+        if self.image_mode == 'model':
+            if not isinstance(image, Image.Image):
+                image = Image.fromarray(np.asarray(image, dtype= np.uint8))
+
+            # box averaged like preprocess and the stroke raster, so the stored pixels are the model input rounded to uint8
+            if image.size != MODEL_SIZE:
+                image = image.convert('L').resize(MODEL_SIZE, Image.BOX)
+
+        # the pixels are copied straight into the image array, no PIL object is kept
+
+        pixels = np.asarray(image, dtype= np.uint8)
+
+        if self.image_mode == 'compressed':
+            # a row written again no longer counts with its old bytes
+            if index < self.size:
+                self.compressed_bytes -= len(self._images[index])
+
+            # drawings are mostly background, so even the fastest level shrinks them a lot
+            # 28x28 pixels (dataset rows) are kept at that size, decode tells them apart by their length
+            self._images[index] = zlib.compress(np.ascontiguousarray(pixels).tobytes(), 1)
+            self.compressed_bytes += len(self._images[index])
+
+        else:
+            self._images[index] = pixels
+
+
+    def clear(self) -> None:
+        # keeping the allocated arrays for the next session, unless a snapshot still uses them
+        # read only (memory mapped) arrays are replaced by small ones, their capacity is only their size on disk
+        if self.shared or not self.writeable:
+            self.allocate(self.capacity if self.writeable else 64)
+            self.shared = False
+
+        self.size = 0
+        self.num_rescored = 0
+        self.compressed_bytes = 0
+        self.generation = next(_generations)
+
+
+    def __len__(self) -> int:
+        return self.size
+
+
+    @property
+    def empty(self) -> bool:
+        return self.size == 0
+
+
+    @property
+    def writeable(self) -> bool:
+        return all(getattr(self, name).flags.writeable for name in self.column_names())
+
+
+    # views of the filled rows
+    @property
+    def images(self) -> np.ndarray:
+        # a view in the 'raw' and 'model' modes, decoded into a new array in the 'compressed' mode
+        return self.image_batch(0, self.size)
+
+
+    def image_batch(self, start: int, stop: int) -> np.ndarray:
+        # (n, h, w) uint8 pixels of rows start to stop, at the stored resolution
+        if self.image_mode != 'compressed':
+            return self._images[start: stop]
+
+        batch = np.empty((len(range(start, stop)), *self.stored_shape), dtype= np.uint8)
+
+        for offset, data in enumerate(self._images[start: stop]):
+            pixels: np.ndarray = self.decode(data)
+            batch[offset] = pixels if pixels.shape == self.stored_shape else upscale(pixels, self.stored_shape)
+
+        return batch
+
+
+    def image_data(self, index: int) -> bytes | memoryview:
+        # the stored bytes of a row, equal for equal images as long as the mode and stored shape are the same
+        if self.image_mode == 'compressed':
+            return self._images[index]
+
+        # rows are contiguous, so they can be read without copying them
+        return memoryview(np.ascontiguousarray(self._images[index])).cast('B')
+
+
+    def decode(self, data: bytes) -> np.ndarray:
+        # rows are at the stored shape, or at 28x28 when they came from a dataset
+        pixels = np.frombuffer(zlib.decompress(data), dtype= np.uint8)
+        return pixels.reshape(MODEL_SIZE if pixels.size == MODEL_SIZE[0] * MODEL_SIZE[1] else self.stored_shape)
+
+
+    @property
+    def probabilities(self) -> np.ndarray:
+        return self._probabilities[:self.size]
+
+
+    @property
+    def predictions(self) -> np.ndarray:
+        return self._predictions[:self.size]
+
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self._labels[:self.size]
+
+
+    @property
+    def confidences(self) -> np.ndarray:
+        return self._confidences[:self.size]
+
+
+    @property
+    def acc_scores(self) -> np.ndarray:
+        return self._acc_scores[:self.size]
+
+
+    @property
+    def correctness(self) -> np.ndarray:
+        return self.predictions == self.labels
+
+
+    @property
+    def new_predictions(self) -> np.ndarray:
+        return self._new_predictions[:self.num_rescored]
+
+
+    @property
+    def new_probabilities(self) -> np.ndarray:
+        return self._new_probabilities[:self.num_rescored]
+
+
+    def set_rescored(self, predictions: np.ndarray, probabilities: np.ndarray) -> None:
+        # predictions of the first len(predictions) rows from the current model, the original ones are kept
+        # a cancelled run only overwrites the rows it got to
+        num_rows: int = len(predictions)
+
+        if self.shared:
+            self._new_predictions = self._new_predictions.copy()
+            self._new_probabilities = self._new_probabilities.copy()
+
+        self._new_predictions[:num_rows] = predictions
+        self._new_probabilities[:num_rows] = probabilities
+        self.num_rescored = max(self.num_rescored, num_rows)
+
+
+    def get_image(self, index: int) -> Image.Image:
+        # always at image_shape, so that it can be drawn on the canvas whatever the mode
+        if self.image_mode == 'compressed':
+            image = Image.fromarray(self.decode(self._images[index]))
+
+        else:
+            image = Image.fromarray(self._images[index])
+
+        # 28x28 rows, of the 'model' mode or of a dataset
+        if image.size != self.image_shape[::-1]:
+            image = image.resize(self.image_shape[::-1], Image.BILINEAR)
+
+        return image
+
+
+    def nbytes(self) -> int:
+        # called after every appended row, so the bytes of the compressed images are a running total
+        # the object column itself only counts its pointers
+        return sum(getattr(self, name)[:self.size].nbytes for name in self.column_names()) + self.compressed_bytes
+
+
+    def count_compressed_bytes(self) -> int:
+        # going over every row, only for stores made from the rows of another one
+        if self.image_mode != 'compressed':
+            return 0
+
+        return sum(len(data) for data in self._images[:self.size])
+
+
+    def bytes_per_row(self) -> float:
+        return self.nbytes() / self.size if self.size else 0.0
+
+
+    def to_dataframe(self) -> pd.DataFrame:
+        # the old row layout, only built when something like export asks for it
+        df = pd.DataFrame({
+            'original_image': list(self.images),
+            'Prediction': self.predictions.astype(np.int64),
+            'probabilities': list(self.probabilities),
+            'Correct Number': self.labels.astype(np.int64),
+            'Confidence (%)': self.confidences.astype(np.int64),
+            'correctness': self.correctness,
+            'acc_score': self.acc_scores.astype(np.float64)
+        })
+
+        # re-scored predictions go alongside the original ones, -1 and zeros for the rows that weren't re-scored
+        if self.num_rescored:
+            new_predictions = np.full(self.size, -1, dtype= np.int64)
+            new_predictions[:self.num_rescored] = self.new_predictions
+            new_probabilities = np.zeros((self.size, 10), dtype= np.float32)
+            new_probabilities[:self.num_rescored] = self.new_probabilities
+
+            df['New Prediction'] = new_predictions
+            df['new_probabilities'] = list(new_probabilities)
+
+        return df
+
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: dict[str, np.ndarray],
+        *,
+        image_shape: tuple[int, int] = (280, 280),
+        image_mode: ImageMode | None = None,
+        num_rescored: int = 0
+    ) -> 'HistoryStore':
+        # uses the given arrays as they are (memory mapped ones too), they are only copied if rows are appended or written
+        # without image_mode it is told from the shape of the pixels, compressed images (bytes per row) need it given
+        images: np.ndarray = columns['_images']
+
+        if image_mode is None:
+            stored_shape: tuple[int, int] = images.shape[1:]
+            image_mode = 'model' if stored_shape == MODEL_SIZE and stored_shape != image_shape else 'raw'
+            image_shape = image_shape if image_mode == 'model' else stored_shape
+
+        store = cls(capacity= 0, image_shape= image_shape, image_mode= image_mode)
+
+        for name in cls.column_names():
+            setattr(store, name, columns[name])
+
+        store.capacity = store.size = len(images)
+        store.num_rescored = num_rescored
+        store.compressed_bytes = store.count_compressed_bytes()
+        # read only arrays are treated like the ones of a snapshot, they are copied before anything is written to them
+        store.shared = not store.writeable
+
+        return store
+
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, image_mode: ImageMode = 'raw') -> 'HistoryStore':
+        first_image = np.asarray(df['original_image'].iloc[0]) if len(df) else np.empty((280, 280))
+        image_shape: tuple[int, int] = first_image.shape
+
+        # exported from a 'model' session, there is nothing more to keep and the canvas still needs 280x280
+        if image_shape == MODEL_SIZE:
+            image_mode, image_shape = 'model', (280, 280)
+
+        store = cls(capacity= max(len(df), 1), image_shape= image_shape, image_mode= image_mode)
+
+        # filling every column in one go
+        for index, image in enumerate(df['original_image']):
+            store.set_image(index, image)
+
+        store._probabilities[:len(df)] = np.stack(df['probabilities'].to_numpy()) if len(df) else 0
+        store._predictions[:len(df)] = df['Prediction'].to_numpy(dtype= np.int64)
+        store._labels[:len(df)] = df['Correct Number'].to_numpy(dtype= np.int64)
+        store._confidences[:len(df)] = df['Confidence (%)'].to_numpy(dtype= np.int64)
+        store._acc_scores[:len(df)] = df['acc_score'].to_numpy(dtype= np.float64)
+        store.size = len(df)
+
+        if 'New Prediction' in df:
+            new_predictions = df['New Prediction'].to_numpy(dtype= np.int64)
+            store._new_predictions[:len(df)] = new_predictions
+            store._new_probabilities[:len(df)] = np.stack(df['new_probabilities'].to_numpy())
+            store.num_rescored = int((new_predictions >= 0).sum())
+
+        return store
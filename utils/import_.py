@@ -1,27 +1,310 @@
 import pickle
 import os
+import queue
+import threading
+import time
+import numpy as np
 import pandas as pd
-from PIL import Image
-from tkinter.filedialog import askopenfilename
+from tkinter.filedialog import askdirectory, askopenfilename
+from typing import BinaryIO
+import utils.common as common
+from utils.columnar import META_FILE, is_columnar, load_columnar
+from utils.datasets import is_dataset, load_dataset, to_canvas
+from utils.export import PICKLE_FORMAT, PICKLE_VERSION
+from utils.history import HistoryStore, ImageMode
+from utils.preprocess import new_input_buffer, process_arrays
 
 
-def import_data() -> pd.DataFrame | str | None:
-    file_path = askopenfilename(
-        initialdir= os.getcwd(),
-        filetypes= [('Pickle Files', '*.pkl')]
-    )
+class CountingReader:
+    def __init__(self, file: BinaryIO) -> None:
+        # pickle reads the file piece by piece, counting them gives the progress of pickle.load
+        self.file = file
+        self.num_bytes: int = 0
+
+
+    def read(self, size: int = -1) -> bytes:
+        data: bytes = self.file.read(size)
+        self.num_bytes += len(data)
+        return data
+
+
+    def readinto(self, buffer: any) -> int:
+        num_bytes: int = self.file.readinto(buffer)
+        self.num_bytes += num_bytes
+        return num_bytes
+
+
+    def readline(self, size: int = -1) -> bytes:
+        data: bytes = self.file.readline(size)
+        self.num_bytes += len(data)
+        return data
+
+
+class StreamingImporter:
+    def __init__(self, file_path: str, *, image_mode: ImageMode = 'raw', chunk_size: int = 512) -> None:
+        self.file_path = file_path
+        self.image_mode = image_mode
+        self.chunk_size = chunk_size
+
+        # chunks of rows already converted to the history layout, the GUI thread appends them as they come
+        self.chunks: queue.Queue[HistoryStore] = queue.Queue()
+        self.reader: CountingReader | None = None
+        self.total_bytes: int = os.path.getsize(file_path)
+        self.total_rows: int | None = None
+        self.num_rows: int = 0
+        self.error: Exception | None = None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+
+        self.start_time: float = time.perf_counter()
+        self.elapsed_time: float | None = None
+        self.thread = threading.Thread(target= self.run, daemon= True)
+
+
+    def start(self) -> None:
+        self.start_time = time.perf_counter()
+        self.thread.start()
+
+
+    def cancel(self) -> None:
+        # the rows already converted are kept
+        self.cancelled.set()
+
+
+    def run(self) -> None:
+        try:
+            with open(self.file_path, 'rb') as file:
+                self.reader = CountingReader(file)
+
+                # exports start with a header that gives the number of rows, then pickle them frame by frame,
+                # one DataFrame of a few hundred rows after the other, so only one frame is in memory at a time
+                # and cancelling stops at the next frame
+                # a file from an older version is a single DataFrame, it is unpickled whole before its first row shows up
+                data: pd.DataFrame | dict[str, any] | None = self.next_frame()
+                header: dict[str, any] | None = data if isinstance(data, dict) else None
+
+                if header is not None:
+                    if header.get('format') != PICKLE_FORMAT or header.get('version') != PICKLE_VERSION:
+                        raise ValueError(f"'{self.file_path}' is not a history export this version can read")
+
+                    self.total_rows = header['rows']
+                    data = self.next_frame()
+
+                while data is not None and not self.cancelled.is_set():
+                    # the images stay arrays, they go straight into the history without making PIL images
+                    for start in range(0, len(data), self.chunk_size):
+                        if self.cancelled.is_set():
+                            break
+
+                        chunk: pd.DataFrame = data.iloc[start: start + self.chunk_size]
+                        self.chunks.put(HistoryStore.from_dataframe(chunk, image_mode= self.image_mode))
+                        self.num_rows += len(chunk)
+
+                    data = self.next_frame()
+
+            # a file cut off after a whole frame still unpickles, only the header tells that rows are missing
+            if header is not None and not self.cancelled.is_set() and self.num_rows != self.total_rows:
+                raise ValueError(f"'{self.file_path}' has {self.num_rows} of its {self.total_rows} rows, the file is incomplete")
+
+        except Exception as e:
+            self.error = e
+
+        finally:
+            self.elapsed_time = time.perf_counter() - self.start_time
+            self.done.set()
+
+
+    def next_frame(self) -> pd.DataFrame | dict[str, any] | None:
+        # None at the end of the file
+        try:
+            return pickle.load(self.reader)
+
+        except EOFError:
+            return None
+
+
+    def take_chunks(self) -> list[HistoryStore]:
+        # called from the GUI thread
+        chunks: list[HistoryStore] = []
+
+        while True:
+            try:
+                chunks.append(self.chunks.get_nowait())
+
+            except queue.Empty:
+                return chunks
+
+
+    def progress(self) -> str:
+        elapsed: float = self.elapsed_time if self.elapsed_time is not None else time.perf_counter() - self.start_time
+
+        # the number of rows of a pickle is only known at its end, the bytes read so far tell how far it got
+        if self.total_rows is None:
+            num_bytes: int = self.reader.num_bytes if self.reader is not None else 0
+            percent: float = 100 * num_bytes / self.total_bytes if self.total_bytes else 100.0
+            return f'{self.num_rows} rows, {percent:.0f}% read ({num_bytes / 1024 ** 2 / max(elapsed, 1e-9):.1f} MB/s)'
+
+        return f'{self.num_rows}/{self.total_rows} rows ({self.rows_per_second():.0f} rows/s)'
+
+
+    def rows_per_second(self) -> float:
+        elapsed: float = self.elapsed_time if self.elapsed_time is not None else time.perf_counter() - self.start_time
+        return self.num_rows / elapsed if elapsed > 0 else 0.0
+
+
+class DatasetImporter(StreamingImporter):
+    def __init__(
+        self,
+        file_path: str,
+        engine: any,
+        *,
+        image_mode: ImageMode = 'raw',
+        chunk_size: int = 512,
+        engine_lock: 'threading.Lock | None' = None
+    ) -> None:
+        # labeled images without predictions (mnist idx, .npz, image folders), every image is predicted while importing
+        super().__init__(file_path, image_mode= image_mode, chunk_size= chunk_size)
+        self.engine = engine
+        self.engine_lock = engine_lock if engine_lock is not None else threading.Lock()
+        self.num_decoded: int = 0
+
+
+    def run(self) -> None:
+        try:
+            images, labels = load_dataset(self.file_path, cancelled= self.cancelled, on_progress= self.set_num_decoded)
+            self.total_rows = len(images)
+            buffer: common.NDArrayFloat32 = new_input_buffer(self.chunk_size)
+            num_correct: int = 0
+
+            for start in range(0, len(images), self.chunk_size):
+                if self.cancelled.is_set():
+                    break
+
+                stop: int = min(start + self.chunk_size, len(images))
+                # only this chunk of a memory mapped file is read and inverted
+                pixels: np.ndarray = to_canvas(images[start: stop])
+                inputs = process_arrays(pixels, invert= True, out= buffer)
+
+                with self.engine_lock:
+                    probas: common.NDArrayFloat = self.engine.predict_batch(inputs)
+
+                predictions: np.ndarray = probas.argmax(axis= 1)
+                correct: np.ndarray = predictions == labels[start: stop]
+
+                # same confidence and running accuracy as appending a prediction by hand
+                accuracies = (num_correct + np.cumsum(correct)) / np.arange(start + 1, stop + 1)
+                num_correct += int(correct.sum())
+
+                chunk = HistoryStore.from_columns(
+                    {
+                        '_images': pixels,
+                        '_probabilities': probas.astype(np.float32),
+                        '_predictions': predictions.astype(np.int8),
+                        '_labels': labels[start: stop],
+                        '_confidences': (np.round(probas.max(axis= 1).astype(np.float64), 2) * 100).astype(np.uint8),
+                        '_acc_scores': accuracies.astype(np.float32),
+                        '_new_predictions': np.zeros(stop - start, dtype= np.int8),
+                        '_new_probabilities': np.zeros((stop - start, 10), dtype= np.float32)
+                    },
+                    image_shape= (280, 280)
+                )
+
+                # the 28x28 images are converted to the layout of the history here, the GUI thread only copies them
+                # they stay 28x28 in a compressed history and are scaled up without blurring in a raw one
+                if self.image_mode != chunk.image_mode:
+                    converted = HistoryStore(capacity= len(chunk), image_mode= self.image_mode)
+                    converted.extend(chunk)
+                    chunk = converted
+
+                self.chunks.put(chunk)
+                self.num_rows += len(chunk)
+
+        except Exception as e:
+            self.error = e
+
+        finally:
+            self.elapsed_time = time.perf_counter() - self.start_time
+            self.done.set()
+
+
+    def set_num_decoded(self, num_decoded: int) -> None:
+        self.num_decoded = num_decoded
+
+
+    def progress(self) -> str:
+        # still decoding an image folder
+        if self.total_rows is None:
+            return f'decoding {self.num_decoded} images'
+
+        return f'{self.num_rows}/{self.total_rows} rows predicted ({self.rows_per_second():.0f} rows/s)'
+
+
+class ColumnarImporter(StreamingImporter):
+    def run(self) -> None:
+        # the images of a history directory are memory mapped, each chunk is read from disk and copied into the
+        # image mode of this session, so the history never holds on to the read only files
+        try:
+            history: HistoryStore = load_columnar(self.file_path)
+            self.total_rows = len(history)
+
+            for start in range(0, len(history), self.chunk_size):
+                if self.cancelled.is_set():
+                    break
+
+                rows: HistoryStore = history.rows(start, start + self.chunk_size)
+                chunk = HistoryStore(capacity= len(rows), image_mode= self.image_mode)
+                chunk.extend(rows)
+
+                self.chunks.put(chunk)
+                self.num_rows += len(chunk)
+
+        except Exception as e:
+            self.error = e
+
+        finally:
+            self.elapsed_time = time.perf_counter() - self.start_time
+            self.done.set()
+
+
+def import_data(
+    image_mode: ImageMode = 'raw',
+    *,
+    folder: bool = False,
+    engine: any = None,
+    engine_lock: 'threading.Lock | None' = None
+) -> StreamingImporter | Exception | None:
+    # folder picks a directory of digit folders, anything else a file
+    if folder:
+        file_path = askdirectory(initialdir= os.getcwd(), mustexist= True)
+
+    else:
+        file_path = askopenfilename(
+            initialdir= os.getcwd(),
+            filetypes= [
+                ('Pickle Files', '*.pkl'),
+                ('History Directory (memory mappable)', META_FILE),
+                ('MNIST IDX Files', ('*-ubyte', '*-ubyte.gz', '*.idx', '*.idx.gz')),
+                ('NumPy Arrays', '*.npz')
+            ]
+        )
     
     if not file_path:
         return None
     
     try:
-        with open(file_path, 'rb') as file:
-            data: pd.DataFrame = pickle.load(file)
+        # history directories are copied into the history chunk by chunk on a worker thread
+        if is_columnar(file_path):
+            return ColumnarImporter(file_path, image_mode= image_mode)
 
-            # converting np.ndarray to Image.Image object
-            data['original_image'] = data['original_image'].apply(Image.fromarray)
+        # datasets only have labels, the images are predicted on a worker thread
+        if is_dataset(file_path):
+            if engine is None:
+                raise RuntimeError('The model is still loading, it is needed to predict the images of a dataset')
 
-        return data
+            return DatasetImporter(file_path, engine, image_mode= image_mode, engine_lock= engine_lock)
+
+        # pickles are read frame by frame and converted on a worker thread once the importer is started
+        return StreamingImporter(file_path, image_mode= image_mode)
     
     except Exception as e:
         return e
@@ -0,0 +1,165 @@
+import threading
+import time
+import numpy as np
+import utils.common as common
+from utils.numpy_engine import NumpyEngine
+
+
+MODEL_PATH: str = 'kaggle/working/handwritten_digit_rec.keras'
+TFLITE_FP16_PATH: str = 'kaggle/working/handwritten_digit_rec_fp16.tflite'
+TFLITE_INT8_PATH: str = 'kaggle/working/handwritten_digit_rec_int8.tflite'
+INPUT_SHAPE: tuple[int, int, int] = (28, 28, 1)
+
+
+class KerasEngine:
+    def __init__(self, model_path: str = MODEL_PATH) -> None:
+        # importing here so that the modules using this file don't pay for tensorflow unless a model is loaded
+        import tensorflow as tf
+
+        self.model = tf.keras.models.load_model(model_path)
+
+        # tracing once with a fixed signature, calling the model directly skips the data adapter,
+        # callbacks and progress bar that model.predict builds on every call
+        self._predict_one = tf.function(
+            lambda np_img: self.model(np_img, training= False),
+            input_signature= [tf.TensorSpec(shape= (1, *INPUT_SHAPE), dtype= tf.float32)]
+        )
+        self._predict_batch = tf.function(
+            lambda batch: self.model(batch, training= False),
+            input_signature= [tf.TensorSpec(shape= (None, *INPUT_SHAPE), dtype= tf.float32)]
+        )
+
+        self.warm_up()
+
+
+    def warm_up(self) -> None:
+        # the first call of a tf.function traces the graph, doing it here keeps it out of the first prediction
+        self.predict(np.zeros((1, *INPUT_SHAPE), dtype= np.float32))
+        self.predict_batch(np.zeros((2, *INPUT_SHAPE), dtype= np.float32))
+
+
+    def predict(self, np_img: common.NDArrayFloat) -> common.NDArrayFloat:
+        # probabilities of a single (1, 28, 28, 1) image
+        return self._predict_one(np.asarray(np_img, dtype= np.float32)).numpy()[0]
+
+
+    def predict_batch(self, batch: common.NDArrayFloat) -> common.NDArrayFloat:
+        return self._predict_batch(np.asarray(batch, dtype= np.float32)).numpy()
+
+
+    def predict_legacy(self, np_img: common.NDArrayFloat) -> common.NDArrayFloat:
+        # the old model.predict path, only kept to compare the latency against
+        return self.model.predict(np_img, verbose= 0)[0]
+
+
+class TFLiteEngine:
+    def __init__(self, model_path: str = TFLITE_INT8_PATH) -> None:
+        # the small tflite_runtime package is enough on the kiosks, full tensorflow is only the fallback
+        try:
+            from tflite_runtime.interpreter import Interpreter
+
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path= model_path)
+        self.interpreter.allocate_tensors()
+
+        self.input_details: dict[str, any] = self.interpreter.get_input_details()[0]
+        self.output_details: dict[str, any] = self.interpreter.get_output_details()[0]
+        self.batch_size: int = int(self.input_details['shape'][0])
+
+        self.warm_up()
+
+
+    def warm_up(self) -> None:
+        self.predict(np.zeros((1, *INPUT_SHAPE), dtype= np.float32))
+
+
+    def resize(self, batch_size: int) -> None:
+        # reallocating only when the batch size changes, so single predictions never reallocate
+        if batch_size == self.batch_size:
+            return None
+
+        self.interpreter.resize_tensor_input(self.input_details['index'], [batch_size, *INPUT_SHAPE])
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.batch_size = batch_size
+
+
+    def run(self, batch: common.NDArrayFloat) -> common.NDArrayFloat:
+        self.resize(len(batch))
+
+        input_dtype = self.input_details['dtype']
+        batch = np.asarray(batch, dtype= np.float32)
+
+        # an int8 model takes quantized input, so scaling with the calibrated parameters
+        if input_dtype != np.float32:
+            scale, zero_point = self.input_details['quantization']
+            batch = np.clip(np.round(batch / scale + zero_point), np.iinfo(input_dtype).min, np.iinfo(input_dtype).max)
+            batch = batch.astype(input_dtype)
+
+        self.interpreter.set_tensor(self.input_details['index'], batch)
+        self.interpreter.invoke()
+        probas = self.interpreter.get_tensor(self.output_details['index'])
+
+        if self.output_details['dtype'] != np.float32:
+            scale, zero_point = self.output_details['quantization']
+            probas = (probas.astype(np.float32) - zero_point) * scale
+
+        return probas
+
+
+    def predict(self, np_img: common.NDArrayFloat) -> common.NDArrayFloat:
+        return self.run(np_img)[0]
+
+
+    def predict_batch(self, batch: common.NDArrayFloat) -> common.NDArrayFloat:
+        return self.run(batch)
+
+
+BACKENDS: dict[str, tuple[type, str]] = {
+    'keras': (KerasEngine, MODEL_PATH),
+    'tflite-fp16': (TFLiteEngine, TFLITE_FP16_PATH),
+    'tflite-int8': (TFLiteEngine, TFLITE_INT8_PATH),
+    'numpy': (NumpyEngine, MODEL_PATH)
+}
+
+
+def load_engine(backend: str = 'keras', model_path: str | None = None) -> KerasEngine | TFLiteEngine | NumpyEngine:
+    engine_class, default_path = BACKENDS[backend]
+    return engine_class(model_path if model_path is not None else default_path)
+
+
+class EngineLoader:
+    def __init__(self, backend: str = 'keras', model_path: str | None = None) -> None:
+        self.engine: KerasEngine | TFLiteEngine | NumpyEngine | None = None
+        self.error: Exception | None = None
+        self.load_time: float | None = None
+        self.ready = threading.Event()
+
+        # importing tensorflow and loading the model takes seconds, so it is done off the GUI thread
+        self.start_time: float = time.perf_counter()
+        self.thread = threading.Thread(
+            target= self.load,
+            args= (backend, model_path),
+            daemon= True
+        )
+        self.thread.start()
+
+
+    def load(self, backend: str, model_path: str | None) -> None:
+        try:
+            self.engine = load_engine(backend, model_path)
+
+        except Exception as e:
+            self.error = e
+
+        finally:
+            self.load_time = time.perf_counter() - self.start_time
+            self.ready.set()
+
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start_time
@@ -0,0 +1,535 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from pathlib import Path
+from typing import BinaryIO, Iterator
+from utils.history import HistoryStore, ImageMode
+from utils.preprocess import MODEL_SIZE
+
+
+# the journal directory holds journal.json, the compacted history (a record file like the segments) and the segments written since
+FORMAT_VERSION: int = 2
+META_FILE: str = 'journal.json'
+# every record is this header and then image_size bytes of the image, kept as the history keeps it (zlib bytes when compressed)
+HEADER_DTYPE = np.dtype([
+    ('image_size', '<u4'),
+    ('probabilities', '<f4', (10,)),
+    ('prediction', 'i1'),
+    ('label', 'i1'),
+    ('confidence', 'u1'),
+    ('acc_score', '<f4'),
+    ('new_prediction', 'i1'),
+    ('new_probabilities', '<f4', (10,))
+])
+# rows encoded, decoded and copied at a time
+CHUNK_SIZE: int = 256
+COPY_SIZE: int = 1024 ** 2
+
+
+def encode_rows(history: HistoryStore, start: int, stop: int) -> bytes:
+    # the images go in as they are stored, so the history has to be in the mode of the journal already
+    headers = np.zeros(stop - start, dtype= HEADER_DTYPE)
+    headers['probabilities'] = history.probabilities[start: stop]
+    headers['prediction'] = history.predictions[start: stop]
+    headers['label'] = history.labels[start: stop]
+    headers['confidence'] = history.confidences[start: stop]
+    headers['acc_score'] = history.acc_scores[start: stop]
+
+    # only the re-scored prefix has new predictions
+    rescored_stop: int = min(stop, history.num_rescored)
+
+    if start < rescored_stop:
+        headers['new_prediction'][:rescored_stop - start] = history.new_predictions[start: rescored_stop]
+        headers['new_probabilities'][:rescored_stop - start] = history.new_probabilities[start: rescored_stop]
+
+    parts: list[bytes | memoryview] = []
+
+    for offset, index in enumerate(range(start, stop)):
+        image: bytes | memoryview = history.image_data(index)
+        headers['image_size'][offset] = len(image)
+        parts.append(headers[offset].tobytes())
+        parts.append(image)
+
+    return b''.join(parts)
+
+
+def read_records(
+    file: BinaryIO,
+    num_bytes: int,
+    *,
+    image_mode: ImageMode,
+    image_shape: tuple[int, int],
+    num_rescored: int = 0
+) -> Iterator[HistoryStore]:
+    # the records in the first num_bytes of file, CHUNK_SIZE rows at a time, a record cut off by a crash is dropped
+    stored_shape: tuple[int, int] = MODEL_SIZE if image_mode == 'model' else image_shape
+    pixels_size: int = stored_shape[0] * stored_shape[1]
+    position: int = 0
+    start: int = 0
+
+    while True:
+        headers: list[bytes] = []
+        images: list[bytes] = []
+
+        while len(headers) < CHUNK_SIZE and position + HEADER_DTYPE.itemsize <= num_bytes:
+            header: bytes = file.read(HEADER_DTYPE.itemsize)
+            image_size: int = int(np.frombuffer(header, dtype= HEADER_DTYPE)['image_size'][0])
+
+            if position + HEADER_DTYPE.itemsize + image_size > num_bytes:
+                break
+
+            if image_mode != 'compressed' and image_size != pixels_size:
+                raise ValueError(f'A journal record has {image_size} bytes of pixels, {pixels_size} were expected')
+
+            headers.append(header)
+            images.append(file.read(image_size))
+            position += HEADER_DTYPE.itemsize + image_size
+
+        if not headers:
+            return None
+
+        records: np.ndarray = np.frombuffer(b''.join(headers), dtype= HEADER_DTYPE)
+
+        if image_mode == 'compressed':
+            pixels = np.empty(len(images), dtype= object)
+            pixels[:] = images
+
+        else:
+            pixels = np.frombuffer(b''.join(images), dtype= np.uint8).reshape(len(images), *stored_shape)
+
+        yield HistoryStore.from_columns(
+            {
+                '_images': pixels,
+                '_probabilities': records['probabilities'],
+                '_predictions': records['prediction'],
+                '_labels': records['label'],
+                '_confidences': records['confidence'],
+                '_acc_scores': records['acc_score'],
+                '_new_predictions': records['new_prediction'],
+                '_new_probabilities': records['new_probabilities']
+            },
+            image_shape= image_shape,
+            image_mode= image_mode,
+            num_rescored= min(max(num_rescored - start, 0), len(headers))
+        )
+        start += len(headers)
+
+
+def whole_records_size(path: Path) -> tuple[int, int]:
+    # the number of bytes and of records before the first one cut off by a crash, only the headers are read
+    file_size: int = path.stat().st_size
+    position: int = 0
+    num_records: int = 0
+
+    with open(path, 'rb') as file:
+        while position + HEADER_DTYPE.itemsize <= file_size:
+            header: bytes = file.read(HEADER_DTYPE.itemsize)
+            end: int = position + HEADER_DTYPE.itemsize + int(np.frombuffer(header, dtype= HEADER_DTYPE)['image_size'][0])
+
+            if end > file_size:
+                break
+
+            file.seek(end)
+            position = end
+            num_records += 1
+
+    return position, num_records
+
+
+def segment_index(path: Path) -> int:
+    return int(path.stem.split('-')[1])
+
+
+class Journal:
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        image_mode: ImageMode = 'raw',
+        image_shape: tuple[int, int] = (280, 280),
+        segment_size: int = 4096,
+        sync_interval: float = 1.0,
+        compact_interval: float = 60.0
+    ) -> None:
+        self.directory = Path(directory)
+        # the records keep the images like a history in image_mode does
+        self.image_mode = image_mode
+        self.image_shape = image_shape
+        self.stored_shape: tuple[int, int] = MODEL_SIZE if image_mode == 'model' else image_shape
+        self.segment_size = segment_size
+        self.sync_interval = sync_interval
+        self.compact_interval = compact_interval
+
+        # appending is done by the GUI thread, syncing and compacting by worker threads
+        self.lock = threading.Lock()
+        self.compact_lock = threading.Lock()
+        self.file = None
+        self.segment_index: int = 0
+        # the oldest segment that is not in the base yet
+        self.first_segment: int = 0
+        self.segment_count: int = 0
+        self.dirty: bool = False
+        self.num_synced_batches: int = 0
+
+        # the last error of a worker, the journal keeps going without compacting
+        self.error: Exception | None = None
+        self.closed = threading.Event()
+        self.sync_thread: threading.Thread | None = None
+        self.compact_thread: threading.Thread | None = None
+        self.rebase_thread: threading.Thread | None = None
+
+
+    # reading
+    def read_meta(self) -> dict[str, any] | None:
+        meta_path: Path = self.directory / META_FILE
+
+        if not meta_path.is_file():
+            return None
+
+        return json.loads(meta_path.read_text())
+
+
+    def segment_paths(self) -> list[Path]:
+        # zero padded names, so sorting by name is sorting by age
+        return sorted(self.directory.glob('segment-*.bin'))
+
+
+    def load(self) -> Iterator[HistoryStore]:
+        # the compacted history, then every segment, oldest first and read sequentially chunk by chunk
+        meta: dict[str, any] | None = self.read_meta()
+
+        if meta is None or meta.get('format') != FORMAT_VERSION:
+            return None
+
+        # the mode the records were written in, which may not be the one of this session
+        image_mode: ImageMode = meta['image_mode']
+        image_shape: tuple[int, int] = tuple(meta['image_shape'])
+
+        # only the bytes journal.json counts are in the base, a compaction cut short by a crash may have left more
+        if meta['base'] is not None:
+            with open(self.directory / meta['base'], 'rb') as file:
+                yield from read_records(
+                    file,
+                    meta['base_size'],
+                    image_mode= image_mode,
+                    image_shape= image_shape,
+                    num_rescored= meta['num_rescored']
+                )
+
+        # segments before first_segment are already in the base, they are only left behind by a crash
+        for path in self.segment_paths():
+            if segment_index(path) >= meta['first_segment']:
+                with open(path, 'rb') as file:
+                    yield from read_records(file, path.stat().st_size, image_mode= image_mode, image_shape= image_shape)
+
+
+    # writing
+    def open(self, history: HistoryStore | None = None) -> None:
+        # starts a new segment after the existing ones, the old ones are never appended to again
+        # history is what was loaded, it is rewritten if the journal was made in another image mode
+        self.directory.mkdir(parents= True, exist_ok= True)
+        meta: dict[str, any] | None = self.read_meta()
+
+        segments: list[Path] = self.segment_paths()
+        self.segment_index = segment_index(segments[-1]) + 1 if segments else 0
+        self.open_segment()
+
+        if meta is None or meta.get('format') != FORMAT_VERSION:
+            self.first_segment = self.segment_index
+            self.write_meta(None, 0, 0, self.first_segment)
+            self.remove_unused()
+
+        elif meta['image_mode'] != self.image_mode or tuple(meta['stored_shape']) != self.stored_shape:
+            self.first_segment = self.segment_index
+            self.rebase(
+                history if history is not None else HistoryStore(image_shape= self.image_shape, image_mode= self.image_mode),
+                self.first_segment
+            )
+
+        else:
+            self.first_segment = meta['first_segment']
+            self.remove_unused()
+
+        self.closed.clear()
+        self.sync_thread = threading.Thread(target= self.run_sync, daemon= True)
+        self.sync_thread.start()
+        self.compact_thread = threading.Thread(target= self.run_compact, daemon= True)
+        self.compact_thread.start()
+
+
+    def write_meta(self, base: str | None, base_size: int, num_rescored: int, first_segment: int) -> None:
+        # replacing journal.json is the single step that switches to a new base, so a crash leaves the old or the new one
+        meta: dict[str, any] = {
+            'format': FORMAT_VERSION,
+            'image_mode': self.image_mode,
+            'stored_shape': list(self.stored_shape),
+            'image_shape': list(self.image_shape),
+            'base': base,
+            'base_size': base_size,
+            'num_rescored': num_rescored,
+            'first_segment': first_segment
+        }
+        temp_path: Path = self.directory / f'{META_FILE}.tmp'
+
+        with open(temp_path, 'w') as file:
+            json.dump(meta, file, indent= 4)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, self.directory / META_FILE)
+
+
+    def open_segment(self) -> None:
+        self.file = open(self.directory / f'segment-{self.segment_index:06d}.bin', 'ab')
+        self.segment_count = 0
+
+
+    def to_journal_mode(self, history: HistoryStore, start: int, stop: int) -> tuple[HistoryStore, int, int]:
+        # rows start to stop in the image mode of the records, converted only if the history has another one
+        if history.image_mode == self.image_mode and history.stored_shape == self.stored_shape:
+            return history, start, stop
+
+        converted = HistoryStore(capacity= stop - start, image_shape= self.image_shape, image_mode= self.image_mode)
+        converted.extend(history.rows(start, stop))
+
+        return converted, 0, stop - start
+
+
+    def append(self, history: HistoryStore, index: int) -> None:
+        # O(1): the row as the history keeps it goes into the os buffer, fsync is left to the sync thread
+        self.append_rows(history, index, index + 1)
+
+
+    def append_rows(self, history: HistoryStore, start: int, stop: int) -> None:
+        # rows start to stop of the history (imported ones), written chunk by chunk as whole records
+        for chunk_start in range(start, stop, CHUNK_SIZE):
+            chunk_stop: int = min(chunk_start + CHUNK_SIZE, stop)
+            data: bytes = encode_rows(*self.to_journal_mode(history, chunk_start, chunk_stop))
+
+            with self.lock:
+                self.file.write(data)
+                self.segment_count += chunk_stop - chunk_start
+                self.dirty = True
+
+                # a full segment is closed, compaction appends closed segments to the base
+                if self.segment_count >= self.segment_size:
+                    self.next_segment()
+
+
+    def next_segment(self) -> None:
+        # called with the lock held
+        self.sync_file()
+        self.file.close()
+        self.segment_index += 1
+        self.open_segment()
+
+
+    def sync_file(self) -> None:
+        # all the records appended since the last sync reach the disk with one fsync
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.dirty = False
+        self.num_synced_batches += 1
+
+
+    def sync(self) -> None:
+        with self.lock:
+            if self.dirty and self.file is not None:
+                self.sync_file()
+
+
+    def run_sync(self) -> None:
+        while not self.closed.wait(self.sync_interval):
+            self.sync()
+
+
+    def close(self) -> None:
+        # waits for a running compaction or rebase, so the base is never left behind half written
+        self.closed.set()
+
+        for thread in (self.compact_thread, self.rebase_thread):
+            if thread is not None:
+                thread.join()
+
+        with self.lock:
+            if self.file is not None:
+                if self.dirty:
+                    self.sync_file()
+
+                self.file.close()
+                self.file = None
+
+
+    # compacting
+    def run_compact(self) -> None:
+        while not self.closed.wait(self.compact_interval):
+            try:
+                self.compact()
+
+            except Exception as e:
+                self.error = e
+                return None
+
+
+    def compact(self) -> int:
+        # appends the closed segments to the base on disk, returns the number of records appended
+        # the base is never read, so this costs the size of the segments whatever the size of the history
+        with self.compact_lock:
+            with self.lock:
+                active_segment: int = self.segment_index
+                first_segment: int = self.first_segment
+
+            meta: dict[str, any] = self.read_meta()
+
+            # a rebase is waiting for its turn, it replaces everything this would append
+            if meta['first_segment'] != first_segment:
+                return 0
+
+            closed_segments: list[Path] = [
+                path for path in self.segment_paths() if first_segment <= segment_index(path) < active_segment
+            ]
+
+            if not closed_segments:
+                return 0
+
+            base: str = meta['base'] if meta['base'] is not None else f'base-{first_segment:06d}.bin'
+            num_records: int = 0
+
+            with open(self.directory / base, 'ab') as base_file:
+                # whatever a compaction cut short by a crash appended is not counted by journal.json, it is written over
+                base_file.truncate(meta['base_size'] if meta['base'] is not None else 0)
+
+                for path in closed_segments:
+                    num_bytes, num_segment_records = whole_records_size(path)
+                    num_records += num_segment_records
+
+                    with open(path, 'rb') as segment_file:
+                        while num_bytes > 0:
+                            data: bytes = segment_file.read(min(COPY_SIZE, num_bytes))
+                            base_file.write(data)
+                            num_bytes -= len(data)
+
+                base_file.flush()
+                os.fsync(base_file.fileno())
+                base_size: int = os.fstat(base_file.fileno()).st_size
+
+            self.write_meta(base, base_size, meta['num_rescored'], active_segment)
+
+            with self.lock:
+                # unless a rebase was started meanwhile
+                if self.first_segment == first_segment:
+                    self.first_segment = active_segment
+
+            self.remove_unused()
+
+            return num_records
+
+
+    def write_base(self, history: HistoryStore, first_segment: int) -> tuple[str, int]:
+        # a new file every time, the old base is in use until journal.json points to this one
+        name: str = f'base-{first_segment:06d}.bin'
+        descriptor, temp_path = tempfile.mkstemp(dir= self.directory, prefix= '.base.', suffix= '.tmp')
+
+        with os.fdopen(descriptor, 'wb') as file:
+            for start in range(0, len(history), CHUNK_SIZE):
+                file.write(encode_rows(*self.to_journal_mode(history, start, min(start + CHUNK_SIZE, len(history)))))
+
+            file.flush()
+            os.fsync(file.fileno())
+            size: int = file.tell()
+
+        os.replace(temp_path, self.directory / name)
+
+        return name, size
+
+
+    def start_rebase(self, history: HistoryStore) -> None:
+        # called on the GUI thread right after the history was replaced (imported, cleared, re-scored)
+        # rows appended from now on go to a new segment, the ones before it are dropped by the rebase
+        with self.lock:
+            if self.file is not None:
+                self.next_segment()
+
+            self.first_segment = self.segment_index
+
+        self.rebase_thread = threading.Thread(
+            target= self.run_rebase,
+            args= (history.snapshot(), self.first_segment),
+            daemon= True
+        )
+        self.rebase_thread.start()
+
+
+    def run_rebase(self, history: HistoryStore, first_segment: int) -> None:
+        try:
+            self.rebase(history, first_segment)
+
+        except Exception as e:
+            self.error = e
+
+
+    def rebase(self, history: HistoryStore, first_segment: int) -> None:
+        # history becomes the base, it is a snapshot taken by start_rebase so this can run on a worker
+        with self.compact_lock:
+            # a later rebase was started, this one is out of date
+            if first_segment < self.first_segment:
+                return
+
+            base, base_size = self.write_base(history, first_segment) if len(history) else (None, 0)
+            self.write_meta(base, base_size, history.num_rescored, first_segment)
+            self.remove_unused()
+
+
+    def remove_unused(self) -> None:
+        # old bases, appended segments and whatever a crash (or an older journal format) left behind
+        meta: dict[str, any] = self.read_meta()
+
+        for path in self.directory.iterdir():
+            if path.name.startswith('.base.') or (path.name.startswith('base-') and path.name != meta['base']):
+                if path.is_dir():
+                    shutil.rmtree(path, ignore_errors= True)
+
+                else:
+                    path.unlink(missing_ok= True)
+
+            elif path.name.startswith('segment-') and segment_index(path) < meta['first_segment']:
+                path.unlink(missing_ok= True)
+
+
+class JournalRestorer:
+    def __init__(self, journal: Journal, image_mode: ImageMode) -> None:
+        # loads the last session and opens the journal on a worker thread, so the window shows up right away
+        # the GUI thread polls done, then puts the restored rows in front of the ones predicted meanwhile
+        self.journal = journal
+        self.history = HistoryStore(image_shape= journal.image_shape, image_mode= image_mode)
+        self.error: Exception | None = None
+        self.done = threading.Event()
+
+        self.start_time: float = time.perf_counter()
+        self.elapsed_time: float | None = None
+        self.thread = threading.Thread(target= self.run, daemon= True)
+
+
+    def start(self) -> None:
+        self.start_time = time.perf_counter()
+        self.thread.start()
+
+
+    def run(self) -> None:
+        try:
+            for part in self.journal.load():
+                self.history.extend(part)
+
+            # a journal made in another image mode is rewritten from the restored rows here, off the GUI thread
+            self.journal.open(self.history)
+
+        except Exception as e:
+            self.error = e
+
+        finally:
+            self.elapsed_time = time.perf_counter() - self.start_time
+            self.done.set()
@@ -0,0 +1,108 @@
+import queue
+import threading
+import time
+import utils.common as common
+
+
+class LivePredictor:
+    def __init__(
+        self,
+        engine: any,
+        *,
+        interval_ms: int = 100,
+        engine_lock: 'threading.Lock | None' = None
+    ) -> None:
+        self.engine = engine
+        self.interval: float = interval_ms / 1000
+        # the engines are not all thread safe, so every call goes through the lock shared with the GUI
+        self.engine_lock = engine_lock if engine_lock is not None else threading.Lock()
+
+        # only the latest request is kept, older ones are dropped
+        self.pending: common.NDArrayFloat32 | None = None
+        self.pending_lock = threading.Lock()
+        self.has_pending = threading.Event()
+        self.results: queue.Queue[common.NDArrayFloat] = queue.Queue()
+
+        self.running: bool = False
+        self.thread: threading.Thread | None = None
+        self.reset_stats()
+
+
+    def reset_stats(self) -> None:
+        self.num_predictions: int = 0
+        self.num_dropped: int = 0
+        self.start_time: float = time.perf_counter()
+
+
+    def start(self) -> None:
+        if self.running:
+            return None
+
+        # a worker that was just stopped finishes its current prediction first
+        if self.thread is not None:
+            self.thread.join()
+
+        self.running = True
+        self.reset_stats()
+        self.thread = threading.Thread(target= self.run, daemon= True)
+        self.thread.start()
+
+
+    def stop(self) -> None:
+        self.running = False
+        # waking the worker up so that it can exit
+        self.has_pending.set()
+
+
+    def submit(self, np_img: common.NDArrayFloat32) -> None:
+        # called from the GUI thread on every motion event, the input is copied because its buffer is reused
+        with self.pending_lock:
+            if self.pending is not None:
+                self.num_dropped += 1
+
+            self.pending = np_img.copy()
+
+        self.has_pending.set()
+
+
+    def run(self) -> None:
+        while self.running:
+            self.has_pending.wait()
+
+            with self.pending_lock:
+                np_img, self.pending = self.pending, None
+                self.has_pending.clear()
+
+            if np_img is None or not self.running:
+                continue
+
+            start_time: float = time.perf_counter()
+
+            with self.engine_lock:
+                probas = self.engine.predict(np_img)
+
+            self.num_predictions += 1
+            self.results.put(probas)
+
+            # throttling, requests coming in meanwhile are coalesced into the latest one
+            remaining: float = self.interval - (time.perf_counter() - start_time)
+
+            if remaining > 0:
+                time.sleep(remaining)
+
+
+    def latest_result(self) -> common.NDArrayFloat | None:
+        # called from the GUI thread, stale results are skipped
+        probas = None
+
+        while True:
+            try:
+                probas = self.results.get_nowait()
+
+            except queue.Empty:
+                return probas
+
+
+    def predictions_per_second(self) -> float:
+        elapsed: float = time.perf_counter() - self.start_time
+        return self.num_predictions / elapsed if elapsed > 0 else 0.0
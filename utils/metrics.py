@@ -0,0 +1,202 @@
+import numpy as np
+from typing import TYPE_CHECKING
+import utils.common as common
+
+# only for the annotations, utils.history imports preprocess and PIL which the metrics don't need
+if TYPE_CHECKING:
+    from utils.history import HistoryStore
+
+
+# number of latest predictions the windowed accuracy is computed over
+WINDOW_SIZE: int = 50
+# weight of the newest confidence in the exponentially weighted trend
+EWMA_ALPHA: float = 0.1
+
+
+def compare_predictions(history: 'HistoryStore') -> tuple[float, float, common.NDArrayInt]:
+    # old and new accuracy over the re-scored rows, and how the predictions moved (rows old, columns new)
+    num_rows: int = history.num_rescored
+    labels = history.labels[:num_rows]
+    old_predictions = history.predictions[:num_rows].astype(np.int64)
+    new_predictions = history.new_predictions.astype(np.int64)
+
+    disagreement: common.NDArrayInt = np.zeros((10, 10), dtype= np.int64)
+    np.add.at(disagreement, (old_predictions, new_predictions), 1)
+
+    if num_rows == 0:
+        return 0.0, 0.0, disagreement
+
+    return float((old_predictions == labels).mean()), float((new_predictions == labels).mean()), disagreement
+
+
+class Series:
+    def __init__(self, capacity: int = 64) -> None:
+        # one value per prediction for the trend plots, grown by doubling like HistoryStore
+        self._values = np.empty(capacity, dtype= np.float32)
+        self.size: int = 0
+
+
+    def append(self, value: float) -> None:
+        if self.size == len(self._values):
+            values = np.empty(2 * len(self._values), dtype= np.float32)
+            values[:self.size] = self._values
+            self._values = values
+
+        self._values[self.size] = value
+        self.size += 1
+
+
+    def set_values(self, values: np.ndarray) -> None:
+        self._values = np.array(values, dtype= np.float32)
+        self.size = len(values)
+
+
+    def clear(self) -> None:
+        self.size = 0
+
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self.size]
+
+
+class RunningMetrics:
+    def __init__(self, num_classes: int = 10, window_size: int = WINDOW_SIZE, ewma_alpha: float = EWMA_ALPHA) -> None:
+        self.num_classes = num_classes
+        self.window_size = window_size
+        self.ewma_alpha = ewma_alpha
+        self.window_accuracy_series = Series()
+        self.ewma_confidence_series = Series()
+        self.reset()
+
+
+    def reset(self) -> None:
+        self.count: int = 0
+        self.num_correct: int = 0
+        self.confidence_sum: float = 0.0
+        # rows are the correct numbers, columns the predictions, same as sklearn
+        self.confusion: common.NDArrayInt = np.zeros((self.num_classes, self.num_classes), dtype= np.int64)
+
+        # ring buffer of the correctness of the latest window_size predictions
+        self.window: np.ndarray = np.zeros(self.window_size, dtype= np.bool_)
+        self.window_num_correct: int = 0
+        self.ewma_confidence: float = 0.0
+
+        self.window_accuracy_series.clear()
+        self.ewma_confidence_series.clear()
+
+
+    def update(self, prediction: int, correct_number: int, confidence: float) -> float:
+        # O(1) per prediction, returns the accuracy including this one
+        correct: bool = prediction == correct_number
+        slot: int = self.count % self.window_size
+
+        # the slot holds the prediction leaving the window, once the window is full
+        self.window_num_correct += int(correct) - int(self.window[slot])
+        self.window[slot] = correct
+
+        self.ewma_confidence = confidence if self.count == 0 else (
+            self.ewma_alpha * confidence + (1 - self.ewma_alpha) * self.ewma_confidence
+        )
+
+        self.count += 1
+        self.num_correct += int(correct)
+        self.confidence_sum += confidence
+        self.confusion[correct_number, prediction] += 1
+
+        self.window_accuracy_series.append(self.window_accuracy)
+        self.ewma_confidence_series.append(self.ewma_confidence)
+
+        return self.accuracy
+
+
+    @classmethod
+    def from_history(cls, history: 'HistoryStore') -> 'RunningMetrics':
+        # rebuilding everything in one vectorized pass, used after importing
+        metrics = cls()
+        y_true: common.NDArrayInt = history.labels.astype(np.int64)
+        y_pred: common.NDArrayInt = history.predictions.astype(np.int64)
+        confidences: common.NDArrayFloat = history.confidences.astype(np.float64)
+        correct: np.ndarray = y_true == y_pred
+        count: int = len(history)
+
+        metrics.count = count
+        metrics.num_correct = int(correct.sum())
+        metrics.confidence_sum = float(confidences.sum())
+        np.add.at(metrics.confusion, (y_true, y_pred), 1)
+
+        if count == 0:
+            return metrics
+
+        # windowed accuracy of every row from a running sum
+        correct_sums = np.concatenate(([0], np.cumsum(correct)))
+        rows = np.arange(1, count + 1)
+        window_starts = np.maximum(rows - metrics.window_size, 0)
+        metrics.window_accuracy_series.set_values(
+            (correct_sums[rows] - correct_sums[window_starts]) / np.minimum(rows, metrics.window_size)
+        )
+
+        # the ring buffer as it would be after updating row by row
+        last_rows = np.arange(max(count - metrics.window_size, 0), count)
+        metrics.window[last_rows % metrics.window_size] = correct[last_rows]
+        metrics.window_num_correct = int(metrics.window.sum())
+
+        # the recurrence is sequential, but this is only done once per import
+        ewma = np.empty(count, dtype= np.float64)
+        ewma[0] = confidences[0]
+
+        for index in range(1, count):
+            ewma[index] = metrics.ewma_alpha * confidences[index] + (1 - metrics.ewma_alpha) * ewma[index - 1]
+
+        metrics.ewma_confidence_series.set_values(ewma)
+        metrics.ewma_confidence = float(ewma[-1])
+
+        return metrics
+
+
+    @property
+    def num_wrong(self) -> int:
+        return self.count - self.num_correct
+
+
+    @property
+    def accuracy(self) -> float:
+        return self.num_correct / self.count if self.count else 0.0
+
+
+    @property
+    def mean_confidence(self) -> float:
+        return self.confidence_sum / self.count if self.count else 0.0
+
+
+    @property
+    def window_accuracy(self) -> float:
+        # accuracy of the latest window_size predictions, or of all of them before the window is full
+        num_in_window: int = min(self.count, self.window_size)
+        return self.window_num_correct / num_in_window if num_in_window else 0.0
+
+
+    # views used by the trend plots, one value per prediction
+    @property
+    def window_accuracies(self) -> np.ndarray:
+        return self.window_accuracy_series.values
+
+
+    @property
+    def ewma_confidences(self) -> np.ndarray:
+        return self.ewma_confidence_series.values
+
+
+    def per_class_scores(self) -> common.NDArrayFloat:
+        # precision, recall and f1 of every digit as rows, only reads the 10x10 confusion matrix
+        true_positives = np.diag(self.confusion).astype(np.float64)
+        predicted = self.confusion.sum(axis= 0)
+        actual = self.confusion.sum(axis= 1)
+
+        # digits that were never predicted (or never drawn) get 0, same as sklearn's zero_division= 0
+        precision = np.divide(true_positives, predicted, out= np.zeros(self.num_classes), where= predicted > 0)
+        recall = np.divide(true_positives, actual, out= np.zeros(self.num_classes), where= actual > 0)
+        precision_recall = precision + recall
+        f1 = np.divide(2 * precision * recall, precision_recall, out= np.zeros(self.num_classes), where= precision_recall > 0)
+
+        return np.stack([precision, recall, f1])
@@ -0,0 +1,94 @@
+import io
+import zipfile
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import utils.common as common
+
+
+# layer names of the Sequential model in hand_written_digit_recognition.ipynb, dropout and flatten have no weights
+LAYER_NAMES: tuple[str, ...] = ('conv2d', 'conv2d_1', 'dense', 'dense_1')
+
+
+def load_weights(model_path: str) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    # h5py is all that is needed to read the weights, tensorflow is never imported
+    import h5py
+
+    # a .keras file is a zip archive with the weights stored in model.weights.h5
+    if zipfile.is_zipfile(model_path):
+        with zipfile.ZipFile(model_path) as archive:
+            source = io.BytesIO(archive.read('model.weights.h5'))
+
+    else:
+        source = model_path
+
+    with h5py.File(source, 'r') as file:
+        return {
+            name: (
+                file[f'layers/{name}/vars/0'][()].astype(np.float32),
+                file[f'layers/{name}/vars/1'][()].astype(np.float32)
+            )
+            for name in LAYER_NAMES
+        }
+
+
+def conv2d_relu(x: np.ndarray, kernel: np.ndarray, bias: np.ndarray) -> np.ndarray:
+    # 'valid' convolution with stride 1 as an im2col matrix multiplication
+    n, height, width, channels = x.shape
+    k_height, k_width, _, filters = kernel.shape
+    out_height, out_width = height - k_height + 1, width - k_width + 1
+
+    # (n, out_h, out_w, channels, k_h, k_w) view of every patch, copied once into the column matrix
+    patches = sliding_window_view(x, (k_height, k_width), axis= (1, 2))
+    columns = patches.reshape(n * out_height * out_width, channels * k_height * k_width)
+
+    # kernel is (k_h, k_w, channels, filters), ordering it the same way as the patches
+    weights = kernel.transpose(2, 0, 1, 3).reshape(channels * k_height * k_width, filters)
+
+    out = columns @ weights
+    out += bias
+    np.maximum(out, 0, out= out)
+    return out.reshape(n, out_height, out_width, filters)
+
+
+def max_pool_2x2(x: np.ndarray) -> np.ndarray:
+    # 'valid' pooling drops the last row and column when the size is odd
+    n, height, width, channels = x.shape
+    height, width = height // 2 * 2, width // 2 * 2
+    return x[:, :height, :width].reshape(n, height // 2, 2, width // 2, 2, channels).max(axis= (2, 4))
+
+
+def dense(x: np.ndarray, kernel: np.ndarray, bias: np.ndarray) -> np.ndarray:
+    out = x @ kernel
+    out += bias
+    return out
+
+
+def softmax(x: np.ndarray) -> np.ndarray:
+    exp = np.exp(x - x.max(axis= 1, keepdims= True))
+    return exp / exp.sum(axis= 1, keepdims= True)
+
+
+class NumpyEngine:
+    def __init__(self, model_path: str) -> None:
+        self.weights = load_weights(model_path)
+
+
+    def forward(self, batch: common.NDArrayFloat) -> common.NDArrayFloat:
+        x = np.asarray(batch, dtype= np.float32)
+
+        x = max_pool_2x2(conv2d_relu(x, *self.weights['conv2d']))
+        x = max_pool_2x2(conv2d_relu(x, *self.weights['conv2d_1']))
+
+        # channels last flatten, the same order keras uses
+        x = x.reshape(len(x), -1)
+
+        x = np.maximum(dense(x, *self.weights['dense']), 0)
+        return softmax(dense(x, *self.weights['dense_1']))
+
+
+    def predict(self, np_img: common.NDArrayFloat) -> common.NDArrayFloat:
+        return self.forward(np_img)[0]
+
+
+    def predict_batch(self, batch: common.NDArrayFloat) -> common.NDArrayFloat:
+        return self.forward(batch)
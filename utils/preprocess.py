@@ -0,0 +1,89 @@
+import numpy as np
+from PIL import Image
+from typing import Sequence
+import utils.common as common
+
+
+MODEL_SIZE: tuple[int, int] = (28, 28)
+
+
+def new_input_buffer(batch_size: int = 1) -> common.NDArrayFloat32:
+    return np.empty((batch_size, *MODEL_SIZE, 1), dtype= np.float32)
+
+
+def normalize_into(pixels: np.ndarray, out: np.ndarray, *, invert: bool = True) -> None:
+    # inverting and scaling straight into the float32 output, without any temporary arrays
+    if invert:
+        np.subtract(np.float32(255), pixels, out= out, dtype= np.float32)
+
+    else:
+        out[...] = pixels
+
+    out *= np.float32(1 / 255)
+
+
+def downsample(pixels: np.ndarray) -> np.ndarray:
+    # (..., h, w) pixels to (..., 28, 28) float32 box averages, the same averaging as the stroke raster,
+    # so a drawing gets the same model input whether it comes from the canvas, the history or a file
+    height, width = pixels.shape[-2:]
+    rows, columns = MODEL_SIZE
+
+    # the canvas (280x280) is a whole multiple, every cell is the mean of its block
+    if height % rows == 0 and width % columns == 0:
+        blocks = pixels.reshape(*pixels.shape[:-2], rows, height // rows, columns, width // columns)
+        return blocks.mean(axis= (-3, -1), dtype= np.float32)
+
+    # other sizes, box filtering in float so nothing is rounded to uint8 on the way
+    flat = pixels.reshape(-1, height, width).astype(np.float32, copy= False)
+    small = np.stack([np.asarray(Image.fromarray(image, mode= 'F').resize(MODEL_SIZE, Image.BOX)) for image in flat])
+    return small.reshape(*pixels.shape[:-2], *MODEL_SIZE)
+
+
+def process_image(
+    image: Image.Image,
+    *,
+    invert: bool = True,
+    out: common.NDArrayFloat32 | None = None
+) -> common.NDArrayFloat32:
+    if out is None:
+        out = new_input_buffer()
+
+    if image.mode != 'L':
+        image = image.convert('L')
+
+    # box averaged down to 28x28 for model input, inverting to match MNIST black-on-white
+    normalize_into(downsample(np.asarray(image)), out[0, :, :, 0], invert= invert)
+    return out
+
+
+def process_images(
+    images: Sequence[Image.Image],
+    *,
+    invert: bool = True,
+    out: common.NDArrayFloat32 | None = None
+) -> common.NDArrayFloat32:
+    if out is None or len(out) < len(images):
+        out = new_input_buffer(len(images))
+
+    for index, image in enumerate(images):
+        process_image(image, invert= invert, out= out[index: index + 1])
+
+    return out[:len(images)]
+
+
+def process_arrays(
+    arrays: np.ndarray,
+    *,
+    invert: bool = True,
+    out: common.NDArrayFloat32 | None = None
+) -> common.NDArrayFloat32:
+    # (n, h, w) uint8 images, normalized in one vectorized pass, bigger ones are box averaged first
+    if arrays.shape[1:3] != MODEL_SIZE:
+        arrays = downsample(arrays)
+
+    if out is None or len(out) < len(arrays):
+        out = new_input_buffer(len(arrays))
+
+    out = out[:len(arrays)]
+    normalize_into(arrays, out[..., 0], invert= invert)
+    return out
@@ -0,0 +1,53 @@
+import numpy as np
+import utils.common as common
+
+
+class StrokeRaster:
+    def __init__(self, canvas_size: int = 280, model_size: int = 28) -> None:
+        self.canvas_size = canvas_size
+        self.model_size = model_size
+        self.cell_size: int = canvas_size // model_size
+
+        # 1 where the pen has drawn, mirrors the black pixels of the drawing image
+        self.mask = np.zeros((canvas_size, canvas_size), dtype= np.uint8)
+        # fraction of every 10x10 cell covered by ink, this is already the normalized and inverted model input
+        self.ink = np.zeros((model_size, model_size), dtype= np.float32)
+
+        # becomes False when the image is changed by something other than pen strokes (noise, loading)
+        self.valid: bool = True
+
+
+    def clear(self) -> None:
+        self.mask.fill(0)
+        self.ink.fill(0)
+        self.valid = True
+
+
+    def invalidate(self) -> None:
+        self.valid = False
+
+
+    def add_rectangle(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        # the same inclusive rectangle ImageDraw.rectangle paints, clipped to the canvas
+        last: int = self.canvas_size - 1
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, last), min(y1, last)
+
+        if x0 > x1 or y0 > y1:
+            return None
+
+        self.mask[y0: y1 + 1, x0: x1 + 1] = 1
+
+        # only the cells touched by the rectangle are averaged again
+        cell: int = self.cell_size
+        row_0, row_1 = y0 // cell, y1 // cell + 1
+        col_0, col_1 = x0 // cell, x1 // cell + 1
+
+        block = self.mask[row_0 * cell: row_1 * cell, col_0 * cell: col_1 * cell]
+        self.ink[row_0: row_1, col_0: col_1] = block.reshape(row_1 - row_0, cell, col_1 - col_0, cell).mean(axis= (1, 3))
+
+
+    def write_into(self, out: common.NDArrayFloat32) -> common.NDArrayFloat32:
+        # (1, 28, 28, 1) model input
+        np.copyto(out[0, :, :, 0], self.ink)
+        return out
@@ -0,0 +1,86 @@
+import threading
+import time
+import numpy as np
+import utils.common as common
+from utils.history import HistoryStore
+from utils.preprocess import new_input_buffer, process_arrays
+
+
+class Rescorer:
+    def __init__(
+        self,
+        engine: any,
+        history: HistoryStore,
+        *,
+        batch_size: int = 256,
+        engine_lock: 'threading.Lock | None' = None
+    ) -> None:
+        # only the rows present when it started are re-scored, rows appended meanwhile are left for the next run
+        self.engine = engine
+        self.history = history
+        self.generation: int = history.generation
+        self.total: int = len(history)
+        self.batch_size = batch_size
+        # shared with the Predict button and live prediction
+        self.engine_lock = engine_lock if engine_lock is not None else threading.Lock()
+
+        # filled by the worker, the history itself is only written from the GUI thread once this is done
+        self.predictions = np.empty(self.total, dtype= np.int8)
+        self.probabilities = np.empty((self.total, 10), dtype= np.float32)
+        self.num_done: int = 0
+        self.error: Exception | None = None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+
+        self.start_time: float = time.perf_counter()
+        self.elapsed_time: float | None = None
+        self.thread = threading.Thread(target= self.run, daemon= True)
+
+
+    def start(self) -> None:
+        self.start_time = time.perf_counter()
+        self.thread.start()
+
+
+    def cancel(self) -> None:
+        # the batch being predicted is finished first, everything before it is kept
+        self.cancelled.set()
+
+
+    def run(self) -> None:
+        buffer: common.NDArrayFloat32 = new_input_buffer(self.batch_size)
+
+        try:
+            for start in range(0, self.total, self.batch_size):
+                # stopping when cancelled, or when the history was cleared or replaced
+                if self.cancelled.is_set() or self.history.generation != self.generation:
+                    break
+
+                stop: int = min(start + self.batch_size, self.total)
+
+                # stored images are the canvas ones (black on white), same inversion as predicting from the canvas
+                inputs = process_arrays(self.history.image_batch(start, stop), invert= True, out= buffer)
+
+                with self.engine_lock:
+                    probas: common.NDArrayFloat = self.engine.predict_batch(inputs)
+
+                self.probabilities[start: stop] = probas
+                self.predictions[start: stop] = probas.argmax(axis= 1)
+                self.num_done = stop
+
+        except Exception as e:
+            self.error = e
+
+        finally:
+            self.elapsed_time = time.perf_counter() - self.start_time
+            self.done.set()
+
+
+    def progress(self) -> str:
+        percent: float = 100 * self.num_done / self.total if self.total else 100.0
+        return f'{self.num_done}/{self.total} ({percent:.0f}%)'
+
+
+    def rows_per_second(self) -> float:
+        elapsed: float = self.elapsed_time if self.elapsed_time is not None else time.perf_counter() - self.start_time
+        return self.num_done / elapsed if elapsed > 0 else 0.0
@@ -51,11 +51,14 @@ class ShortcutWindow(ctk.CTkToplevel):
             'Predict': 'ctrl + p',
             'Clear (clearing canvas)': 'ctrl + delete',
             'Import': 'ctrl + o',
+            'Import Image Folder': 'ctrl + shift + O',
             'Export': 'ctrl + s',
             'Shortcuts Panel': 'ctrl + .',
+            'Live Prediction': 'ctrl + l',
             'History': None,
             'Clear All Data': 'ctrl + shift + T',
             'Load (from history)': 'ctrl + shift + L',
+            'Re-score (or cancel it)': 'ctrl + shift + R',
             'Correction Actions': None,
             'Correct button': 'ctrl + shift + C',
             'Wrong button': 'ctrl + shift + W',
@@ -64,7 +67,11 @@ class ShortcutWindow(ctk.CTkToplevel):
             'Accuracy Trend per Prediction': 'ctrl + m + 1',
             'Confidence Trend per Prediction': 'ctrl + m + 2',
             'Confusion Matrix': 'ctrl + m + 3',
-            'Correct V/S Wrong': 'ctrl + m + 4'
+            'Correct V/S Wrong': 'ctrl + m + 4',
+            'Recent Accuracy': 'ctrl + m + 5',
+            'Per Digit P/R/F1': 'ctrl + m + 6',
+            'Confidence EWMA': 'ctrl + m + 7',
+            'Old V/S New': 'ctrl + m + 8'
         }
 
         for name, key in shortcuts.items():